@@ -0,0 +1,124 @@
+"""Accuracy vs speed of the decode modes in src.decoded_audio.DECODE_MODES.
+
+Every mode is compared against the default ('hq': soxr_hq resampling to
+22050 Hz). DEAM feature drift is reported in units of the shipped mood
+scaler's standard deviations, genre feature drift relative to the reference
+values, and mood drift as the change in the shipped mood model's
+valence/arousal output. If a genre classifier is present, top-1 agreement is
+reported too.
+
+    python -m benchmarks.compare_decode_modes [--audio-dir DIR] [--json OUT]
+
+Without --audio-dir, deterministic synthetic tracks at 44.1 and 48 kHz are used.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import warnings
+import numpy as np
+from benchmarks.synthetic import write_synthetic_tracks
+from src.audio_processing import analyze_audio
+from src.deam_audio_processing import analyze_audio_deam
+from src.decoded_audio import DECODE_MODES, configure_decode_cache, load_audio
+from src.model_registry import get_genre_predictor, get_mood_detector
+
+MODELS_DIR = './models'
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg')
+
+def find_audio(audio_dir):
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(audio_dir)
+                  for name in names if name.lower().endswith(AUDIO_EXTENSIONS))
+
+def run_mode(paths, decode):
+    genre_rows, mood_rows = [], []
+    start = time.perf_counter()
+    for path in paths:
+        load_audio(path, sr=decode.sr, res_type=decode.res_type, cache=None)
+    decode_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for path in paths:
+        genre_rows.append(analyze_audio(path, decode=decode)[0])
+    genre_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for path in paths:
+        mood_rows.append(analyze_audio_deam(path, decode=decode))
+    mood_seconds = time.perf_counter() - start
+    return np.array(genre_rows), np.array(mood_rows), decode_seconds, genre_seconds, mood_seconds
+
+def compare(paths, models_dir=MODELS_DIR):
+    configure_decode_cache(0)  # Every mode must pay for its own decode
+    mood_detector = get_mood_detector(os.path.join(models_dir, 'mood_scaler.joblib'),
+                                      os.path.join(models_dir, 'mood_model.joblib'))
+    try:
+        genre_predictor = get_genre_predictor(os.path.join(models_dir, 'genre_classifier.joblib'),
+                                              os.path.join(models_dir, 'genre_scaler.joblib'))
+    except FileNotFoundError:
+        genre_predictor = None
+
+    # Warm up librosa's caches so the first mode is not penalized
+    analyze_audio(paths[0])
+
+    results = {}
+    reference = None
+    for name, decode in DECODE_MODES.items():
+        genre_X, mood_X, decode_seconds, genre_seconds, mood_seconds = run_mode(paths, decode)
+        mood = mood_detector.predict_batch(mood_X)
+        labels = genre_predictor.predict_batch(genre_X)[0] if genre_predictor else None
+        if reference is None:
+            reference = (genre_X, mood_X, mood, labels)
+
+        genre_drift = np.abs(genre_X - reference[0]) / np.maximum(np.abs(reference[0]), 1e-3)
+        deam_drift = np.abs(mood_X - reference[1]) / mood_detector.scaler.scale_
+        entry = {
+            'decode': repr(decode),
+            'decode_seconds_per_track': decode_seconds / len(paths),
+            'genre_seconds_per_track': genre_seconds / len(paths),
+            'deam_seconds_per_track': mood_seconds / len(paths),
+            'genre_feature_drift_median_relative': float(np.median(genre_drift)),
+            'deam_feature_drift_mean_sd': float(deam_drift.mean()),
+            'deam_feature_drift_max_sd': float(deam_drift.max()),
+            'valence_abs_delta_mean': float(np.abs(mood[:, 0] - reference[2][:, 0]).mean()),
+            'arousal_abs_delta_mean': float(np.abs(mood[:, 1] - reference[2][:, 1]).mean()),
+        }
+        if labels is not None:
+            entry['genre_top1_agreement'] = float(np.mean(labels == reference[3]))
+        results[name] = entry
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio-dir', help="Directory of audio files (default: synthetic tracks)")
+    parser.add_argument('--tracks', type=int, default=8, help="Synthetic tracks per sample rate")
+    parser.add_argument('--seconds', type=float, default=30.0, help="Synthetic track length")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')  # sklearn version warnings from the shipped models
+    if args.audio_dir:
+        paths = find_audio(args.audio_dir)
+    else:
+        tmp_dir = os.path.join(tempfile.gettempdir(), 'synthet_benchmark_audio')
+        paths = (write_synthetic_tracks(tmp_dir, args.tracks, args.seconds, sr=44100)
+                 + write_synthetic_tracks(tmp_dir, args.tracks, args.seconds, sr=48000))
+    if not paths:
+        raise SystemExit("No audio files found")
+
+    results = compare(paths)
+    print(f"{len(paths)} tracks")
+    print(f"{'mode':<8}{'decode s':>10}{'genre s':>10}{'deam s':>10}{'genre rel':>11}{'deam sd':>10}"
+          f"{'deam sd max':>13}{'|dValence|':>12}{'|dArousal|':>12}{'top-1':>7}")
+    for name, entry in results.items():
+        agreement = entry.get('genre_top1_agreement')
+        print(f"{name:<8}{entry['decode_seconds_per_track']:>10.3f}{entry['genre_seconds_per_track']:>10.3f}"
+              f"{entry['deam_seconds_per_track']:>10.3f}{entry['genre_feature_drift_median_relative']:>11.4f}"
+              f"{entry['deam_feature_drift_mean_sd']:>10.4f}{entry['deam_feature_drift_max_sd']:>13.4f}"
+              f"{entry['valence_abs_delta_mean']:>12.4f}{entry['arousal_abs_delta_mean']:>12.4f}"
+              f"{'n/a' if agreement is None else f'{agreement:.2f}':>7}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Accuracy and speed of float32 features against the float64 pipeline.
+
+Mood: DEAM features of each track are extracted once in float64 and once in
+the pipeline's FEATURE_DTYPE; the shipped mood model scores the float64
+features with its float64 weights and the others the way MoodDetector.load
+serves them. Genre: a random forest is trained on the shipped
+models/fma_features_subset.npz once per dtype with the same split (no genre
+classifier is shipped to compare against directly).
+
+    python -m benchmarks.dtype_accuracy [--audio-dir DIR] [--json OUT]
+
+Without --audio-dir, deterministic synthetic tracks at 44.1 kHz are used.
+"""
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+import warnings
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from benchmarks.synthetic import write_synthetic_tracks
+from src import deam_audio_processing
+from src.deam_audio_processing import analyze_audio_deam
+from src.feature_config import MOOD_SCHEMA, get_feature_dtype
+from src.feature_schema import FeatureSchema
+from src.mood_detector import MoodDetector, mood_to_labels
+
+MODELS_DIR = './models'
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg')
+PREDICT_ROWS = 20000
+PREDICT_REPEATS = 10
+
+def find_audio(audio_dir):
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(audio_dir)
+                  for name in names if name.lower().endswith(AUDIO_EXTENSIONS))
+
+@contextlib.contextmanager
+def extraction_dtype(dtype):
+    # Same layout and key, packed in another dtype
+    deam_audio_processing.MOOD_SCHEMA = FeatureSchema(MOOD_SCHEMA.name, MOOD_SCHEMA.version, MOOD_SCHEMA.groups, dtype)
+    try:
+        yield
+    finally:
+        deam_audio_processing.MOOD_SCHEMA = MOOD_SCHEMA
+
+def deam_features(paths, dtype):
+    with extraction_dtype(dtype):
+        return np.array([analyze_audio_deam(path) for path in paths])
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    for _ in range(PREDICT_REPEATS):
+        func(*args)
+    return (time.perf_counter() - start) / PREDICT_REPEATS
+
+def compare_mood(paths, models_dir=MODELS_DIR):
+    scaler_path = os.path.join(models_dir, 'mood_scaler.joblib')
+    model_path = os.path.join(models_dir, 'mood_model.joblib')
+    reference = MoodDetector()
+    reference.scaler = joblib.load(scaler_path)
+    reference.model = joblib.load(model_path)
+    detector = MoodDetector.load(scaler_path, model_path)
+
+    X64 = deam_features(paths, np.float64)
+    X = deam_features(paths, get_feature_dtype())
+    expected = reference.model.predict(reference.scaler.transform(X64))
+    predicted = detector.predict_batch(X)
+    delta = np.abs(predicted - expected)
+
+    # Throughput on a large batch drawn around the scaler's statistics
+    rng = np.random.RandomState(0)
+    batch = rng.randn(PREDICT_ROWS, X.shape[1]) * reference.scaler.scale_ + reference.scaler.mean_
+    return {
+        'tracks': len(paths),
+        'feature_max_relative_delta': float(np.max(np.abs(X - X64) / np.maximum(np.abs(X64), 1e-12))),
+        'valence_abs_delta_max': float(delta[:, 0].max()),
+        'arousal_abs_delta_max': float(delta[:, 1].max()),
+        'mood_label_agreement': float(np.mean(mood_to_labels(*predicted.T) == mood_to_labels(*expected.T))),
+        'predict_seconds_float64': time_call(lambda b: reference.model.predict(reference.scaler.transform(b)), batch),
+        'predict_seconds': time_call(detector.predict_batch, batch),
+        'predict_rows': PREDICT_ROWS,
+    }
+
+def compare_genre(data_file=os.path.join(MODELS_DIR, 'fma_features_subset.npz')):
+    data = np.load(data_file)
+    X64, y = data['X'].astype(np.float64), data['y']
+    train_rows, test_rows = train_test_split(np.arange(len(X64)), test_size=0.2, random_state=42)
+    results = {}
+    predictions = {}
+    for name, dtype in (('float64', np.float64), ('feature_dtype', get_feature_dtype())):
+        X = X64.astype(dtype)
+        scaler = StandardScaler().fit(X[train_rows])
+        clf = RandomForestClassifier(n_estimators=100, random_state=42).fit(scaler.transform(X[train_rows]), y[train_rows])
+        X_test = scaler.transform(X[test_rows])
+        predictions[name] = clf.predict(X_test)
+        batch = np.tile(X, (PREDICT_ROWS // len(X) + 1, 1))[:PREDICT_ROWS]
+        results[name] = {
+            'test_accuracy': float(np.mean(predictions[name] == y[test_rows])),
+            'predict_proba_seconds': time_call(lambda b: clf.predict_proba(scaler.transform(b)), batch),
+            'dataset_bytes': int(X.nbytes),
+        }
+    results['prediction_agreement'] = float(np.mean(predictions['float64'] == predictions['feature_dtype']))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio-dir', help="Directory of audio files (default: synthetic tracks)")
+    parser.add_argument('--tracks', type=int, default=16, help="Number of synthetic tracks")
+    parser.add_argument('--seconds', type=float, default=30.0, help="Synthetic track length")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')  # sklearn version warnings from the shipped models
+    if args.audio_dir:
+        paths = find_audio(args.audio_dir)
+    else:
+        tmp_dir = os.path.join(tempfile.gettempdir(), 'synthet_benchmark_audio')
+        paths = write_synthetic_tracks(tmp_dir, args.tracks, args.seconds, sr=44100)
+    if not paths:
+        raise SystemExit("No audio files found")
+
+    dtype = get_feature_dtype().name
+    results = {'feature_dtype': dtype, 'mood': compare_mood(paths), 'genre': compare_genre()}
+    mood, genre = results['mood'], results['genre']
+    print(f"Feature dtype: {dtype}")
+    print(f"Mood ({mood['tracks']} tracks): max feature rel. delta {mood['feature_max_relative_delta']:.2e}, "
+          f"max |dValence| {mood['valence_abs_delta_max']:.2e}, max |dArousal| {mood['arousal_abs_delta_max']:.2e}, "
+          f"label agreement {mood['mood_label_agreement']:.2f}")
+    print(f"  predict {mood['predict_rows']} rows: float64 {1000 * mood['predict_seconds_float64']:.1f} ms, "
+          f"{dtype} {1000 * mood['predict_seconds']:.1f} ms")
+    print(f"Genre (fma_features_subset.npz): test accuracy float64 {genre['float64']['test_accuracy']:.3f}, "
+          f"{dtype} {genre['feature_dtype']['test_accuracy']:.3f}, agreement {genre['prediction_agreement']:.3f}")
+    print(f"  predict_proba {PREDICT_ROWS} rows: float64 {1000 * genre['float64']['predict_proba_seconds']:.1f} ms, "
+          f"{dtype} {1000 * genre['feature_dtype']['predict_proba_seconds']:.1f} ms")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
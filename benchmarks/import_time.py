@@ -0,0 +1,77 @@
+"""Cold import and startup times of the application's entry points.
+
+Every measurement runs in a fresh interpreter, so nothing is already in
+sys.modules; the median of --repeat runs is reported along with which heavy
+dependencies each entry point ended up loading. 'chooser window' times
+`import main` plus creating and showing the ChoiceWindow (offscreen Qt).
+
+    python -m benchmarks.import_time [--repeat N] [--root CHECKOUT] [--json OUT]
+
+--root measures another checkout of the repo (e.g. a `git worktree` of an
+older commit) for comparison.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('librosa', 'sklearn', 'matplotlib', 'pandas', 'scipy')
+
+IMPORT_TARGETS = ('src', 'main', 'src.preparation_ui', 'src.ui', 'src.cli')
+
+_IMPORT_PROBE = '''
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module({target!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+_WINDOW_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+import main
+app = QApplication(sys.argv)
+window = main.ChoiceWindow()
+window.show()
+app.processEvents()
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+def probe(code, root):
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen', PYTHONDONTWRITEBYTECODE='1')
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], cwd=root, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def measure(code, root, repeat):
+    runs = [probe(code, root) for _ in range(repeat)]
+    return {'median_seconds': statistics.median(run['seconds'] for run in runs), 'loaded': runs[-1]['loaded']}
+
+def run(root='.', repeat=5):
+    results = {target: measure(_IMPORT_PROBE.format(target=target, heavy=HEAVY_MODULES), root, repeat)
+               for target in IMPORT_TARGETS}
+    results['chooser window'] = measure(_WINDOW_PROBE.format(heavy=HEAVY_MODULES), root, repeat)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument('--root', default='.', help="Checkout to measure (default: this one)")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(os.path.abspath(args.root), args.repeat)
+    print(f"{'entry point':<22}{'median s':>10}  heavy modules loaded")
+    for name, entry in results.items():
+        print(f"{name:<22}{entry['median_seconds']:>10.3f}  {', '.join(entry['loaded']) or '-'}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Latency and throughput of the inference service under concurrent load.
+
+Sends --requests POST /analyze requests from --concurrency client threads
+(urllib, no extra dependencies) and reports p50/p90/p99 latency, throughput
+and the mean prediction batch size the micro-batcher formed. Without --url a
+server is started on a free localhost port and stopped afterwards; pass
+--cache to let repeated files skip extraction, which isolates the serving and
+batching overhead from feature extraction.
+
+    python -m benchmarks.load_test [--url http://127.0.0.1:8765] [--requests N] [--concurrency C]
+                                   [--upload] [--audio-dir DIR] [--json OUT] [-- SERVER ARGS...]
+
+Arguments after `--` are passed to `python -m src.server` (e.g. --workers 4
+--max-batch 1 to compare against unbatched prediction).
+"""
+import argparse
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.synthetic import write_synthetic_tracks
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg')
+STARTUP_TIMEOUT = 120.0
+
+def find_audio(audio_dir):
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(audio_dir)
+                  for name in names if name.lower().endswith(AUDIO_EXTENSIONS))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for_health(url, process=None, timeout=STARTUP_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"Server exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(url + '/health', timeout=5) as response:
+                return json.load(response)
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise SystemExit(f"Server at {url} did not come up within {timeout:.0f} s")
+
+def start_server(server_args):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-W', 'ignore', '-m', 'src.server', '--port', str(port)] + server_args,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process, f'http://127.0.0.1:{port}'
+
+def analyze_request(url, path, upload):
+    if upload:
+        with open(path, 'rb') as f:
+            body = f.read()
+        name = urllib.request.quote(os.path.basename(path))
+        return urllib.request.Request(f'{url}/analyze?name={name}', data=body,
+                                      headers={'Content-Type': 'application/octet-stream'})
+    return urllib.request.Request(url + '/analyze', data=json.dumps({'path': os.path.abspath(path)}).encode(),
+                                  headers={'Content-Type': 'application/json'})
+
+def send(url, path, upload):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(analyze_request(url, path, upload), timeout=600) as response:
+            result = json.load(response)
+    except urllib.error.HTTPError as e:
+        return time.perf_counter() - start, None, e.read().decode(errors='replace')
+    return time.perf_counter() - start, result, None
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+def run(url, paths, requests, concurrency, upload=False):
+    # One request per file first, so startup and a cold cache are not measured
+    for path in paths:
+        send(url, path, upload)
+
+    files = itertools.cycle(paths)
+    lock = threading.Lock()
+
+    def next_path():
+        with lock:
+            return next(files)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(lambda _: send(url, next_path(), upload), range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [seconds for seconds, result, _ in outcomes if result is not None]
+    batch_sizes = [result['batch_size'] for _, result, _ in outcomes if result is not None]
+    errors = [error for _, result, error in outcomes if result is None]
+    if not latencies:
+        raise SystemExit(f"Every request failed, e.g. {errors[0]}")
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'upload': upload,
+        'errors': len(errors),
+        'seconds': elapsed,
+        'throughput_rps': len(latencies) / elapsed,
+        'latency_p50_ms': 1000 * percentile(latencies, 50),
+        'latency_p90_ms': 1000 * percentile(latencies, 90),
+        'latency_p99_ms': 1000 * percentile(latencies, 99),
+        'latency_mean_ms': 1000 * statistics.mean(latencies),
+        'mean_batch_size': statistics.mean(batch_sizes),
+        'max_batch_size': max(batch_sizes),
+    }
+
+def main():
+    argv = sys.argv[1:]
+    server_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, server_args = argv[:split], argv[split + 1:]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="Running server to test (default: start one)")
+    parser.add_argument('--requests', type=int, default=200, help="Measured requests")
+    parser.add_argument('--concurrency', type=int, default=16, help="Client threads")
+    parser.add_argument('--upload', action='store_true', help="Send the audio bytes instead of a file path")
+    parser.add_argument('--audio-dir', help="Directory of audio files (default: synthetic tracks)")
+    parser.add_argument('--tracks', type=int, default=8, help="Number of synthetic tracks")
+    parser.add_argument('--seconds', type=float, default=30.0, help="Synthetic track length")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    if args.audio_dir:
+        paths = find_audio(args.audio_dir)
+    else:
+        tmp_dir = os.path.join(tempfile.gettempdir(), 'synthet_benchmark_audio')
+        paths = write_synthetic_tracks(tmp_dir, args.tracks, args.seconds, sr=44100)
+    if not paths:
+        raise SystemExit("No audio files found")
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server(server_args)
+    try:
+        health = wait_for_health(url.rstrip('/'), process)
+        results = run(url.rstrip('/'), paths, args.requests, args.concurrency, args.upload)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    results['server'] = {key: health[key] for key in ('workers', 'max_batch', 'max_wait_ms', 'genre_model')}
+
+    print(f"{results['requests']} requests, {results['concurrency']} clients, "
+          f"{health['workers']} workers, max batch {health['max_batch']}, errors {results['errors']}")
+    print(f"{'throughput':<12}{results['throughput_rps']:>10.1f} req/s")
+    for name in ('p50', 'p90', 'p99', 'mean'):
+        print(f"{name:<12}{results[f'latency_{name}_ms']:>10.1f} ms")
+    print(f"{'batch size':<12}{results['mean_batch_size']:>10.1f} mean, {results['max_batch_size']} max")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""Timings of the extraction, inference, preparation and training hot paths.
+
+Everything runs on deterministic synthetic audio (benchmarks/synthetic.py),
+so no dataset is needed and runs on the same machine are comparable:
+
+- analyze_audio stage by stage on one track: decode, STFT, tempo (both
+  methods), each spectral feature, MFCC, chroma and RMS, then end to end
+- predict_genre and MoodDetector.predict on one feature vector
+- prepare_fma_dataset on --tracks synthetic tracks laid out like fma_small
+- train_genre_classifier and train_mood_model on --train-rows rows
+
+Each timing is the median of --repeat runs (preparation and training run
+once per repeat as well).
+
+    python -m benchmarks.suite [--seconds S] [--sr SR] [--tracks N] [--only NAME ...]
+                               [--json OUT] [--baseline benchmarks/baseline.json]
+                               [--save-baseline benchmarks/baseline.json] [--threshold 1.25]
+
+With --baseline, every timing is compared against the stored run and the
+exit status is 1 if any is more than --threshold times slower. Baselines are
+only meaningful on the machine (and settings) that recorded them.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+import librosa
+import numpy as np
+import pandas as pd
+import sklearn
+from benchmarks.synthetic import write_synthetic_tracks
+from model_training.prepare_fma import prepare_fma_dataset
+from model_training.train_genre_model import train_genre_classifier
+from model_training.train_mood_model import train_mood_model
+from src.audio_processing import analyze_audio
+from src.deam_audio_processing import analyze_audio_deam
+from src.decoded_audio import DEFAULT_DECODE, configure_decode_cache, load_audio
+from src.feature_config import GENRE_SCHEMA, MOOD_SCHEMA
+from src.feature_engine import N_MFCC, Spectrogram, extract_features
+from src.genre_classifier import predict_genre
+from src.model_registry import get_mood_detector
+from src.tempo import estimate_tempo_from_onsets
+
+MODELS_DIR = './models'
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+GENRES = ('Electronic', 'Experimental', 'Folk', 'Hip-Hop', 'Instrumental', 'International', 'Pop', 'Rock')
+
+def time_runs(func, repeat, setup=None):
+    """Median, min and max wall time of `repeat` calls; `setup` runs untimed before each."""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {'median_seconds': statistics.median(runs), 'min_seconds': min(runs), 'max_seconds': max(runs),
+            'repeat': repeat}
+
+def bench_extraction(path, repeat):
+    """analyze_audio's stages on one track, each timed on its own."""
+    decode = DEFAULT_DECODE
+    audio = load_audio(path, sr=decode.sr, res_type=decode.res_type, cache=None)
+    y, sr = audio.y, audio.sr
+    spec = Spectrogram(y, sr)
+    onsets = spec.onset_envelope()
+    results = {
+        'decode': time_runs(lambda: load_audio(path, sr=decode.sr, res_type=decode.res_type, cache=None), repeat),
+        'stft': time_runs(lambda: Spectrogram(y, sr), repeat),
+        'onset_envelope': time_runs(spec.onset_envelope, repeat),
+        'tempo_autocorr': time_runs(lambda: estimate_tempo_from_onsets(onsets, spec.sr, spec.hop_length, 'autocorr'),
+                                    repeat),
+        'tempo_beat_track': time_runs(lambda: estimate_tempo_from_onsets(onsets, spec.sr, spec.hop_length,
+                                                                         'beat_track'), repeat),
+        'spectral_centroid': time_runs(spec.spectral_centroid, repeat),
+        'spectral_bandwidth': time_runs(spec.spectral_bandwidth, repeat),
+        'spectral_contrast': time_runs(spec.spectral_contrast, repeat),
+        'spectral_rolloff': time_runs(spec.spectral_rolloff, repeat),
+        'mfcc': time_runs(lambda: spec.mfcc(N_MFCC), repeat),
+        'chroma': time_runs(spec.chroma, repeat),
+        'rms': time_runs(lambda: librosa.feature.rms(y=y, frame_length=spec.frame_length, hop_length=spec.frame_hop),
+                         repeat),
+        'extract_features': time_runs(lambda: extract_features(y, sr), repeat),
+        'analyze_audio': time_runs(lambda: analyze_audio(path), repeat),
+    }
+    return {f'extract.{name}': result for name, result in results.items()}, {'audio_seconds': audio.seconds}
+
+def write_fma_layout(paths, fma_dir):
+    """Copy synthetic tracks into fma_small's `000/000001.mp3` layout with a tracks.csv next to it.
+
+    The files stay WAV data under an .mp3 name; the decoder goes by content.
+    """
+    audio_dir = os.path.join(fma_dir, 'audio')
+    track_ids = list(range(1, len(paths) + 1))
+    for track_id, path in zip(track_ids, paths):
+        tid = f'{track_id:06d}'
+        os.makedirs(os.path.join(audio_dir, tid[:3]), exist_ok=True)
+        shutil.copyfile(path, os.path.join(audio_dir, tid[:3], tid + '.mp3'))
+    columns = pd.MultiIndex.from_tuples([('set', 'subset'), ('track', 'genre_top')])
+    tracks = pd.DataFrame([['small', GENRES[i % len(GENRES)]] for i in range(len(paths))],
+                          index=pd.Index(track_ids, name='track_id'), columns=columns)
+    metadata_path = os.path.join(fma_dir, 'tracks.csv')
+    tracks.to_csv(metadata_path)
+    return audio_dir, metadata_path
+
+def bench_prepare(paths, work_dir, repeat, workers):
+    audio_dir, metadata_path = write_fma_layout(paths, os.path.join(work_dir, 'fma'))
+    output_path = os.path.join(work_dir, 'fma_features.npz')
+
+    def clean():
+        # Every run starts from scratch rather than resuming the previous one
+        shutil.rmtree(output_path + '.parts', ignore_errors=True)
+
+    def run():
+        failures = prepare_fma_dataset(audio_dir, metadata_path, output_path, workers=workers)
+        if failures:
+            raise RuntimeError(f"prepare_fma_dataset failed on {failures}")
+
+    result = time_runs(run, repeat, setup=clean)
+    result['tracks'] = len(paths)
+    result['workers'] = workers
+    return {'prepare.prepare_fma_dataset': result}
+
+def training_data(work_dir, rows, seed=0):
+    """Genre and mood `.npz` datasets of `rows` rows with their schema keys."""
+    rng = np.random.RandomState(seed)
+    genre_file = os.path.join(work_dir, 'genre_train.npz')
+    mood_file = os.path.join(work_dir, 'mood_train.npz')
+
+    # Genre rows: class-dependent Gaussian blobs, so the forest has structure to learn
+    labels = rng.randint(len(GENRES), size=rows)
+    centers = rng.randn(len(GENRES), GENRE_SCHEMA.size) * 2
+    X = centers[labels] + rng.randn(rows, GENRE_SCHEMA.size)
+    np.savez(genre_file, X=X.astype(GENRE_SCHEMA.dtype), y=np.array(GENRES)[labels], schema=GENRE_SCHEMA.key)
+
+    # Mood rows: valence/arousal as a noisy linear function of the features
+    X = rng.randn(rows, MOOD_SCHEMA.size)
+    y = 5 + X[:, :2] @ rng.randn(2, 2) * 0.5 + 0.1 * rng.randn(rows, 2)
+    np.savez(mood_file, X=X.astype(MOOD_SCHEMA.dtype), y=y, schema=MOOD_SCHEMA.key)
+    return genre_file, mood_file
+
+def bench_training(work_dir, rows, repeat):
+    genre_file, mood_file = training_data(work_dir, rows)
+    results = {
+        'train.train_genre_classifier': time_runs(
+            lambda: train_genre_classifier(genre_file, os.path.join(work_dir, 'genre_classifier.joblib'),
+                                           os.path.join(work_dir, 'genre_scaler.joblib')), repeat),
+        'train.train_mood_model': time_runs(
+            lambda: train_mood_model(mood_file, os.path.join(work_dir, 'mood_model.joblib'),
+                                     os.path.join(work_dir, 'mood_scaler.joblib')), repeat),
+    }
+    for result in results.values():
+        result['rows'] = rows
+    return results
+
+def bench_inference(path, work_dir, repeat, models_dir=MODELS_DIR):
+    genre_features, _ = analyze_audio(path)
+    model_file = os.path.join(work_dir, 'genre_classifier.joblib')
+    scaler_file = os.path.join(work_dir, 'genre_scaler.joblib')
+    if not os.path.exists(model_file):
+        genre_file, _ = training_data(work_dir, 1000)
+        train_genre_classifier(genre_file, model_file, scaler_file)
+    predict_genre(genre_features, model_file, scaler_file)  # Load once; the registry keeps it warm
+
+    mood_features = analyze_audio_deam(path)
+    detector = get_mood_detector(os.path.join(models_dir, 'mood_scaler.joblib'),
+                                 os.path.join(models_dir, 'mood_model.joblib'))
+    return {
+        'inference.predict_genre': time_runs(lambda: predict_genre(genre_features, model_file, scaler_file), repeat),
+        'inference.mood_predict': time_runs(lambda: detector.predict(mood_features), repeat),
+    }
+
+SECTIONS = ('extract', 'prepare', 'train', 'inference')
+
+def run(args):
+    # Every timing includes its own decode; the process-wide cache would skip it after the first run
+    configure_decode_cache(0)
+    tmp_dir = os.path.join(tempfile.gettempdir(), 'synthet_benchmark_audio')
+    paths = write_synthetic_tracks(tmp_dir, args.tracks, args.seconds, sr=args.sr)
+    sections = args.only or SECTIONS
+    results = {}
+    info = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        if 'extract' in sections:
+            extraction, info = bench_extraction(paths[0], args.repeat)
+            results.update(extraction)
+        if 'prepare' in sections:
+            results.update(bench_prepare(paths, work_dir, max(1, args.repeat // 2), args.workers))
+        if 'train' in sections:
+            results.update(bench_training(work_dir, args.train_rows, max(1, args.repeat // 2)))
+        if 'inference' in sections:
+            results.update(bench_inference(paths[0], work_dir, args.repeat * 20))
+    return {
+        'config': {'seconds': args.seconds, 'sr': args.sr, 'tracks': args.tracks, 'repeat': args.repeat,
+                   'train_rows': args.train_rows, 'workers': args.workers, **info},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count(), 'numpy': np.__version__, 'librosa': librosa.__version__,
+                        'sklearn': sklearn.__version__},
+        'results': results,
+    }
+
+def compare(report, baseline, threshold):
+    """`{name: current / baseline}` for every timing in both, and the names over `threshold`."""
+    ratios = {}
+    for name, result in report['results'].items():
+        reference = baseline['results'].get(name)
+        if reference and reference['median_seconds'] > 0:
+            ratios[name] = result['median_seconds'] / reference['median_seconds']
+    return ratios, sorted(name for name, ratio in ratios.items() if ratio > threshold)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=30.0, help="Synthetic track length")
+    parser.add_argument('--sr', type=int, default=44100, help="Synthetic track sample rate")
+    parser.add_argument('--tracks', type=int, default=8, help="Tracks for prepare_fma_dataset")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per timing (halved for prepare and train)")
+    parser.add_argument('--train-rows', type=int, default=2000, help="Rows in the training datasets")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes for prepare_fma_dataset")
+    parser.add_argument('--only', nargs='+', choices=SECTIONS, help="Run only these sections")
+    parser.add_argument('--json', help="Write the report to this file")
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE, help="Compare against this report")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help="Store the report as a baseline")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')  # sklearn version warnings from the shipped models
+    report = run(args)
+
+    ratios, regressions = {}, []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        ratios, regressions = compare(report, baseline, args.threshold)
+        report['baseline'] = {'path': args.baseline, 'ratios': ratios, 'threshold': args.threshold,
+                              'regressions': regressions}
+
+    print(f"{'benchmark':<34}{'median ms':>12}{'min ms':>10}" + (f"{'vs base':>10}" if ratios else ''))
+    for name, result in report['results'].items():
+        line = f"{name:<34}{1000 * result['median_seconds']:>12.2f}{1000 * result['min_seconds']:>10.2f}"
+        if name in ratios:
+            line += f"{ratios[name]:>9.2f}x" + ('  REGRESSION' if name in regressions else '')
+        print(line)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+    if regressions:
+        print(f"{len(regressions)} timings more than {args.threshold}x slower than the baseline", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Agreement and speed of the tempo estimators in src.tempo.TEMPO_METHODS.
+
+Each track's onset envelope is computed once from the shared spectrogram and
+handed to every estimator, so the timings cover tempo estimation only. Every
+method is compared against 'beat_track' (the original pipeline): exact
+agreement, agreement within 2%, and octave errors (ratio of 1/2, 2, 1/3 or 3
+within 2%).
+
+    python -m benchmarks.tempo_agreement [--audio-dir DIR] [--json OUT]
+
+Without --audio-dir, deterministic synthetic tracks at 44.1 kHz are used.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from benchmarks.synthetic import write_synthetic_tracks
+from src.decoded_audio import load_audio
+from src.feature_engine import Spectrogram
+from src.tempo import TEMPO_METHODS, estimate_tempo_from_onsets
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg')
+REFERENCE_METHOD = 'beat_track'
+TOLERANCE = 0.02
+OCTAVE_RATIOS = (0.5, 2.0, 1 / 3, 3.0)
+
+def find_audio(audio_dir):
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(audio_dir)
+                  for name in names if name.lower().endswith(AUDIO_EXTENSIONS))
+
+def estimate_all(paths):
+    tempos = {method: [] for method in TEMPO_METHODS}
+    seconds = dict.fromkeys(TEMPO_METHODS, 0.0)
+    for path in paths:
+        audio = load_audio(path, cache=None)
+        spec = Spectrogram(audio.y, audio.sr)
+        onset_env = spec.onset_envelope()
+        for method in TEMPO_METHODS:
+            start = time.perf_counter()
+            tempos[method].append(estimate_tempo_from_onsets(onset_env, spec.sr, spec.hop_length, method))
+            seconds[method] += time.perf_counter() - start
+    return {method: np.array(values) for method, values in tempos.items()}, seconds
+
+def compare(paths):
+    tempos, seconds = estimate_all(paths)
+    reference = tempos[REFERENCE_METHOD]
+    safe_reference = np.where(reference > 0, reference, np.nan)
+    results = {}
+    for method in TEMPO_METHODS:
+        with np.errstate(invalid='ignore'):
+            ratio = tempos[method] / safe_reference
+            within = np.abs(ratio - 1) <= TOLERANCE
+            octave = np.any([np.abs(ratio / r - 1) <= TOLERANCE for r in OCTAVE_RATIOS], axis=0)
+        results[method] = {
+            'seconds_per_track': seconds[method] / len(paths),
+            'exact_agreement': float(np.mean(tempos[method] == reference)),
+            'within_2pct': float(np.mean(within | (tempos[method] == reference))),
+            'octave_errors': float(np.mean(octave)),
+            'max_abs_bpm_delta': float(np.max(np.abs(tempos[method] - reference))),
+            'tempos': tempos[method].tolist(),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio-dir', help="Directory of audio files (default: synthetic tracks)")
+    parser.add_argument('--tracks', type=int, default=24, help="Number of synthetic tracks")
+    parser.add_argument('--seconds', type=float, default=30.0, help="Synthetic track length")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.audio_dir:
+        paths = find_audio(args.audio_dir)
+    else:
+        tmp_dir = os.path.join(tempfile.gettempdir(), 'synthet_benchmark_audio')
+        paths = write_synthetic_tracks(tmp_dir, args.tracks, args.seconds, sr=44100)
+    if not paths:
+        raise SystemExit("No audio files found")
+
+    results = compare(paths)
+    print(f"{len(paths)} tracks, reference: {REFERENCE_METHOD}")
+    print(f"{'method':<12}{'ms/track':>10}{'exact':>8}{'within 2%':>11}{'octave':>8}{'max |dBPM|':>12}")
+    for method, entry in results.items():
+        print(f"{method:<12}{1000 * entry['seconds_per_track']:>10.2f}{entry['exact_agreement']:>8.2f}"
+              f"{entry['within_2pct']:>11.2f}{entry['octave_errors']:>8.2f}{entry['max_abs_bpm_delta']:>12.3f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
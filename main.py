@@ -1,8 +1,9 @@
 import sys
 from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QVBoxLayout
+from src.log_config import configure_logging
 
-from src.ui import AudioAnalyzerApp
-from src.preparation_ui import PreparationApp
+# Each application is imported when it is chosen: their audio, plotting and
+# ML dependencies take seconds to load and the chooser needs none of them.
 
 class ChoiceWindow(QWidget):
     def __init__(self):
@@ -26,16 +27,21 @@ class ChoiceWindow(QWidget):
 
 
     def run_main_app(self):
+        from src.ui import AudioAnalyzerApp
+
         self.hide()
         self.main_app = AudioAnalyzerApp()
         self.main_app.show()
 
     def run_prep_app(self):
+        from src.preparation_ui import PreparationApp
+
         self.hide()
         self.prep_app = PreparationApp()
         self.prep_app.show()
 
 def main():
+    configure_logging()
     app = QApplication(sys.argv)
     ex = ChoiceWindow()
     ex.show()
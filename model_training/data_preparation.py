@@ -1,49 +1,38 @@
+import logging
 import os
 import pandas as pd
 import numpy as np
-import librosa
+from src.feature_config import GENRE_SCHEMA
+from src.log_config import RunSummary
+from model_training.prepare_fma import extract_features
+
+logger = logging.getLogger(__name__)
 
 def load_metadata(metadata_path):
-    print(f"Attempting to load metadata from {metadata_path}")
+    logger.info("Loading metadata from %s", metadata_path)
     try:
         tracks = pd.read_csv(metadata_path, index_col=0, header=[0, 1])
         
         # Filter for only the small dataset
         small_dataset = tracks[tracks[('set', 'subset')] == 'small']
         
-        print(f"Successfully loaded {len(small_dataset)} tracks from fma_small metadata")
+        logger.info("Loaded %d tracks from fma_small metadata", len(small_dataset))
         return small_dataset
     except Exception as e:
-        print(f"Error loading metadata: {e}")
+        logger.error("Error loading metadata: %s", e)
         raise
 
 def get_audio_path(audio_dir, track_id):
     tid_str = '{:06d}'.format(track_id)
     return os.path.join(audio_dir, tid_str[:3], tid_str + '.mp3')
 
-def extract_features(file_path):
-    y, sr = librosa.load(file_path, duration=30)
-    spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr).mean()
-    spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr).mean()
-    spectral_contrast = librosa.feature.spectral_contrast(y=y, sr=sr).mean()
-    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-    mfcc_means = mfccs.mean(axis=1)
-    chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-    chroma_means = chroma.mean(axis=1)
-    
-    features = np.concatenate([
-        [spectral_centroid, spectral_bandwidth, spectral_contrast],
-        mfcc_means,
-        chroma_means
-    ])
-    return features
-
 def prepare_dataset(audio_dir, metadata_path, output_path, num_files=None):
     tracks = load_metadata(metadata_path)
     
     features = []
     genres = []
     processed_count = 0
+    summary = RunSummary(logger, 'track')
     
     for index, row in tracks.iterrows():
         if num_files is not None and processed_count >= num_files:
@@ -56,18 +45,18 @@ def prepare_dataset(audio_dir, metadata_path, output_path, num_files=None):
                 features.append(feature)
                 genres.append(row['track', 'genre_top'])
                 processed_count += 1
-                print(f"Successfully processed {file_path} ({processed_count}/{num_files if num_files else len(tracks)})")
+                summary.success(file_path)
             except Exception as e:
-                print(f"Error processing {file_path}: {e}")
+                summary.failure(file_path, f"{type(e).__name__}: {e}")
         else:
-            print(f"File does not exist: {file_path}")
+            summary.failure(file_path, "FileNotFoundError: file does not exist")
 
-    X = np.array(features)
+    X = np.array(features, dtype=GENRE_SCHEMA.dtype)
     y = np.array(genres)
     
-    np.savez(output_path, X=X, y=y)
-    print(f"Dataset saved to {output_path}")
-    print(f"Total tracks processed: {len(X)}")
+    np.savez(output_path, X=X, y=y, schema=np.array(GENRE_SCHEMA.key))
+    summary.finish(output=os.fspath(output_path), rows=len(X))
+    logger.info("Dataset saved to %s", output_path)
     pass
 
 __all__ = ['prepare_dataset']
\ No newline at end of file
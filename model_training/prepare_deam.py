@@ -1,86 +1,116 @@
+import logging
 import os
+from functools import partial
 import pandas as pd
 import numpy as np
-from src.deam_audio_processing import analyze_audio_deam, get_feature_count, debug_feature_extraction
+from src.deam_audio_processing import analyze_audio_deam, debug_feature_extraction
+from src.feature_config import MOOD_SCHEMA
+from src.instrumentation import record_spans
+from src.log_config import RunSummary, configure_logging
+from src.parallel import bounded_map
+from src.decoded_audio import DEFAULT_DECODE
+from src.tempo import DEFAULT_TEMPO_METHOD
+from model_training.shard_store import ShardWriter
+
+logger = logging.getLogger(__name__)
 
 def load_annotations(annotations_file):
-    print(f"Loading annotations from {annotations_file}")
+    logger.info("Loading annotations from %s", annotations_file)
     try:
         annotations = pd.read_csv(annotations_file)
-        print(f"Successfully loaded {len(annotations)} annotations")
-        print(f"Columns in the annotation file: {annotations.columns}")
+        logger.info("Loaded %d annotations", len(annotations))
+        logger.debug("Columns in the annotation file: %s", list(annotations.columns))
         return annotations
     except Exception as e:
-        print(f"Error loading annotations: {e}")
+        logger.error("Error loading annotations: %s", e)
         raise
 
 def get_audio_path(audio_dir, song_id):
     return os.path.join(audio_dir, f"{int(song_id)}.mp3")
 
-def prepare_deam_dataset(audio_dir, annotations_file, output_file, num_files=None, progress_callback=None):
+def _extract_song(job, cache=None, decode=DEFAULT_DECODE, tempo_method=DEFAULT_TEMPO_METHOD):
+    song_id, file_path = job
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File does not exist: {file_path}")
+    audio_features = analyze_audio_deam(file_path, cache=cache, decode=decode, tempo_method=tempo_method)
+    MOOD_SCHEMA.check_width(len(audio_features), file_path)
+    return audio_features
+
+def prepare_deam_dataset(audio_dir, annotations_file, output_file, num_files=None, progress_callback=None, cache=None,
+                         work_dir=None, shard_size=256, workers=1, chunksize=8, decode=DEFAULT_DECODE,
+                         tempo_method=DEFAULT_TEMPO_METHOD, observer=None, skip_failed=False, debug=False):
+    """Extract DEAM features into `output_file`, checkpointing to `work_dir` as it goes.
+
+    Rerunning with the same `work_dir` (default: `output_file + '.parts'`)
+    skips every song already extracted into its manifest, and retries the
+    songs that failed unless `skip_failed` is set. With `workers > 1`
+    songs are decoded in a process pool, `chunksize` at a time; rows are
+    still written in annotation order. Returns `{song_id: error}` for every
+    song that could not be processed. `observer` receives the workers' stage
+    spans (see src.instrumentation) as each song finishes. `debug=True` first
+    logs every feature of the first song computed separately (an extra
+    decode), for checking the extraction.
+    """
     annotations = load_annotations(annotations_file)
     
     if num_files is not None:
         annotations = annotations.head(num_files)
+
+    if 'valence_mean' not in annotations.columns or 'arousal_mean' not in annotations.columns:
+        raise ValueError(f"Missing valence or arousal columns. Available columns: {list(annotations.columns)}")
     
     total_files = len(annotations)
-    features = []
-    labels = []
-    
-    for index, row in annotations.iterrows():
-        try:
-            song_id = row['song_id']
-            file_path = get_audio_path(audio_dir, song_id)
-            
-            if os.path.exists(file_path):
-                # Debug: Print feature shapes for the first file
-                if index == 0:
-                    print(f"Debugging first file: {file_path}")
-                    debug_feature_extraction(file_path)
-                
-                audio_features = analyze_audio_deam(file_path)
-                if audio_features is not None:
-                    if 'valence_mean' in row and 'arousal_mean' in row:
-                        valence = row['valence_mean']
-                        arousal = row['arousal_mean']
-                        features.append(audio_features)
-                        labels.append([valence, arousal])
-                        print(f"Processed {file_path} ({index+1}/{total_files})")
-                    else:
-                        print(f"Missing valence or arousal for {file_path}. Available columns: {row.index}")
-                else:
-                    print(f"Failed to extract features from {file_path}")
-            else:
-                print(f"File does not exist: {file_path}")
-        except Exception as e:
-            print(f"Error processing row {index}: {e}")
-            print(f"Row content: {row}")
-        
+    store = ShardWriter(work_dir or output_file + '.parts', MOOD_SCHEMA, shard_size=shard_size,
+                        skip_failed=skip_failed)
+    if store.completed or store.failed:
+        logger.info("Resuming: %d songs already done, %d failed before (%s)", len(store.completed),
+                    len(store.failed), 'skipped' if skip_failed else 'retrying')
+
+    labels = {}
+    jobs = []
+    for song_id, valence, arousal in zip(annotations['song_id'], annotations['valence_mean'], annotations['arousal_mean']):
+        if song_id not in store:
+            labels[song_id] = [valence, arousal]
+            jobs.append((song_id, get_audio_path(audio_dir, song_id)))
+
+    if debug and jobs and os.path.exists(jobs[0][1]):
+        logger.info("Debugging first file: %s", jobs[0][1])
+        debug_feature_extraction(jobs[0][1])
+
+    already_done = total_files - len(jobs)
+    extract = partial(_extract_song, cache=cache, decode=decode, tempo_method=tempo_method)
+    if observer is not None:
+        extract = partial(record_spans, extract)
+    results = bounded_map(extract, jobs, max_workers=workers, chunksize=chunksize)
+    summary = RunSummary(logger, 'song')
+
+    for index, ((song_id, file_path), ok, value) in enumerate(results, start=already_done + 1):
+        if ok and observer is not None:
+            value, spans = value
+            for span in spans:
+                observer(span)
+        if ok:
+            summary.success(song_id)
+            store.add(song_id, value, labels[song_id])
+        else:
+            summary.failure(song_id, value)
+            store.mark_failed(song_id, value)
+
         if progress_callback:
-            progress = int((index + 1) / total_files * 100)
+            progress = int(index / total_files * 100)
             progress_callback(progress)
 
-    if not features:
+    if store.row_count == 0:
         raise ValueError("No valid features extracted. Check your audio files and annotations.")
 
-    X = np.array(features)
-    y = np.array(labels)
-    
-    print(f"Shape of X before saving: {X.shape}")
-    print(f"Shape of y before saving: {y.shape}")
-    print(f"Expected feature count: {get_feature_count()}")
-    
-    if X.shape[0] != y.shape[0]:
-        raise ValueError(f"Mismatch in number of features ({X.shape[0]}) and labels ({y.shape[0]})")
-    
-    if X.shape[1] != get_feature_count():
-        raise ValueError(f"Mismatch in feature count. Expected {get_feature_count()}, got {X.shape[1]}")
-    
-    np.savez(output_file, X=X, y=y)
-    print(f"Dataset saved to {output_file}")
-    print(f"Total tracks processed: {len(X)}")
+    total_rows = store.finalize(output_file)
+    failures = store.failed
+    summary.finish(output=os.fspath(output_file), rows=total_rows, resumed=already_done)
+    logger.info("Dataset saved to %s (%d rows, %d failed in total)", output_file, total_rows, len(failures))
+    return failures
 
 if __name__ == "__main__":
+    configure_logging()
     audio_dir = r"F:\Audio Data Sets\DEAM\MEMD_audio"
     annotations_file = r"F:\Audio Data Sets\DEAM\annotations\annotations.csv"
     output_file = "deam_features.npz"
@@ -1,78 +1,111 @@
+import logging
 import os
+from functools import partial
 import pandas as pd
-import numpy as np
-import librosa
+from src.feature_config import GENRE_SCHEMA
+from src.feature_engine import extract_features as extract_genre_features, SAMPLE_RATE, HOP_LENGTH
+from src.decoded_audio import DEFAULT_DECODE, load_audio
+from src.tempo import DEFAULT_TEMPO_METHOD, tempo_cache_params
+from src.instrumentation import record_spans
+from src.log_config import RunSummary, configure_logging
+from src.parallel import bounded_map
+from model_training.shard_store import ShardWriter
+
+logger = logging.getLogger(__name__)
 
 def load_metadata(metadata_path):
-    print(f"Attempting to load metadata from {metadata_path}")
+    logger.info("Loading metadata from %s", metadata_path)
     try:
         tracks = pd.read_csv(metadata_path, index_col=0, header=[0, 1])
         
         # Filter for only the small dataset
         small_dataset = tracks[tracks[('set', 'subset')] == 'small']
         
-        print(f"Successfully loaded {len(small_dataset)} tracks from fma_small metadata")
+        logger.info("Loaded %d tracks from fma_small metadata", len(small_dataset))
         return small_dataset
     except Exception as e:
-        print(f"Error loading metadata: {e}")
+        logger.error("Error loading metadata: %s", e)
         raise
 
 def get_audio_path(audio_dir, track_id):
     tid_str = '{:06d}'.format(track_id)
     return os.path.join(audio_dir, tid_str[:3], tid_str + '.mp3')
 
-def extract_features(file_path):
-    y, sr = librosa.load(file_path, duration=30)
-    spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr).mean()
-    spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr).mean()
-    spectral_contrast = librosa.feature.spectral_contrast(y=y, sr=sr).mean()
-    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-    mfcc_means = mfccs.mean(axis=1)
-    chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-    chroma_means = chroma.mean(axis=1)
-    
-    features = np.concatenate([
-        [spectral_centroid, spectral_bandwidth, spectral_contrast],
-        mfcc_means,
-        chroma_means
-    ])
-    return features
+def extract_features(file_path, cache=None, decode=DEFAULT_DECODE, tempo_method=DEFAULT_TEMPO_METHOD):
+    """GENRE_SCHEMA features of a 30-second FMA clip, the same vector analyze_audio computes at inference."""
+    if cache is not None:
+        return cache.get_or_compute(file_path, 'fma',
+                                    lambda: extract_features(file_path, decode=decode, tempo_method=tempo_method),
+                                    sr=SAMPLE_RATE, hop_length=HOP_LENGTH, duration=30,
+                                    **decode.cache_params(), **tempo_cache_params(tempo_method))
+
+    audio = load_audio(file_path, sr=decode.sr, duration=30, cache=None, res_type=decode.res_type)
+    return extract_genre_features(audio.y, audio.sr, tempo_method=tempo_method)
+
+def _extract_track(job, cache=None, decode=DEFAULT_DECODE, tempo_method=DEFAULT_TEMPO_METHOD):
+    track_id, file_path = job
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File does not exist: {file_path}")
+    return extract_features(file_path, cache=cache, decode=decode, tempo_method=tempo_method)
+
+def prepare_fma_dataset(audio_dir, metadata_path, output_path, num_files=None, progress_callback=None, cache=None,
+                        work_dir=None, shard_size=256, workers=1, chunksize=8, decode=DEFAULT_DECODE,
+                        tempo_method=DEFAULT_TEMPO_METHOD, observer=None, skip_failed=False):
+    """Extract FMA features into `output_path`, checkpointing to `work_dir` as it goes.
 
-def prepare_fma_dataset(audio_dir, metadata_path, output_path, num_files=None, progress_callback=None):
+    Rerunning with the same `work_dir` (default: `output_path + '.parts'`)
+    skips every track already extracted into its manifest, and retries the
+    tracks that failed unless `skip_failed` is set. With `workers > 1`
+    tracks are decoded in a process pool, `chunksize` at a time; rows are
+    still written in metadata order. Returns `{track_id: error}` for every
+    track that could not be processed. `observer` receives the workers' stage
+    spans (see src.instrumentation) as each track finishes.
+    """
     tracks = load_metadata(metadata_path)
     
     if num_files is not None:
         tracks = tracks.head(num_files)
     
     total_files = len(tracks)
-    features = []
-    genres = []
-    
-    for index, (track_id, row) in enumerate(tracks.iterrows()):
-        file_path = get_audio_path(audio_dir, track_id)
-        if os.path.exists(file_path):
-            try:
-                feature = extract_features(file_path)
-                features.append(feature)
-                genres.append(row['track', 'genre_top'])
-                print(f"Successfully processed {file_path} ({index+1}/{total_files})")
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}")
+    genres = tracks['track', 'genre_top']
+    store = ShardWriter(work_dir or output_path + '.parts', GENRE_SCHEMA, shard_size=shard_size,
+                        skip_failed=skip_failed)
+    if store.completed or store.failed:
+        logger.info("Resuming: %d tracks already done, %d failed before (%s)", len(store.completed),
+                    len(store.failed), 'skipped' if skip_failed else 'retrying')
+
+    jobs = [(track_id, get_audio_path(audio_dir, track_id)) for track_id in tracks.index if track_id not in store]
+    already_done = total_files - len(jobs)
+    extract = partial(_extract_track, cache=cache, decode=decode, tempo_method=tempo_method)
+    if observer is not None:
+        extract = partial(record_spans, extract)
+    results = bounded_map(extract, jobs, max_workers=workers, chunksize=chunksize)
+    summary = RunSummary(logger, 'track')
+
+    for index, ((track_id, file_path), ok, value) in enumerate(results, start=already_done + 1):
+        if ok and observer is not None:
+            value, spans = value
+            for span in spans:
+                observer(span)
+        if ok:
+            summary.success(track_id)
+            store.add(track_id, value, genres.loc[track_id])
         else:
-            print(f"File does not exist: {file_path}")
+            summary.failure(track_id, value)
+            store.mark_failed(track_id, value)
 
         if progress_callback:
-            progress = int((index + 1) / total_files * 100)
+            progress = int(index / total_files * 100)
             progress_callback(progress)
 
-    X = np.array(features)
-    y = np.array(genres)
-    
-    np.savez(output_path, X=X, y=y)
-    print(f"Dataset saved to {output_path}")
-    print(f"Total tracks processed: {len(X)}")   
+    total_rows = store.finalize(output_path)
+    failures = store.failed
+    summary.finish(output=os.fspath(output_path), rows=total_rows, resumed=already_done)
+    logger.info("Dataset saved to %s (%d rows, %d failed in total)", output_path, total_rows, len(failures))
+    return failures
    
 if __name__ == "__main__":
+    configure_logging()
     audio_dir = r"F:\Audio Data Sets\FMA\fma_small"
     metadata_path = r"F:\Audio Data Sets\FMA\fma_metadata\tracks.csv"
     output_path = "F:\Audio Data Sets\FMA\fma_small_features.npz"
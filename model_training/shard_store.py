@@ -0,0 +1,164 @@
+import json
+import os
+import shutil
+import numpy as np
+from numpy.lib.format import open_memmap
+from src.feature_cache import config_fingerprint
+from src.feature_store import FeatureStore
+
+MANIFEST_NAME = 'manifest.json'
+
+def _normalize_id(track_id):
+    # Manifest ids round-trip through JSON, so keep them as plain ints or strings
+    try:
+        return int(track_id)
+    except (TypeError, ValueError):
+        return str(track_id)
+
+def _write_json_atomic(path, payload):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+class ShardWriter:
+    """Append-only, checkpointed store for dataset preparation.
+
+    Rows are buffered and written `shard_size` at a time to numbered `.npz`
+    shards in `work_dir`. After each shard is on disk, `manifest.json` records it
+    along with the ids of the tracks it holds under `completed`, and the errors
+    of tracks that failed under `failed`, so an interrupted run loses at most
+    one partial shard and a new `ShardWriter` on the same directory resumes
+    from the manifest. Failed tracks are tried again on resume unless
+    `skip_failed` is set. Rows must match `schema`, which is recorded in the
+    manifest and in the assembled dataset.
+    """
+
+    def __init__(self, work_dir, schema, shard_size=256, skip_failed=False):
+        self.work_dir = work_dir
+        self.schema = schema
+        self.shard_size = shard_size
+        self.skip_failed = skip_failed
+        self.manifest_path = os.path.join(work_dir, MANIFEST_NAME)
+        os.makedirs(work_dir, exist_ok=True)
+
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+            if self.manifest['config'] != config_fingerprint() or self.manifest.get('schema') != schema.key:
+                raise ValueError(f"Checkpoint in {work_dir} was written with a different feature config. "
+                                 "Delete it to start over.")
+            # Earlier manifests also listed failed tracks as completed
+            failed_ids = {_normalize_id(key) for key in self.manifest['failed']}
+            self.manifest['completed'] = [track_id for track_id in self.manifest['completed']
+                                          if track_id not in failed_ids]
+        else:
+            self.manifest = {'config': config_fingerprint(), 'schema': schema.key, 'shards': [], 'completed': [],
+                             'failed': {}}
+
+        self.completed = set(self.manifest['completed'])
+        self._ids = []
+        self._features = []
+        self._labels = []
+        self._pending_failed = {}
+
+    def __contains__(self, track_id):
+        track_id = _normalize_id(track_id)
+        return track_id in self.completed or (self.skip_failed and str(track_id) in self.manifest['failed'])
+
+    @property
+    def row_count(self):
+        return sum(shard['rows'] for shard in self.manifest['shards']) + len(self._features)
+
+    @property
+    def failed(self):
+        return {**self.manifest['failed'], **self._pending_failed}
+
+    def add(self, track_id, features, label):
+        self.schema.check_width(len(features), f"track {track_id}")
+        self._ids.append(_normalize_id(track_id))
+        self._features.append(features)
+        self._labels.append(label)
+        if len(self._features) >= self.shard_size:
+            self.flush()
+
+    def mark_failed(self, track_id, message):
+        self._pending_failed[str(_normalize_id(track_id))] = message
+
+    def flush(self):
+        if not self._features and not self._pending_failed:
+            return
+
+        if self._features:
+            shard_name = f"shard-{len(self.manifest['shards']):05d}.npz"
+            shard_path = os.path.join(self.work_dir, shard_name)
+            tmp_path = shard_path + '.tmp.npz'
+            np.savez(tmp_path, X=np.array(self._features, dtype=self.schema.dtype), y=np.array(self._labels), ids=np.array(self._ids))
+            os.replace(tmp_path, shard_path)
+            self.manifest['shards'].append({'file': shard_name, 'rows': len(self._features),
+                                            'n_features': len(self._features[0])})
+            self.manifest['completed'].extend(self._ids)
+            for track_id in self._ids:
+                # A retried track that now succeeded
+                self.manifest['failed'].pop(str(track_id), None)
+
+        self.manifest['failed'].update(self._pending_failed)
+
+        _write_json_atomic(self.manifest_path, self.manifest)
+        self.completed = set(self.manifest['completed'])
+        self._ids, self._features, self._labels = [], [], []
+        self._pending_failed = {}
+
+    def finalize(self, output_path, keep_shards=False):
+        """Assemble every shard into one `.npz` with `X`, `y` and `ids`.
+
+        `X` is copied shard by shard into a memory-mapped scratch array, so the
+        full matrix never has to be resident at once. An `output_path` that
+        does not end in `.npz` is written as a FeatureStore directory instead,
+        appending one shard at a time.
+        """
+        self.flush()
+        shards = self.manifest['shards']
+        if not shards:
+            raise ValueError("No rows to assemble; every track failed or was skipped.")
+
+        total_rows = self.row_count
+        if not output_path.endswith('.npz'):
+            self._finalize_store(output_path)
+            if not keep_shards:
+                shutil.rmtree(self.work_dir)
+            return total_rows
+
+        with np.load(os.path.join(self.work_dir, shards[0]['file'])) as first:
+            dtype = first['X'].dtype
+        scratch_path = os.path.join(self.work_dir, 'X.scratch.npy')
+        X = open_memmap(scratch_path, mode='w+', dtype=dtype, shape=(total_rows, shards[0]['n_features']))
+
+        labels = []
+        ids = []
+        offset = 0
+        for shard in shards:
+            with np.load(os.path.join(self.work_dir, shard['file'])) as data:
+                X[offset:offset + shard['rows']] = data['X']
+                labels.append(data['y'])
+                ids.append(data['ids'])
+            offset += shard['rows']
+        X.flush()
+
+        np.savez(output_path, X=X, y=np.concatenate(labels), ids=np.concatenate(ids), schema=np.array(self.schema.key))
+        del X
+        if keep_shards:
+            os.remove(scratch_path)
+        else:
+            shutil.rmtree(self.work_dir)
+        return total_rows
+
+    def _finalize_store(self, store_dir):
+        shards = self.manifest['shards']
+        store = FeatureStore.create(store_dir, self.schema, overwrite=True)
+        for shard in shards:
+            with np.load(os.path.join(self.work_dir, shard['file'])) as data:
+                store.append(data['X'], data['y'], data['ids'])
+        return store
+
+__all__ = ['ShardWriter']
@@ -1,60 +1,57 @@
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
 import joblib
-
-def train_genre_classifier(data_file, model_output, scaler_output, progress_callback=None):
+import logging
+from src.feature_config import GENRE_SCHEMA
+from src.genre_classifier import train_genre_classifier
+from src.log_config import configure_logging
+from src.feature_store import open_feature_store
+from src.training import DEFAULT_STREAM_BATCH, fit_scaler_streaming, fit_streaming, score_streaming, store_classes
+
+logger = logging.getLogger(__name__)
+
+def train_genre_classifier_streaming(store_dir, model_output, scaler_output, progress_callback=None, epochs=5,
+                                     batch_size=DEFAULT_STREAM_BATCH, time_budget=None):
+    """Train a genre classifier out of core from the feature store `store_dir`.
+
+    Reads the store `batch_size` rows at a time, so memory stays bounded
+    however many rows it holds. The model is a logistic-loss SGDClassifier
+    trained for `epochs` passes, since a random forest needs every row at once.
+    Returns the train and held-out scores.
+    """
     if progress_callback:
         progress_callback(0)
 
-    # Load the data
-    data = np.load(data_file)
-    X, y = data['X'], data['y']
-
-    if progress_callback:
-        progress_callback(10)
+    store = open_feature_store(store_dir, schema=GENRE_SCHEMA)
+    split = {'batch_size': batch_size, 'test_size': 0.2, 'random_state': 42}
+    classes = store_classes(store, batch_size)
 
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
+    scaler = fit_scaler_streaming(StandardScaler(), store, dtype=GENRE_SCHEMA.dtype, **split)
     if progress_callback:
         progress_callback(20)
 
-    # Scale the features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
-    if progress_callback:
-        progress_callback(30)
+    clf = SGDClassifier(loss='log_loss', random_state=42)
+    epoch_progress = (lambda fraction: progress_callback(20 + int(60 * fraction))) if progress_callback else None
+    fit_streaming(clf, store, scaler, epochs=epochs, classes=classes, dtype=GENRE_SCHEMA.dtype,
+                  progress_callback=epoch_progress, time_budget=time_budget, **split)
 
-    # Train the classifier
-    clf = RandomForestClassifier(n_estimators=100, random_state=42)
-    clf.fit(X_train_scaled, y_train)
-    
-    if progress_callback:
-        progress_callback(70)
-
-    # Evaluate the classifier
-    train_score = clf.score(X_train_scaled, y_train)
-    test_score = clf.score(X_test_scaled, y_test)
-    print(f"Train accuracy: {train_score:.2f}")
-    print(f"Test accuracy: {test_score:.2f}")
-    
+    scores = score_streaming(clf, store, scaler, dtype=GENRE_SCHEMA.dtype, **split)
+    logger.info("Train accuracy: %.2f, test accuracy: %.2f", scores['train']['accuracy'] or 0.0,
+                scores['test']['accuracy'] or 0.0, extra={'train_accuracy': scores['train']['accuracy'],
+                                                         'test_accuracy': scores['test']['accuracy']})
     if progress_callback:
-        progress_callback(80)
+        progress_callback(90)
 
-    # Save the model and scaler
+    GENRE_SCHEMA.stamp(clf, scaler)
     joblib.dump(clf, model_output)
     joblib.dump(scaler, scaler_output)
-    
     if progress_callback:
         progress_callback(100)
-
-    print("Model and scaler saved successfully.")
+    logger.info("Model and scaler saved to %s and %s", model_output, scaler_output)
+    return scores
 
 if __name__ == "__main__":
+    configure_logging()
     # This block allows you to run the script directly for testing
     data_file = "path/to/your/fma_features_subset.npz"
     model_output = "genre_classifier.joblib"
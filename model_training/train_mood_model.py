@@ -1,18 +1,26 @@
+import logging
 import numpy as np
 from src.mood_detector import MoodDetector
+from src.feature_config import MOOD_SCHEMA
+from src.feature_store import load_dataset, open_feature_store
+from src.training import DEFAULT_STREAM_BATCH, fit_scaler_streaming, fit_streaming, score_streaming
+from src.log_config import configure_logging
 
-def train_mood_model(data_file, model_output, scaler_output, progress_callback=None):
+logger = logging.getLogger(__name__)
+
+def train_mood_model(data_file, model_output, scaler_output, progress_callback=None, time_budget=None):
+    """Train the mood model on `data_file`; `time_budget` caps the MLP training time in seconds."""
     if progress_callback:
         progress_callback(0)
 
-    data = np.load(data_file)
-    X, y = data['X'], data['y']
+    X, y = load_dataset(data_file, schema=MOOD_SCHEMA)
 
     if progress_callback:
         progress_callback(10)
 
     detector = MoodDetector()
-    detector.train(X, y)
+    epoch_progress = (lambda fraction: progress_callback(10 + int(70 * fraction))) if progress_callback else None
+    detector.train(X, y, progress_callback=epoch_progress, time_budget=time_budget)
 
     if progress_callback:
         progress_callback(80)
@@ -22,9 +30,52 @@ def train_mood_model(data_file, model_output, scaler_output, progress_callback=N
     if progress_callback:
         progress_callback(100)
         
-    print(f"Mood detection model trained and saved to {model_output} and {scaler_output}")
+    logger.info("Mood detection model trained and saved to %s and %s", model_output, scaler_output)
+
+def train_mood_model_streaming(store_dir, model_output, scaler_output, progress_callback=None, epochs=1000,
+                               patience=10, batch_size=DEFAULT_STREAM_BATCH, time_budget=None):
+    """Train the mood model out of core from the feature store `store_dir`.
+
+    The scaler and the MLP are fitted with `partial_fit`, `batch_size` rows at
+    a time. 20% of the rows are held out and scored in blocks after every
+    pass. Training stops once their error has not improved for `patience`
+    passes, or after `epochs`, and keeps the best weights. A model that does
+    no better than predicting the mean on the held-out rows (R² <= 0) raises
+    ValueError instead of replacing the saved one. Returns the train and
+    held-out scores.
+    """
+    if progress_callback:
+        progress_callback(0)
+
+    store = open_feature_store(store_dir, schema=MOOD_SCHEMA)
+    split = {'batch_size': batch_size, 'test_size': 0.2, 'random_state': 42}
+    detector = MoodDetector()
+    fit_scaler_streaming(detector.scaler, store, dtype=MOOD_SCHEMA.dtype, **split)
+    if progress_callback:
+        progress_callback(10)
+
+    epoch_progress = (lambda fraction: progress_callback(10 + int(70 * fraction))) if progress_callback else None
+    fit_streaming(detector.model, store, detector.scaler, epochs=epochs, dtype=MOOD_SCHEMA.dtype, patience=patience,
+                  progress_callback=epoch_progress, time_budget=time_budget, **split)
+    MOOD_SCHEMA.stamp(detector.scaler, detector.model)
+
+    scores = score_streaming(detector.model, store, detector.scaler, dtype=MOOD_SCHEMA.dtype, **split)
+    logger.info("Held-out MSE %.4f, R² %.2f", scores['test']['mse'] or 0.0, scores['test']['r2'] or 0.0,
+                extra={'scores': scores})
+    if scores['test']['r2'] is not None and not scores['test']['r2'] > 0:
+        raise ValueError(f"Mood model did not learn (held-out R² {scores['test']['r2']:.2f}); "
+                         f"{model_output} was not overwritten")
+    if progress_callback:
+        progress_callback(90)
+
+    detector.save(scaler_output, model_output)
+    if progress_callback:
+        progress_callback(100)
+    logger.info("Mood detection model trained and saved to %s and %s", model_output, scaler_output)
+    return scores
 
 if __name__ == "__main__":
+    configure_logging()
     data_file = "deam_features.npz"
     model_output = "../models/mood_model.joblib"
     scaler_output = "../models/mood_scaler.joblib"
@@ -1,7 +1,36 @@
-from .audio_processing import TOTAL_FEATURES, analyze_audio
-from .genre_classifier import predict_genre, train_genre_classifier
-from .mood_detector import MoodDetector, mood_to_label
-from .ui import run_app
+import importlib
 
-__all__ = ['TOTAL_FEATURES', 'analyze_audio', 'predict_genre', 'train_genre_classifier',
-           'MoodDetector', 'mood_to_label', 'run_app']
\ No newline at end of file
+# Public names and the submodule defining each. They are imported on first
+# access, so `import src` (or any `src.x` import) does not load librosa,
+# sklearn, matplotlib and Qt up front.
+_EXPORTS = {
+    'TOTAL_FEATURES': 'audio_processing',
+    'analyze_audio': 'audio_processing',
+    'BatchResult': 'batch',
+    'analyze_many': 'batch',
+    'FeatureStore': 'feature_store',
+    'load_dataset': 'feature_store',
+    'open_feature_store': 'feature_store',
+    'predict_genre': 'genre_classifier',
+    'predict_genre_batch': 'genre_classifier',
+    'train_genre_classifier': 'genre_classifier',
+    'ModelRegistry': 'model_registry',
+    'get_genre_predictor': 'model_registry',
+    'get_mood_detector': 'model_registry',
+    'MoodDetector': 'mood_detector',
+    'mood_to_label': 'mood_detector',
+    'mood_to_labels': 'mood_detector',
+    'run_app': 'ui',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,113 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+from src.instrumentation import observe
+
+GENRE_MODEL_FILE = './models/genre_classifier.joblib'
+GENRE_SCALER_FILE = './models/genre_scaler.joblib'
+MOOD_MODEL_FILE = './models/mood_model.joblib'
+MOOD_SCALER_FILE = './models/mood_scaler.joblib'
+
+class AnalysisCancelled(Exception):
+    pass
+
+class _SignalProgress:
+    """Stands in for a QProgressBar inside the pipeline.
+
+    `analyze_audio` reports through `setValue`; here that emits a signal to the
+    GUI thread instead of touching a widget, and doubles as the point where a
+    cancelled analysis stops.
+    """
+
+    def __init__(self, worker):
+        self.worker = worker
+
+    def setValue(self, value):
+        self.worker.check_cancelled()
+        self.worker.progress.emit(value)
+
+class AnalysisWorker(QObject):
+    """Runs decode, feature extraction and prediction for one file off the GUI thread.
+
+    Move it to a QThread and connect `thread.started` to `run`. Exactly one of
+    `result`, `error` or `cancelled` is emitted, followed by `done`. `stage`
+    reports each pipeline stage (name, seconds) as it finishes.
+    """
+
+    progress = pyqtSignal(int)
+    stage = pyqtSignal(str, float)
+    result = pyqtSignal(dict)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    done = pyqtSignal()
+
+    def __init__(self, file_path, cache=None):
+        super().__init__()
+        self.file_path = file_path
+        self.cache = cache
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def check_cancelled(self):
+        if self._cancelled:
+            raise AnalysisCancelled()
+
+    def _on_span(self, span):
+        # Observers must not raise into the pipeline, which may catch it; cancellation
+        # is checked at the progress steps and between the steps of `analyze`
+        self.stage.emit(span.name, span.seconds)
+
+    def run(self):
+        try:
+            with observe(self._on_span):
+                self.result.emit(self.analyze())
+        except AnalysisCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.error.emit(f"Error analyzing {self.file_path}: {e}")
+        finally:
+            self.done.emit()
+
+    def analyze(self):
+        # Imported here so librosa loads on the worker thread, not while the window opens
+        from src.audio_processing import analyze_audio
+        from src.deam_audio_processing import analyze_audio_deam
+        from src.decoded_audio import load_audio
+        from src.genre_classifier import predict_genre
+        from src.model_registry import get_mood_detector
+        from src.mood_detector import mood_to_label
+
+        progress = _SignalProgress(self)
+
+        # One decode feeds both feature extraction and the waveform plot
+        audio = load_audio(self.file_path)
+        self.check_cancelled()
+        features, basic_stats = analyze_audio(audio, progress, cache=self.cache)
+
+        self.check_cancelled()
+        genre = predict_genre(features, GENRE_MODEL_FILE, GENRE_SCALER_FILE)
+        genre_prediction, top_genres = genre if genre is not None else (None, [])
+
+        # The mood model reads its own feature layout from the same decoded samples
+        self.check_cancelled()
+        mood_detector = get_mood_detector(MOOD_SCALER_FILE, MOOD_MODEL_FILE)
+        mood_features = analyze_audio_deam(audio, cache=self.cache)
+        self.check_cancelled()
+        valence, arousal = mood_detector.predict(mood_features)
+        progress.setValue(90)
+
+        # The waveform plot reads the envelope pyramid; build it here rather than on the GUI thread
+        audio.envelope()
+
+        return {
+            'file_path': self.file_path,
+            'basic_stats': basic_stats,
+            'genre_prediction': genre_prediction,
+            'top_genres': top_genres,
+            'valence': valence,
+            'arousal': arousal,
+            'mood_label': mood_to_label(valence, arousal),
+            'audio': audio,
+        }
+
+__all__ = ['AnalysisWorker', 'AnalysisCancelled']
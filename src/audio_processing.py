@@ -1,79 +1,94 @@
-import librosa
 import numpy as np
-from src.feature_config import get_feature_config
+from src.feature_config import GENRE_SCHEMA
+from src.feature_engine import extract_features, SAMPLE_RATE, HOP_LENGTH
+from src.decoded_audio import DecodedAudio, DEFAULT_DECODE, load_audio
+from src.streaming import check_streaming_tempo_method, extract_features_streaming
+from src.excerpt import ExcerptPolicy, FULL_TRACK
+from src.tempo import DEFAULT_TEMPO_METHOD, tempo_cache_params
 
-FEATURE_CONFIG = get_feature_config()
+TOTAL_FEATURES = GENRE_SCHEMA.size
 
-# Define feature indices
-TOTAL_FEATURES = 28
-TEMPO_INDEX = 0
-SPECTRAL_CENTROID_INDEX = 1
-SPECTRAL_BANDWIDTH_INDEX = 2
-SPECTRAL_CONTRAST_START = 3
-SPECTRAL_CONTRAST_END = 9  # Assuming 6 spectral contrast values
-SPECTRAL_ROLLOFF_INDEX = 9
-CHROMA_START = 10
-CHROMA_END = 15  # 5 chroma features instead of 12
-MFCC_START = 15
-MFCC_END = 27  # Assuming 12 MFCC features
-RMS_INDEX = 27
+def describe_features(features):
+    """Human-readable summary of a genre feature vector."""
+    index = GENRE_SCHEMA.index
+    return {
+        "Tempo": f"{features[index['tempo']]:.2f} BPM",
+        "Spectral Centroid": f"{features[index['spectral_centroid']]:.2f} Hz",
+        "Spectral Bandwidth": f"{features[index['spectral_bandwidth']]:.2f} Hz",
+        "RMS Energy": f"{features[index['rms']]:.4f}"
+    }
+
+def _extract_from_file(file_path, progress_bar=None, streaming=False, excerpt=FULL_TRACK, decode=DEFAULT_DECODE,
+                       tempo_method=DEFAULT_TEMPO_METHOD):
+    if not excerpt.is_full:
+        return _extract_excerpt(file_path, excerpt, progress_bar, decode, tempo_method)
 
-# Verification
-assert RMS_INDEX + 1 == TOTAL_FEATURES, "Feature indices don't match total feature count"
+    if streaming:
+        # Block-wise decode and extraction; memory does not grow with duration
+        return extract_features_streaming(file_path, progress_bar=progress_bar, res_type=decode.res_type, sr=decode.sr,
+                                          tempo_method=tempo_method)
 
-def analyze_audio(file_path, progress_bar=None):
-    y, sr = librosa.load(file_path)
+    audio = load_audio(file_path, sr=decode.sr, res_type=decode.res_type)
     if progress_bar:
         progress_bar.setValue(20)
 
-    # Basic features
-    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-    tempo = tempo.item() if isinstance(tempo, np.ndarray) else tempo  # Convert to scalar if it's an array
-    if progress_bar:
-        progress_bar.setValue(40)
+    # All spectral features come from one shared STFT
+    return extract_features(audio.y, audio.sr, progress_bar, tempo_method)
 
-    # Spectral features
-    spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr).mean()
-    spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr).mean()
-    spectral_contrast = librosa.feature.spectral_contrast(y=y, sr=sr).mean(axis=1)
-    spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr).mean()
+def _extract_excerpt(file_path, excerpt, progress_bar=None, decode=DEFAULT_DECODE, tempo_method=DEFAULT_TEMPO_METHOD):
+    if isinstance(file_path, DecodedAudio):
+        # Already in memory: slice the samples instead of decoding again
+        audio = file_path
+        windows = excerpt.windows(audio.seconds)
+        clips = [audio.y[int(offset * audio.sr):None if duration is None else int((offset + duration) * audio.sr)]
+                 for offset, duration in windows]
+        sr = audio.sr
+    else:
+        windows = excerpt.file_windows(file_path)
+        clips = []
+        for offset, duration in windows:
+            # Each window decodes only its own byte range
+            audio = load_audio(file_path, sr=decode.sr, offset=offset, duration=duration, res_type=decode.res_type)
+            clips.append(audio.y)
+            sr = audio.sr
     if progress_bar:
-        progress_bar.setValue(60)
+        progress_bar.setValue(20)
 
-    # Timbre features
-    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=12)
-    mfcc_means = mfccs.mean(axis=1)
-    
+    # Windows are aggregated by averaging their feature vectors
+    return np.mean([extract_features(y, sr, tempo_method=tempo_method) for y in clips], axis=0)
 
-    # Harmonic features
-    chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-    chroma_means = chroma.mean(axis=1)
+def analyze_audio(file_path, progress_bar=None, cache=None, streaming=False, excerpt=None, decode=None,
+                  tempo_method=DEFAULT_TEMPO_METHOD):
+    """Extract the GENRE_SCHEMA feature vector for a file path or an already decoded `DecodedAudio`.
 
-    # Energy
-    rms = librosa.feature.rms(y=y).mean()
+    `excerpt` is an ExcerptPolicy choosing which part of the file to analyze
+    (whole file by default), `decode` a DecodeSettings choosing the decode
+    rate and resampler, and `tempo_method` one of TEMPO_METHODS. With
+    `streaming=True` a whole file path is read in fixed-size blocks instead of
+    being decoded at once, for recordings too long to hold in memory; it
+    honours the decode rate, but only supports the 'autocorr' tempo method
+    and raises ValueError for the others.
+    """
+    excerpt = excerpt or FULL_TRACK
+    decode = decode or DEFAULT_DECODE
+    streaming = streaming and excerpt.is_full and not isinstance(file_path, DecodedAudio)
+    if streaming:
+        check_streaming_tempo_method(tempo_method)
+    if cache is not None:
+        source_path = file_path.path if isinstance(file_path, DecodedAudio) else file_path
+        namespace = 'genre-stream' if streaming else 'genre'
+        features = cache.get_or_compute(source_path, namespace,
+                                        lambda: _extract_from_file(file_path, progress_bar, streaming, excerpt, decode,
+                                                                   tempo_method),
+                                        sr=SAMPLE_RATE, hop_length=HOP_LENGTH, **excerpt.cache_params(),
+                                        **decode.cache_params(), **tempo_cache_params(tempo_method))
+    else:
+        features = _extract_from_file(file_path, progress_bar, streaming, excerpt, decode, tempo_method)
 
-    # Combine all features
-    features = np.zeros(FEATURE_CONFIG['TOTAL_FEATURES'])
-    features[FEATURE_CONFIG['TEMPO']] = tempo
-    features[FEATURE_CONFIG['SPECTRAL_CENTROID']] = spectral_centroid
-    features[FEATURE_CONFIG['SPECTRAL_BANDWIDTH']] = spectral_bandwidth
-    features[FEATURE_CONFIG['SPECTRAL_CONTRAST_START']:FEATURE_CONFIG['SPECTRAL_CONTRAST_END']] = spectral_contrast[:6]
-    features[FEATURE_CONFIG['SPECTRAL_ROLLOFF']] = spectral_rolloff
-    features[FEATURE_CONFIG['CHROMA_START']:FEATURE_CONFIG['CHROMA_END']] = chroma_means[:5]
-    features[FEATURE_CONFIG['MFCC_START']:FEATURE_CONFIG['MFCC_END']] = mfcc_means
-    features[FEATURE_CONFIG['RMS']] = rms
-    
     if progress_bar:
         progress_bar.setValue(80)
 
-    basic_stats = {
-        "Tempo": f"{tempo:.2f} BPM",
-        "Spectral Centroid": f"{spectral_centroid:.2f} Hz",
-        "Spectral Bandwidth": f"{spectral_bandwidth:.2f} Hz",
-        "RMS Energy": f"{rms:.4f}"
-    }
-
-    return features, basic_stats
+    return features, describe_features(features)
 
 # At the end of src/audio_processing.py
-__all__ = ['analyze_audio', 'TOTAL_FEATURES']
\ No newline at end of file
+__all__ = ['analyze_audio', 'describe_features', 'ExcerptPolicy', 'TOTAL_FEATURES']
\ No newline at end of file
@@ -0,0 +1,92 @@
+import time
+from functools import partial
+import numpy as np
+from src.audio_processing import analyze_audio, TOTAL_FEATURES
+from src.deam_audio_processing import analyze_audio_deam
+from src.streaming import check_streaming_tempo_method
+from src.feature_engine import FEATURE_DTYPE
+from src.decoded_audio import DEFAULT_DECODE, configure_decode_cache, load_audio
+from src.instrumentation import record_spans
+from src.tempo import DEFAULT_TEMPO_METHOD
+from src.parallel import bounded_map
+
+class BatchResult:
+    """Stacked features for the files that succeeded, plus per-file stats and errors."""
+
+    def __init__(self, features, paths, stats, errors):
+        self.features = features  # (n_tracks, TOTAL_FEATURES) FEATURE_DTYPE, rows aligned with `paths`
+        self.paths = paths
+        self.stats = stats
+        self.errors = errors  # {path: error message}
+
+    def __len__(self):
+        return len(self.paths)
+
+def extract_for_prediction(file_path, cache=None, excerpt=None, decode=None, tempo_method=DEFAULT_TEMPO_METHOD):
+    """Genre and mood feature vectors of one file, plus `(decode_seconds, extract_seconds)`.
+
+    A whole-file analysis decodes once for both layouts. With a feature cache
+    the path is passed through instead, so vectors already cached skip
+    decoding altogether.
+    """
+    decode = decode or DEFAULT_DECODE
+    start = time.perf_counter()
+    audio = file_path
+    if cache is None and (excerpt is None or excerpt.is_full):
+        audio = load_audio(file_path, sr=decode.sr, res_type=decode.res_type, cache=None)
+    decoded = time.perf_counter()
+
+    genre_features, _ = analyze_audio(audio, cache=cache, excerpt=excerpt, decode=decode, tempo_method=tempo_method)
+    mood_features = analyze_audio_deam(audio, cache=cache, decode=decode, tempo_method=tempo_method)
+    return genre_features, mood_features, (decoded - start, time.perf_counter() - decoded)
+
+def analyze_many(paths, max_workers=None, max_in_flight=None, chunksize=1, progress_callback=None, cache=None,
+                 streaming=False, excerpt=None, decode=None, tempo_method=DEFAULT_TEMPO_METHOD, observer=None):
+    """Analyze many audio files in parallel without any GUI dependency.
+
+    Decode and feature extraction run in a process pool of `max_workers`
+    processes, with at most `max_in_flight` chunks of `chunksize` files
+    outstanding at once. Rows are returned in input order. An optional
+    `FeatureCache` is shared by every worker. `streaming=True` bounds each
+    worker's memory for very long recordings, and an `ExcerptPolicy` limits
+    decoding to the analyzed windows. `decode` and `tempo_method` are passed
+    to analyze_audio. `observer` receives the workers' stage spans (see
+    src.instrumentation) as each file finishes.
+    """
+    if streaming:
+        # Fail once here rather than once per file in the pool
+        check_streaming_tempo_method(tempo_method)
+    paths = list(paths)
+    total_files = len(paths)
+    features = np.empty((total_files, TOTAL_FEATURES), dtype=FEATURE_DTYPE)
+    ok_paths = []
+    stats = []
+    errors = {}
+
+    analyze = partial(analyze_audio, cache=cache, streaming=streaming, excerpt=excerpt, decode=decode,
+                      tempo_method=tempo_method)
+    if observer is not None:
+        analyze = partial(record_spans, analyze)
+    # Pool workers see each file once, so holding recent decodes would only cost memory
+    results = bounded_map(analyze, paths, max_workers=max_workers, max_in_flight=max_in_flight, chunksize=chunksize,
+                          initializer=configure_decode_cache, initargs=(0,))
+    for index, (file_path, ok, value) in enumerate(results):
+        if ok and observer is not None:
+            value, spans = value
+            for span in spans:
+                observer(span)
+        if ok:
+            file_features, basic_stats = value
+            features[len(ok_paths)] = file_features
+            ok_paths.append(file_path)
+            stats.append(basic_stats)
+        else:
+            errors[file_path] = value
+
+        if progress_callback:
+            progress = int((index + 1) / total_files * 100)
+            progress_callback(progress)
+
+    return BatchResult(features[:len(ok_paths)], ok_paths, stats, errors)
+
+__all__ = ['BatchResult', 'analyze_many', 'extract_for_prediction']
@@ -0,0 +1,259 @@
+"""Score every audio file under one or more directories without a GUI.
+
+    python -m src.cli AUDIO_DIR [AUDIO_DIR ...] -o results.csv [--workers N]
+
+Each file is decoded once, its genre and mood features are extracted, and
+the genre classifier and mood model are applied, in a process pool. One row
+per file (path, genre top 3, valence, arousal, mood label, timings and the
+feature vectors) is written as soon as it is ready, to CSV, JSON Lines or
+Parquet (the last needs pyarrow). Files that fail get a row with `error` set.
+The exit status is 1 if any file failed. Failures, a run summary and
+per-stage timings are logged to stderr (--log-format json for one JSON
+object per line); --metrics also writes the timings (with latency
+histograms) as JSON, or in the Prometheus text format for a `.prom` path.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from functools import partial
+from src.batch import extract_for_prediction
+from src.decoded_audio import DECODE_MODES, configure_decode_cache
+from src.excerpt import ExcerptPolicy
+from src.feature_cache import DEFAULT_CACHE_DIR, FeatureCache
+from src.feature_config import GENRE_SCHEMA, MOOD_SCHEMA
+from src.instrumentation import StageStats, record_spans
+from src.log_config import RunSummary, add_logging_arguments, configure_logging
+from src.model_registry import get_genre_predictor, get_mood_detector
+from src.mood_detector import mood_to_label
+from src.parallel import bounded_map, default_workers
+from src.tempo import DEFAULT_TEMPO_METHOD, TEMPO_METHODS
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg')
+TOP_GENRES = 3
+FORMATS = ('csv', 'jsonl', 'parquet')
+PARQUET_ROW_GROUP = 256
+
+logger = logging.getLogger(__name__)
+
+GENRE_FEATURE_COLUMNS = [f"{GENRE_SCHEMA.name}_{name}" for name in GENRE_SCHEMA.names]
+MOOD_FEATURE_COLUMNS = [f"{MOOD_SCHEMA.name}_{name}" for name in MOOD_SCHEMA.names]
+TIMING_COLUMNS = ['decode_seconds', 'extract_seconds', 'predict_seconds', 'total_seconds']
+
+def result_columns(include_features=True):
+    """`(name, kind)` of every output column, kind being 'str' or 'float'."""
+    columns = [('path', 'str'), ('error', 'str')]
+    for rank in range(1, TOP_GENRES + 1):
+        columns += [(f'genre_{rank}', 'str'), (f'genre_{rank}_probability', 'float')]
+    columns += [('valence', 'float'), ('arousal', 'float'), ('mood_label', 'str')]
+    columns += [(name, 'float') for name in TIMING_COLUMNS]
+    if include_features:
+        columns += [(name, 'float') for name in GENRE_FEATURE_COLUMNS + MOOD_FEATURE_COLUMNS]
+    return columns
+
+def find_audio(inputs, extensions=AUDIO_EXTENSIONS):
+    """Audio files named directly in `inputs` or found under its directories, in sorted order."""
+    for path in inputs:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            for name in sorted(names):
+                if name.lower().endswith(extensions):
+                    yield os.path.join(root, name)
+
+def score_file(file_path, models_dir='./models', cache=None, excerpt=None, decode=None,
+               tempo_method=DEFAULT_TEMPO_METHOD, allow_unstamped=False):
+    """Features, predictions and stage timings for one file, as a flat result row."""
+    genre_features, mood_features, (decode_seconds, extract_seconds) = extract_for_prediction(
+        file_path, cache=cache, excerpt=excerpt, decode=decode, tempo_method=tempo_method)
+    extracted = time.perf_counter()
+
+    row = {'path': file_path}
+    try:
+        genre_predictor = get_genre_predictor(os.path.join(models_dir, 'genre_classifier.joblib'),
+                                              os.path.join(models_dir, 'genre_scaler.joblib'), allow_unstamped)
+    except FileNotFoundError:
+        genre_predictor = None
+    if genre_predictor is not None:
+        _, top_genres, top_probabilities = genre_predictor.predict_batch(genre_features, top_k=TOP_GENRES)
+        for rank, (genre, probability) in enumerate(zip(top_genres[0], top_probabilities[0]), start=1):
+            row[f'genre_{rank}'] = str(genre)
+            row[f'genre_{rank}_probability'] = float(probability)
+
+    mood_detector = get_mood_detector(os.path.join(models_dir, 'mood_scaler.joblib'),
+                                      os.path.join(models_dir, 'mood_model.joblib'), allow_unstamped)
+    valence, arousal = mood_detector.predict(mood_features)
+    row.update(valence=float(valence), arousal=float(arousal), mood_label=mood_to_label(valence, arousal))
+    predicted = time.perf_counter()
+
+    predict_seconds = predicted - extracted
+    row.update(decode_seconds=decode_seconds, extract_seconds=extract_seconds, predict_seconds=predict_seconds,
+               total_seconds=decode_seconds + extract_seconds + predict_seconds)
+    row.update(zip(GENRE_FEATURE_COLUMNS, genre_features.tolist()))
+    row.update(zip(MOOD_FEATURE_COLUMNS, mood_features.tolist()))
+    return row
+
+class _StreamResultWriter:
+    """Writes one line per row to `stream` and flushes it, so readers see rows as they finish."""
+
+    def __init__(self, stream, columns):
+        self.stream = stream
+        self.names = [name for name, _ in columns]
+
+    def write(self, row):
+        self._write(row)
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+class CsvResultWriter(_StreamResultWriter):
+    def __init__(self, stream, columns):
+        super().__init__(stream, columns)
+        self.writer = csv.DictWriter(stream, fieldnames=self.names, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def _write(self, row):
+        self.writer.writerow(row)
+
+class JsonlResultWriter(_StreamResultWriter):
+    def _write(self, row):
+        self.stream.write(json.dumps({name: row.get(name) for name in self.names}) + '\n')
+
+class ParquetResultWriter:
+    """Buffers rows and writes a Parquet row group every PARQUET_ROW_GROUP rows."""
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.schema = pa.schema([(name, pa.string() if kind == 'str' else pa.float64()) for name, kind in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= PARQUET_ROW_GROUP:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            columns = {name: [row.get(name) for row in self.rows] for name in self.schema.names}
+            self.writer.write_table(self.pa.table(columns, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+def open_writer(output, output_format, columns):
+    """Result writer for `output`; '-' is stdout for csv and jsonl."""
+    if output_format == 'parquet':
+        if output == '-':
+            raise SystemExit("Parquet output needs a file path")
+        return ParquetResultWriter(output, columns)
+    stream = sys.stdout if output == '-' else open(output, 'w', newline='')
+    writer_class = CsvResultWriter if output_format == 'csv' else JsonlResultWriter
+    return writer_class(stream, columns)
+
+def infer_format(output):
+    extension = os.path.splitext(output)[1].lower().lstrip('.')
+    if extension in ('json', 'ndjson'):
+        return 'jsonl'
+    return extension if extension in FORMATS else 'csv'
+
+def score_directory(inputs, writer, workers=None, chunksize=1, models_dir='./models', cache=None, excerpt=None,
+                    decode=None, tempo_method=DEFAULT_TEMPO_METHOD, extensions=AUDIO_EXTENSIONS, observer=None,
+                    allow_unstamped=False):
+    """Score every audio file under `inputs`, writing each row as it finishes. Returns `(scored, failed)`.
+
+    `observer` receives each file's stage spans (see src.instrumentation).
+    Failures are logged as they happen and the totals once at the end.
+    """
+    score = partial(record_spans, score_file, models_dir=os.path.abspath(models_dir), cache=cache, excerpt=excerpt,
+                    decode=decode, tempo_method=tempo_method, allow_unstamped=allow_unstamped)
+    summary = RunSummary(logger, 'file')
+    # Pool workers see each file once, so holding recent decodes would only cost memory
+    results = bounded_map(score, find_audio(inputs, extensions), max_workers=workers, chunksize=chunksize,
+                          ordered=False, initializer=configure_decode_cache, initargs=(0,))
+    for file_path, ok, value in results:
+        if ok:
+            row, spans = value
+            if observer is not None:
+                for span in spans:
+                    observer(span)
+            writer.write(row)
+            summary.success(file_path)
+        else:
+            writer.write({'path': file_path, 'error': value})
+            summary.failure(file_path, value)
+    summary.finish()
+    return summary.succeeded, sum(summary.errors.values())
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help="Audio files or directories to scan recursively")
+    parser.add_argument('-o', '--output', required=True, help="Output file, or '-' for stdout (csv/jsonl)")
+    parser.add_argument('--format', choices=FORMATS, help="Output format (default: from the output extension, else csv)")
+    parser.add_argument('-j', '--workers', type=int, default=default_workers(), help="Worker processes (default: all CPUs)")
+    parser.add_argument('--chunksize', type=int, default=1, help="Files handed to a worker at a time")
+    parser.add_argument('--models-dir', default='./models', help="Directory holding the trained models")
+    parser.add_argument('--allow-unstamped-models', action='store_true',
+                        help="Load models that record no feature schema (checked by width only)")
+    parser.add_argument('--cache', action='store_true', help=f"Use the feature cache in {DEFAULT_CACHE_DIR}")
+    parser.add_argument('--cache-dir', help="Use a feature cache in this directory")
+    parser.add_argument('--excerpt', choices=ExcerptPolicy.MODES, default='full', help="Part of each file to analyze for genre")
+    parser.add_argument('--excerpt-seconds', type=float, default=30.0, help="Excerpt or window length")
+    parser.add_argument('--excerpt-count', type=int, default=3, help="Number of windows for --excerpt windows")
+    parser.add_argument('--decode', choices=sorted(DECODE_MODES), default='hq', help="Decode mode")
+    parser.add_argument('--tempo-method', choices=TEMPO_METHODS, default=DEFAULT_TEMPO_METHOD, help="Tempo estimator")
+    parser.add_argument('--extensions', default=','.join(AUDIO_EXTENSIONS),
+                        help="Comma-separated file extensions to scan for")
+    parser.add_argument('--no-features', action='store_true', help="Leave the feature vectors out of the output")
+    parser.add_argument('--metrics', help="Write per-stage timings to this file (.prom: Prometheus text, else JSON)")
+    add_logging_arguments(parser)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args.log_level, args.log_format)
+    output_format = args.format or infer_format(args.output)
+    cache = None
+    if args.cache or args.cache_dir:
+        cache = FeatureCache(args.cache_dir or DEFAULT_CACHE_DIR)
+    excerpt = ExcerptPolicy(args.excerpt, args.excerpt_seconds, args.excerpt_count)
+    extensions = tuple(ext if ext.startswith('.') else '.' + ext
+                       for ext in (ext.strip().lower() for ext in args.extensions.split(',')) if ext)
+
+    writer = open_writer(args.output, output_format, result_columns(not args.no_features))
+    stats = StageStats()
+    try:
+        scored, failed = score_directory(args.inputs, writer, workers=args.workers, chunksize=args.chunksize,
+                                         models_dir=args.models_dir, cache=cache, excerpt=excerpt,
+                                         decode=DECODE_MODES[args.decode], tempo_method=args.tempo_method,
+                                         extensions=extensions, observer=stats,
+                                         allow_unstamped=args.allow_unstamped_models)
+    finally:
+        writer.close()
+    if len(stats):
+        logger.info("Stage timings:\n%s", stats.summary(), extra={'stages': stats.as_dict()})
+    if args.metrics:
+        with open(args.metrics, 'w') as f:
+            if args.metrics.endswith('.prom'):
+                f.write(stats.prometheus_text())
+            else:
+                json.dump(stats.as_dict(), f, indent=2)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
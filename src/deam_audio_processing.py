@@ -1,92 +1,96 @@
+import logging
 import librosa
 import numpy as np
+from src.feature_config import MOOD_SCHEMA
+from src.feature_engine import Spectrogram, estimate_tempo, SAMPLE_RATE, HOP_LENGTH
+from src.decoded_audio import DecodedAudio, DEFAULT_DECODE, load_audio
+from src.instrumentation import stage
+from src.tempo import DEFAULT_TEMPO_METHOD, tempo_cache_params
 
-def analyze_audio_deam(file_path):
-    try:
-        # Load the audio file
-        y, sr = librosa.load(file_path, duration=45)  # DEAM uses 45-second excerpts
+DEAM_SECONDS = 45  # DEAM uses 45-second excerpts
+N_MFCC = MOOD_SCHEMA.widths['mfcc']
 
-        # Extract features
-        spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr).mean()
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr).mean()
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr).mean()
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        mfcc_means = mfccs.mean(axis=1)
-        chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-        chroma_means = chroma.mean(axis=1)
-        rms = librosa.feature.rms(y=y).mean()
+logger = logging.getLogger(__name__)
 
-        # Ensure all spectral features are scalar values
-        spectral_features = np.array([
-            float(spectral_centroid),
-            float(spectral_bandwidth),
-            float(spectral_rolloff),
-            float(tempo),
-            float(rms)
-        ])
-        
-        # Concatenate all features
-        features = np.concatenate([
-            spectral_features,
-            mfcc_means.flatten(),
-            chroma_means.flatten()
-        ])
+def analyze_audio_deam(file_path, cache=None, decode=DEFAULT_DECODE, tempo_method=DEFAULT_TEMPO_METHOD):
+    """MOOD_SCHEMA feature vector of the first 45 seconds of a file path or an already decoded `DecodedAudio`.
 
-        # Print shapes for debugging
-        print(f"Spectral features shape: {spectral_features.shape}")
-        print(f"MFCC means shape: {mfcc_means.shape}")
-        print(f"Chroma means shape: {chroma_means.shape}")
-        print(f"Final features shape: {features.shape}")
+    Decode and extraction errors propagate to the caller.
+    """
+    if cache is not None:
+        source_path = file_path.path if isinstance(file_path, DecodedAudio) else file_path
+        return cache.get_or_compute(source_path, 'deam',
+                                    lambda: analyze_audio_deam(file_path, decode=decode, tempo_method=tempo_method),
+                                    sr=SAMPLE_RATE, hop_length=HOP_LENGTH, duration=DEAM_SECONDS,
+                                    **decode.cache_params(), **tempo_cache_params(tempo_method))
 
-        return features
+    # Load the audio file, or cut the excerpt from samples already in memory
+    if isinstance(file_path, DecodedAudio):
+        y, sr = file_path.y[:int(DEAM_SECONDS * file_path.sr)], file_path.sr
+    else:
+        audio = load_audio(file_path, sr=decode.sr, duration=DEAM_SECONDS, cache=None, res_type=decode.res_type)
+        y, sr = audio.y, audio.sr
 
-    except Exception as e:
-        print(f"Error in analyze_audio_deam for {file_path}: {str(e)}")
-        return None
+    # Extract features from one shared STFT
+    audio_seconds = len(y) / sr
+    with stage('stft', audio_seconds=audio_seconds):
+        spec = Spectrogram(y, sr)
+    with stage('spectral', audio_seconds=audio_seconds):
+        spectral_centroid = spec.spectral_centroid().mean()
+        spectral_bandwidth = spec.spectral_bandwidth().mean()
+        spectral_rolloff = spec.spectral_rolloff().mean()
+    with stage('tempo', audio_seconds=audio_seconds):
+        tempo = estimate_tempo(spec, tempo_method)
+    with stage('mfcc', audio_seconds=audio_seconds):
+        mfccs = spec.mfcc(n_mfcc=N_MFCC)
+        mfcc_means = mfccs.mean(axis=1)
+    with stage('chroma', audio_seconds=audio_seconds):
+        chroma = spec.chroma()
+        chroma_means = chroma.mean(axis=1)
+    with stage('rms', audio_seconds=audio_seconds):
+        rms = librosa.feature.rms(y=y, frame_length=spec.frame_length, hop_length=spec.frame_hop).mean()
+
+    features = MOOD_SCHEMA.pack((spectral_centroid, spectral_bandwidth, spectral_rolloff, tempo, rms,
+                                 mfcc_means, chroma_means))
+
+    logger.debug("MFCC means %s, chroma means %s, features %s", mfcc_means.shape, chroma_means.shape,
+                 features.shape)
+    return features
 
 def get_feature_names():
-    return [
-        "spectral_centroid", "spectral_bandwidth", "spectral_rolloff",
-        "tempo", "rms",
-        *[f"mfcc_{i}" for i in range(13)],
-        *[f"chroma_{i}" for i in range(12)]
-    ]
+    return list(MOOD_SCHEMA.names)
 
 def get_feature_count():
-    return len(get_feature_names())
+    return MOOD_SCHEMA.size
 
 def debug_feature_extraction(file_path):
+    """Log every DEAM feature of `file_path` computed separately with librosa, and the final vector's shape.
+
+    A diagnostic: it decodes the file twice, so it only runs when asked for.
+    """
     try:
-        y, sr = librosa.load(file_path, duration=45)
+        y, sr = librosa.load(file_path, duration=DEAM_SECONDS)
         
         spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr).mean()
         spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr).mean()
         spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr).mean()
         tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=N_MFCC)
         mfcc_means = mfccs.mean(axis=1)
         chroma = librosa.feature.chroma_stft(y=y, sr=sr)
         chroma_means = chroma.mean(axis=1)
         rms = librosa.feature.rms(y=y).mean()
 
-        print(f"spectral_centroid: {spectral_centroid}, shape: {np.array(spectral_centroid).shape}, type: {type(spectral_centroid)}")
-        print(f"spectral_bandwidth: {spectral_bandwidth}, shape: {np.array(spectral_bandwidth).shape}, type: {type(spectral_bandwidth)}")
-        print(f"spectral_rolloff: {spectral_rolloff}, shape: {np.array(spectral_rolloff).shape}, type: {type(spectral_rolloff)}")
-        print(f"tempo: {tempo}, shape: {np.array(tempo).shape}, type: {type(tempo)}")
-        print(f"mfcc_means shape: {mfcc_means.shape}, type: {type(mfcc_means)}")
-        print(f"chroma_means shape: {chroma_means.shape}, type: {type(chroma_means)}")
-        print(f"rms: {rms}, shape: {np.array(rms).shape}, type: {type(rms)}")
+        for name, value in (('spectral_centroid', spectral_centroid), ('spectral_bandwidth', spectral_bandwidth),
+                            ('spectral_rolloff', spectral_rolloff), ('tempo', tempo), ('mfcc_means', mfcc_means),
+                            ('chroma_means', chroma_means), ('rms', rms)):
+            logger.info("%s: %s, shape: %s, type: %s", name, value, np.array(value).shape, type(value).__name__)
 
-        # Print the shape of the final feature vector
+        # The shape of the final feature vector
         features = analyze_audio_deam(file_path)
-        if features is not None:
-            print(f"Final feature vector shape: {features.shape}")
-            print(f"Expected feature count: {get_feature_count()}")
-            if features.shape[0] != get_feature_count():
-                print("WARNING: Feature count mismatch!")
-        else:
-            print("Failed to extract features")
+        logger.info("Final feature vector shape: %s, expected %d features", features.shape, get_feature_count())
+        if features.shape[0] != get_feature_count():
+            logger.warning("Feature count mismatch!")
 
     except Exception as e:
-        print(f"Error in debug_feature_extraction for {file_path}: {str(e)}")
\ No newline at end of file
+        logger.error("Error in debug_feature_extraction for %s: %s", file_path, e)
\ No newline at end of file
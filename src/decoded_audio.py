@@ -0,0 +1,137 @@
+import os
+import threading
+from collections import OrderedDict
+import librosa
+from src.feature_engine import SAMPLE_RATE
+from src.instrumentation import stage
+from src.waveform_envelope import EnvelopePyramid
+
+DEFAULT_DECODE_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_RES_TYPE = 'soxr_hq'  # librosa.load default
+
+class DecodeSettings:
+    """How files are decoded for analysis.
+
+    `sr` is the target rate, or None to keep each file's native rate and let
+    the feature engine scale its STFT instead of resampling. `res_type` is the
+    librosa resampler used when a file's rate differs from `sr`; the soxr
+    qualities ('soxr_vhq', 'soxr_hq', 'soxr_mq', 'soxr_lq', 'soxr_qq') trade
+    accuracy for speed.
+    """
+
+    def __init__(self, sr=SAMPLE_RATE, res_type=DEFAULT_RES_TYPE):
+        self.sr = sr
+        self.res_type = res_type
+
+    def __repr__(self):
+        return f"DecodeSettings(sr={self.sr}, res_type={self.res_type!r})"
+
+    @property
+    def is_default(self):
+        return self.sr == SAMPLE_RATE and self.res_type == DEFAULT_RES_TYPE
+
+    def cache_params(self):
+        # Empty for the default so existing cache entries stay valid
+        if self.is_default:
+            return {}
+        return {'decode_sr': self.sr or 'native', 'res_type': self.res_type}
+
+DEFAULT_DECODE = DecodeSettings()
+DECODE_MODES = {
+    'hq': DEFAULT_DECODE,
+    'fast': DecodeSettings(res_type='soxr_qq'),
+    'native': DecodeSettings(sr=None),
+}
+
+class DecodedAudio:
+    """Samples of one file decoded at a given rate, shared by every consumer of an analysis."""
+
+    def __init__(self, path, y, sr, offset=0.0, duration=None):
+        self.path = path
+        self.y = y
+        self.sr = sr
+        self.offset = offset
+        self.duration = duration
+        self._envelope = None
+
+    @property
+    def seconds(self):
+        return len(self.y) / self.sr
+
+    @property
+    def nbytes(self):
+        return self.y.nbytes
+
+    def envelope(self):
+        """Min/max envelope pyramid for plotting, built on first use."""
+        if self._envelope is None:
+            self._envelope = EnvelopePyramid(self.y, self.sr)
+        return self._envelope
+
+class DecodeCache:
+    """Small LRU of recent decodes, bounded by total sample bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_DECODE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+            return audio
+
+    def put(self, key, audio):
+        with self._lock:
+            if audio.nbytes > self.max_bytes:
+                return
+            if key in self._entries:
+                self._size -= self._entries.pop(key).nbytes
+            self._entries[key] = audio
+            self._size += audio.nbytes
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+default_decode_cache = DecodeCache()
+
+def configure_decode_cache(max_bytes):
+    default_decode_cache.max_bytes = max_bytes
+    if max_bytes <= 0:
+        default_decode_cache.clear()
+
+def load_audio(path, sr=SAMPLE_RATE, offset=0.0, duration=None, cache=default_decode_cache, res_type=DEFAULT_RES_TYPE):
+    """Decode `path` once and return a DecodedAudio, reusing a recent decode when possible.
+
+    `sr=None` keeps the native rate. The cache key includes the file's mtime
+    and size, so edited files are decoded again. Pass `cache=None` to bypass
+    the LRU.
+    """
+    if isinstance(path, DecodedAudio):
+        return path
+
+    key = None
+    if cache is not None:
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, sr, res_type, offset, duration)
+        audio = cache.get(key)
+        if audio is not None:
+            return audio
+
+    with stage('decode') as span:
+        y, sr = librosa.load(path, sr=sr, offset=offset, duration=duration, res_type=res_type)
+        span.update(audio_seconds=len(y) / sr, bytes=y.nbytes)
+    audio = DecodedAudio(path, y, sr, offset=offset, duration=duration)
+    if cache is not None:
+        cache.put(key, audio)
+    return audio
+
+__all__ = ['DecodedAudio', 'DecodeCache', 'DecodeSettings', 'DEFAULT_DECODE', 'DECODE_MODES', 'load_audio', 'configure_decode_cache', 'default_decode_cache']
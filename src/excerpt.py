@@ -0,0 +1,80 @@
+import numpy as np
+import librosa
+
+class ExcerptPolicy:
+    """Which part of a file to analyze.
+
+    `mode` is one of:
+      - 'full': the whole file (the default)
+      - 'first': the first `seconds` seconds, as FMA preparation does
+      - 'center': `seconds` seconds around the middle of the file
+      - 'windows': `count` windows of `seconds` seconds spread evenly over the
+        file, whose feature vectors are averaged
+
+    Only the selected ranges are decoded, via librosa's offset/duration.
+    """
+
+    MODES = ('full', 'first', 'center', 'windows')
+
+    def __init__(self, mode='full', seconds=30.0, count=3):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown excerpt mode {mode!r}; expected one of {self.MODES}")
+        if mode != 'full' and seconds <= 0:
+            raise ValueError("Excerpt length must be positive")
+        if mode == 'windows' and count < 1:
+            raise ValueError("At least one window is required")
+        self.mode = mode
+        self.seconds = float(seconds)
+        self.count = int(count)
+
+    @classmethod
+    def first(cls, seconds=30.0):
+        return cls('first', seconds)
+
+    @classmethod
+    def center(cls, seconds=30.0):
+        return cls('center', seconds)
+
+    @classmethod
+    def spaced(cls, count=3, seconds=10.0):
+        return cls('windows', seconds, count)
+
+    @property
+    def is_full(self):
+        return self.mode == 'full'
+
+    def __repr__(self):
+        return f"ExcerptPolicy(mode={self.mode!r}, seconds={self.seconds}, count={self.count})"
+
+    def cache_params(self):
+        if self.is_full:
+            return {}
+        return {'excerpt': self.mode, 'excerpt_seconds': self.seconds,
+                'excerpt_count': self.count if self.mode == 'windows' else 1}
+
+    def needs_duration(self):
+        return self.mode in ('center', 'windows')
+
+    def windows(self, total_duration=None):
+        """List of `(offset, duration)` pairs in seconds; `duration` None means to the end."""
+        if self.is_full:
+            return [(0.0, None)]
+        if self.mode == 'first':
+            return [(0.0, self.seconds)]
+        if total_duration is None:
+            raise ValueError(f"The {self.mode!r} excerpt needs the file duration")
+        if total_duration <= self.seconds:
+            return [(0.0, None)]
+        if self.mode == 'center':
+            return [((total_duration - self.seconds) / 2, self.seconds)]
+        offsets = np.linspace(0.0, total_duration - self.seconds, self.count)
+        return [(float(offset), self.seconds) for offset in offsets]
+
+    def file_windows(self, file_path):
+        # Reads only the header for formats soundfile supports
+        total_duration = librosa.get_duration(path=file_path) if self.needs_duration() else None
+        return self.windows(total_duration)
+
+FULL_TRACK = ExcerptPolicy()
+
+__all__ = ['ExcerptPolicy', 'FULL_TRACK']
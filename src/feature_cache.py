@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+import numpy as np
+from src import feature_config
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'synthet', 'features')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# The cache only ever deletes directories inside its own subdirectory of `cache_dir`
+# that carry this marker and are named like a fingerprint
+OWNED_SUBDIR = 'synthet-feature-cache'
+MARKER_NAME = '.synthet-feature-cache'
+_FINGERPRINT_RE = re.compile(r'^[0-9a-f]{16}$')
+
+def config_fingerprint():
+    """Hash of every feature schema key and the feature dtype; changing either changes it."""
+    payload = json.dumps([[schema.key for schema in feature_config.SCHEMAS],
+                          feature_config.get_feature_dtype().str, CACHE_FORMAT_VERSION])
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def file_fingerprint(file_path, content_hash=False):
+    """Identify a file by its bytes, or by path, size and mtime on the fast path."""
+    if content_hash:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    stat = os.stat(file_path)
+    return f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+class FeatureCache:
+    """Persistent on-disk cache of extracted feature vectors.
+
+    Entries live in `cache_dir/synthet-feature-cache/<fingerprint>/`, named
+    after the current feature config fingerprint, so changing a feature schema
+    or the feature dtype orphans every old entry and the stale directories are
+    removed on the next open. Only directories the cache created (marked and
+    named like a fingerprint) are ever removed, so `cache_dir` may hold other
+    files. Total size is bounded by `max_bytes`; the least recently used
+    entries are evicted first.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, content_hash=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.content_hash = content_hash
+        self.fingerprint = config_fingerprint()
+        self.owned_dir = os.path.join(cache_dir, OWNED_SUBDIR)
+        self.entry_dir = os.path.join(self.owned_dir, self.fingerprint)
+        self._make_entry_dir()
+        self._remove_stale_configs()
+        self._size = sum(size for _, _, size in self._entries())
+
+    def _make_entry_dir(self):
+        os.makedirs(self.entry_dir, exist_ok=True)
+        open(os.path.join(self.entry_dir, MARKER_NAME), 'a').close()
+
+    def _remove_stale_configs(self):
+        for name in os.listdir(self.owned_dir):
+            path = os.path.join(self.owned_dir, name)
+            if (name != self.fingerprint and _FINGERPRINT_RE.match(name)
+                    and os.path.isfile(os.path.join(path, MARKER_NAME))):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _entries(self):
+        for name in os.listdir(self.entry_dir):
+            if not name.endswith('.npy'):
+                continue
+            path = os.path.join(self.entry_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_mtime, stat.st_size
+
+    def _path(self, key):
+        return os.path.join(self.entry_dir, key + '.npy')
+
+    def key(self, file_path, namespace, **params):
+        """Cache key for `file_path` as extracted by `namespace` with the given settings."""
+        payload = json.dumps({
+            'file': file_fingerprint(file_path, self.content_hash),
+            'namespace': namespace,
+            'params': params,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            features = np.load(path)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        os.utime(path)  # Mark as recently used
+        return features
+
+    def put(self, key, features):
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(features))
+        try:
+            self._size -= os.path.getsize(path)  # Overwriting an entry replaces its bytes
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)  # Atomic, so concurrent workers never see partial entries
+        self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache is under 90% of max_bytes."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self._size = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        for path, _, size in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+    def clear(self):
+        shutil.rmtree(self.entry_dir, ignore_errors=True)
+        self._make_entry_dir()
+        self._size = 0
+
+    def get_or_compute(self, file_path, namespace, compute, **params):
+        """Return cached features for `file_path`, calling `compute()` and storing the result on a miss.
+
+        `compute` may return None to signal failure; failures are not cached.
+        """
+        key = self.key(file_path, namespace, **params)
+        features = self.get(key)
+        if features is None:
+            features = compute()
+            if features is not None:
+                self.put(key, features)
+        return features
+
+__all__ = ['FeatureCache', 'config_fingerprint', 'file_fingerprint', 'DEFAULT_CACHE_DIR']
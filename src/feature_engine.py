@@ -0,0 +1,133 @@
+import librosa
+import numpy as np
+from src.feature_config import GENRE_SCHEMA, get_feature_dtype
+from src.instrumentation import stage
+from src.tempo import DEFAULT_TEMPO_METHOD, estimate_tempo_from_onsets
+
+FEATURE_DTYPE = get_feature_dtype()
+
+# Group widths of the genre layout, resolved once
+N_MFCC = GENRE_SCHEMA.widths['mfcc']
+N_CONTRAST = GENRE_SCHEMA.widths['spectral_contrast']
+N_CHROMA = GENRE_SCHEMA.widths['chroma']
+
+# Decode rate and STFT parameters shared by every spectral feature (librosa defaults)
+SAMPLE_RATE = 22050
+N_FFT = 2048
+HOP_LENGTH = 512
+
+def frame_params(sr):
+    """STFT size and hop at rate `sr` with the same bin spacing and frame rate as N_FFT/HOP_LENGTH at SAMPLE_RATE."""
+    if sr == SAMPLE_RATE:
+        return N_FFT, HOP_LENGTH
+    hop_length = int(round(HOP_LENGTH * sr / SAMPLE_RATE))
+    return hop_length * (N_FFT // HOP_LENGTH), hop_length
+
+class Spectrogram:
+    """One STFT of a signal and the views the feature extractors need.
+
+    librosa's feature functions each run their own STFT when given `y`; passing
+    these precomputed views through their `S=` arguments gives identical values
+    for a single FFT pass.
+
+    Audio at any other rate than SAMPLE_RATE is analyzed natively instead of
+    being resampled: the STFT is sized by `frame_params`, cut (or zero-padded)
+    to the bins below SAMPLE_RATE's Nyquist and rescaled to a SAMPLE_RATE-sized
+    window. `sr`, `n_fft` and `hop_length` then describe that equivalent grid,
+    so every feature keeps its meaning and units; `frame_length` and
+    `frame_hop` are the sizes actually used on the samples.
+    """
+
+    def __init__(self, y, sr, n_fft=None, hop_length=None):
+        native_n_fft, native_hop = frame_params(sr)
+        self.frame_length = n_fft or native_n_fft
+        self.frame_hop = hop_length or native_hop
+        magnitude = np.abs(librosa.stft(y, n_fft=self.frame_length, hop_length=self.frame_hop))
+
+        if sr != SAMPLE_RATE and n_fft is None and hop_length is None:
+            n_bins = N_FFT // 2 + 1
+            magnitude = magnitude[:n_bins] * (N_FFT / self.frame_length)
+            if len(magnitude) < n_bins:
+                magnitude = np.pad(magnitude, ((0, n_bins - len(magnitude)), (0, 0)))
+            self.sr = sr * N_FFT / self.frame_length
+            self.n_fft = N_FFT
+            self.hop_length = HOP_LENGTH
+        else:
+            self.sr = sr
+            self.n_fft = self.frame_length
+            self.hop_length = self.frame_hop
+
+        self.magnitude = magnitude
+        self.power = self.magnitude ** 2
+        self.mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=self.power, sr=self.sr))
+
+    def spectral_centroid(self):
+        return librosa.feature.spectral_centroid(S=self.magnitude, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)
+
+    def spectral_bandwidth(self):
+        return librosa.feature.spectral_bandwidth(S=self.magnitude, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)
+
+    def spectral_contrast(self):
+        return librosa.feature.spectral_contrast(S=self.magnitude, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)
+
+    def spectral_rolloff(self):
+        return librosa.feature.spectral_rolloff(S=self.magnitude, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)
+
+    def chroma(self):
+        return librosa.feature.chroma_stft(S=self.power, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)
+
+    def mfcc(self, n_mfcc):
+        return librosa.feature.mfcc(S=self.mel_db, sr=self.sr, n_mfcc=n_mfcc)
+
+    def onset_envelope(self, aggregate=np.median):
+        # beat_track aggregates mel bands with the median when it builds its own envelope
+        return librosa.onset.onset_strength(S=self.mel_db, sr=self.sr, hop_length=self.hop_length, aggregate=aggregate)
+
+def estimate_tempo(spec, method=DEFAULT_TEMPO_METHOD):
+    """Tempo in BPM from the spectrogram's onset envelope; `method` is one of TEMPO_METHODS."""
+    return estimate_tempo_from_onsets(spec.onset_envelope(), spec.sr, spec.hop_length, method)
+
+def extract_features(y, sr, progress_bar=None, tempo_method=DEFAULT_TEMPO_METHOD, out=None):
+    """Fill a GENRE_SCHEMA row (`out`, or a new one) from a single spectrogram of `y` at SAMPLE_RATE or its native rate."""
+    audio_seconds = len(y) / sr
+    with stage('stft', audio_seconds=audio_seconds):
+        spec = Spectrogram(y, sr)
+
+    # Basic features
+    with stage('tempo', audio_seconds=audio_seconds):
+        tempo = estimate_tempo(spec, tempo_method)
+    if progress_bar:
+        progress_bar.setValue(40)
+
+    # Spectral features
+    with stage('spectral', audio_seconds=audio_seconds):
+        spectral_centroid = spec.spectral_centroid().mean()
+        spectral_bandwidth = spec.spectral_bandwidth().mean()
+        spectral_contrast = spec.spectral_contrast().mean(axis=1)
+        spectral_rolloff = spec.spectral_rolloff().mean()
+    if progress_bar:
+        progress_bar.setValue(60)
+
+    # Timbre features
+    with stage('mfcc', audio_seconds=audio_seconds):
+        mfcc_means = spec.mfcc(N_MFCC).mean(axis=1)
+
+    # Harmonic features
+    with stage('chroma', audio_seconds=audio_seconds):
+        chroma_means = spec.chroma().mean(axis=1)
+
+    # Energy (time-domain, so it is not affected by the STFT window)
+    with stage('rms', audio_seconds=audio_seconds):
+        rms = librosa.feature.rms(y=y, frame_length=spec.frame_length, hop_length=spec.frame_hop).mean()
+
+    return assemble_features(tempo, spectral_centroid, spectral_bandwidth, spectral_contrast, spectral_rolloff,
+                             chroma_means, mfcc_means, rms, out)
+
+def assemble_features(tempo, spectral_centroid, spectral_bandwidth, spectral_contrast, spectral_rolloff,
+                      chroma_means, mfcc_means, rms, out=None):
+    """Pack per-track feature summaries into a GENRE_SCHEMA row (`out`, or a new one)."""
+    # The layout keeps only the first contrast bands and chroma bins
+    return GENRE_SCHEMA.pack((tempo, spectral_centroid, spectral_bandwidth, spectral_contrast[:N_CONTRAST],
+                              spectral_rolloff, chroma_means[:N_CHROMA], mfcc_means, rms), out)
+
+__all__ = ['Spectrogram', 'estimate_tempo', 'extract_features', 'assemble_features', 'frame_params', 'FEATURE_DTYPE', 'SAMPLE_RATE', 'N_FFT', 'HOP_LENGTH']
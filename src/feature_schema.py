@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+from types import MappingProxyType
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Next to a pickled estimator, `<file>.schema` holds the key of the layout it was fitted on
+SCHEMA_SIDECAR_SUFFIX = '.schema'
+
+class FeatureSchema:
+    """Immutable, versioned layout of a feature vector.
+
+    Built from an ordered list of `(group, width)` pairs. Slices, column names
+    and the identifying `key` are computed once here, so extraction code packs
+    a row without looking anything up per call, and datasets and fitted
+    models can record the exact layout they were built with.
+
+    `key` combines the name, version and a hash of the groups; bump `version`
+    whenever the meaning of a group changes without its width changing.
+    """
+
+    def __init__(self, name, version, groups, dtype=np.float32):
+        groups = tuple((str(group), int(width)) for group, width in groups)
+        slices = {}
+        names = []
+        start = 0
+        for group, width in groups:
+            slices[group] = slice(start, start + width)
+            names.extend([group] if width == 1 else [f"{group}_{i}" for i in range(width)])
+            start += width
+
+        digest = hashlib.sha256(json.dumps([name, version, groups]).encode()).hexdigest()[:12]
+        attributes = {
+            'name': name,
+            'version': version,
+            'groups': groups,
+            'dtype': np.dtype(dtype),
+            'size': start,
+            'names': tuple(names),
+            'slices': MappingProxyType(slices),
+            'widths': MappingProxyType(dict(groups)),
+            'index': MappingProxyType({group: s.start for group, s in slices.items() if s.stop - s.start == 1}),
+            'key': f"{name}-v{version}-{digest}",
+            '_targets': tuple(slices[group] for group, _ in groups),
+        }
+        for attribute, value in attributes.items():
+            object.__setattr__(self, attribute, value)
+
+    def __setattr__(self, attribute, value):
+        raise AttributeError("FeatureSchema is immutable")
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        return isinstance(other, FeatureSchema) and other.key == self.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"FeatureSchema({self.key!r}, size={self.size})"
+
+    def empty(self, n_rows=None):
+        """Uninitialized row (or `(n_rows, size)` matrix) in the schema's dtype."""
+        return np.empty(self.size if n_rows is None else (n_rows, self.size), dtype=self.dtype)
+
+    def pack(self, values, out=None):
+        """Write one value per group, in group order, into `out` (a new row when None)."""
+        if len(values) != len(self._targets):
+            raise ValueError(f"{self.key} has {len(self._targets)} groups, got {len(values)} values")
+        if out is None:
+            out = self.empty()
+        for target, value in zip(self._targets, values):
+            out[target] = value
+        return out
+
+    def check_width(self, n_features, what='features'):
+        if n_features != self.size:
+            raise ValueError(f"Expected {self.size} features for {self.key}, but {what} has {n_features}")
+
+    def check_key(self, key, what):
+        """Raise unless `key` (as recorded by a dataset or model) names this schema."""
+        if key != self.key:
+            found = 'no feature schema' if key is None else f"feature schema {key}"
+            raise ValueError(f"{what} was built with {found}, expected {self.key}")
+
+    def stamp(self, *estimators):
+        """Record this schema on fitted estimators; it is pickled along with them."""
+        for estimator in estimators:
+            estimator.feature_schema_ = self.key
+
+    def check_estimator(self, estimator, what, allow_unstamped=False):
+        """Raise if `estimator` was not fitted on this layout.
+
+        Estimators fitted before schemas were recorded carry no key, and their
+        columns may be in another order even when the width matches, so they
+        are rejected like unstamped datasets. With `allow_unstamped` they are
+        checked by width only and a warning is logged.
+        """
+        key = getattr(estimator, 'feature_schema_', None)
+        if key is not None or not allow_unstamped:
+            self.check_key(key, what)
+            return
+        if hasattr(estimator, 'n_features_in_'):
+            self.check_width(estimator.n_features_in_, what)
+        logger.warning("%s records no feature schema; assuming its columns follow %s", what, self.key)
+
+def load_estimator(path):
+    """`joblib.load(path)`, stamped with the key in `path + '.schema'` if it records none itself.
+
+    The sidecar lets a model pickled before schemas existed declare its layout
+    without being pickled again, which would tie it to the installed
+    scikit-learn version.
+    """
+    estimator = joblib.load(path)
+    if getattr(estimator, 'feature_schema_', None) is None:
+        try:
+            with open(path + SCHEMA_SIDECAR_SUFFIX) as f:
+                estimator.feature_schema_ = f.read().strip()
+        except FileNotFoundError:
+            pass
+    return estimator
+
+__all__ = ['FeatureSchema', 'SCHEMA_SIDECAR_SUFFIX', 'load_estimator']
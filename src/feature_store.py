@@ -0,0 +1,253 @@
+import json
+import os
+import shutil
+import numpy as np
+from src.feature_config import get_feature_dtype
+
+STORE_FORMAT_VERSION = 2
+META_NAME = 'meta.json'
+X_NAME = 'X.bin'
+SIDECARS = ('ids', 'y')
+# Version 1 stores kept the sidecars as .npy files rewritten on every append
+LEGACY_SIDECAR_FILES = {'ids': 'ids.npy', 'y': 'y.npy'}
+
+def _write_json_atomic(path, payload):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+def _append_raw(path, committed_bytes, array):
+    # Drop anything left past the committed rows by an interrupted append, then add the new rows
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+        f.truncate(committed_bytes)
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(array).tobytes())
+
+def is_feature_store(path):
+    return os.path.isfile(os.path.join(path, META_NAME))
+
+class FeatureStore:
+    """Directory-backed feature dataset that is read through a memory map.
+
+    `X.bin` holds the feature matrix as raw row-major values of the feature
+    dtype, and `ids` and `y` the track ids and labels as raw files in the same
+    way, with their dtypes in `meta.json` next to the row count, width and
+    feature schema key. Every array is opened as a read-only memory map, so
+    only the pages a reader touches are loaded and every process reading the
+    same store shares them through the page cache.
+
+    Rows are appended in place, so an append costs the size of the new rows
+    and not of the store; the row count in `meta.json` is updated last, so a
+    crash mid-append leaves the store at its previous length. A label or id
+    wider than the stored dtype (a longer string) rewrites that sidecar once
+    under a new name. A store holds rows of one FeatureSchema, fixed when it
+    is created. Version 1 stores are read as they are and converted on their
+    first append.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_NAME)) as f:
+            self.meta = json.load(f)
+        if self.meta['version'] not in (1, STORE_FORMAT_VERSION):
+            raise ValueError(f"Feature store {directory} has format version {self.meta['version']}, "
+                             f"expected {STORE_FORMAT_VERSION}")
+        self._X = None
+        self._ids = None
+        self._y = None
+        self._index = None
+
+    @classmethod
+    def create(cls, directory, schema, overwrite=False):
+        """Create an empty store for rows laid out by `schema` in `directory`."""
+        if os.path.exists(directory):
+            if not overwrite and os.listdir(directory):
+                raise FileExistsError(f"{directory} already exists and is not empty")
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+        open(os.path.join(directory, X_NAME), 'wb').close()
+        _write_json_atomic(os.path.join(directory, META_NAME), {
+            'version': STORE_FORMAT_VERSION,
+            'schema': schema.key,
+            'n_features': schema.size,
+            'dtype': get_feature_dtype().str,
+            'rows': 0,
+            'sidecars': {},
+        })
+        return cls(directory)
+
+    def __len__(self):
+        return self.meta['rows']
+
+    @property
+    def n_features(self):
+        return self.meta['n_features']
+
+    @property
+    def dtype(self):
+        return np.dtype(self.meta['dtype'])
+
+    @property
+    def schema_key(self):
+        return self.meta['schema']
+
+    @property
+    def X(self):
+        """Read-only memory map of the feature matrix, shape (rows, n_features)."""
+        if self._X is None:
+            if len(self) == 0:
+                self._X = np.empty((0, self.n_features), dtype=self.dtype)
+            else:
+                self._X = np.memmap(os.path.join(self.directory, X_NAME), dtype=self.dtype, mode='r',
+                                    shape=(len(self), self.n_features))
+        return self._X
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = self._load_sidecar('ids')
+        return self._ids
+
+    @property
+    def y(self):
+        if self._y is None:
+            self._y = self._load_sidecar('y')
+        return self._y
+
+    def _load_sidecar(self, name):
+        if self.meta['version'] == 1:
+            path = os.path.join(self.directory, LEGACY_SIDECAR_FILES[name])
+            return np.load(path, mmap_mode='r')[:len(self)] if os.path.exists(path) else None
+        info = self.meta['sidecars'].get(name)
+        if info is None:
+            return None
+        shape = (len(self),) + tuple(info['shape'])
+        if len(self) == 0:
+            return np.empty(shape, dtype=info['dtype'])
+        return np.memmap(os.path.join(self.directory, info['file']), dtype=info['dtype'], mode='r', shape=shape)
+
+    def rows_for(self, track_ids):
+        """Row indices of `track_ids`, in the order given. Raises KeyError for unknown ids."""
+        if self._index is None:
+            self._index = {track_id: row for row, track_id in enumerate(self.ids.tolist())}
+        return np.array([self._index[track_id] for track_id in np.asarray(track_ids).tolist()], dtype=np.int64)
+
+    def take(self, track_ids):
+        """Features and labels of `track_ids`; only those rows are read from disk."""
+        rows = self.rows_for(track_ids)
+        return np.asarray(self.X[rows]), np.asarray(self.y[rows])
+
+    def iter_batches(self, batch_size=4096, rows=None):
+        """Yield `(X, y)` blocks of at most `batch_size` rows, optionally restricted to `rows`."""
+        if rows is None:
+            for start in range(0, len(self), batch_size):
+                yield np.asarray(self.X[start:start + batch_size]), np.asarray(self.y[start:start + batch_size])
+        else:
+            for start in range(0, len(rows), batch_size):
+                block = np.sort(rows[start:start + batch_size])
+                yield np.asarray(self.X[block]), np.asarray(self.y[block])
+
+    def append(self, X, y, ids):
+        """Append rows with their labels and ids."""
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected rows of {self.n_features} features, got shape {X.shape}")
+        if not len(X) == len(y) == len(ids):
+            raise ValueError("X, y and ids must have the same length")
+        if len(X) == 0:
+            return
+
+        rows = len(self)
+        if self.meta['version'] == 1:
+            self._upgrade()
+        stale = []
+        for name, values in (('ids', np.asarray(ids)), ('y', np.asarray(y))):
+            stale += self._append_sidecar(name, values, rows)
+        _append_raw(os.path.join(self.directory, X_NAME), rows * self.n_features * self.dtype.itemsize, X)
+
+        self.meta['rows'] = rows + len(X)
+        _write_json_atomic(os.path.join(self.directory, META_NAME), self.meta)
+        for path in stale:
+            os.remove(path)
+        self._X = self._ids = self._y = self._index = None
+
+    def _append_sidecar(self, name, values, rows):
+        """Append `values` to sidecar `name`; returns files made obsolete once meta.json is written."""
+        if values.dtype.hasobject:
+            raise ValueError(f"Store {name} must be numbers or strings, not objects")
+        info = self.meta['sidecars'].get(name)
+        stale = []
+        if info is None:
+            info = {'file': f'{name}.bin', 'dtype': values.dtype.str, 'shape': list(values.shape[1:])}
+        elif list(values.shape[1:]) != info['shape']:
+            raise ValueError(f"Expected {name} rows of shape {tuple(info['shape'])}, got {values.shape[1:]}")
+        else:
+            dtype = np.promote_types(np.dtype(info['dtype']), values.dtype)
+            if dtype != np.dtype(info['dtype']):
+                # Widen the stored rows into a new file; the old one stays valid until meta.json names the new one
+                old = self._load_sidecar(name)
+                widened = {'file': f'{name}-{dtype.itemsize}.bin', 'dtype': dtype.str, 'shape': info['shape']}
+                with open(os.path.join(self.directory, widened['file']), 'wb') as f:
+                    f.write(np.ascontiguousarray(np.asarray(old).astype(dtype)).tobytes())
+                stale.append(os.path.join(self.directory, info['file']))
+                info = widened
+        dtype = np.dtype(info['dtype'])
+        item_bytes = dtype.itemsize * int(np.prod(info['shape']))
+        _append_raw(os.path.join(self.directory, info['file']), rows * item_bytes, values.astype(dtype, copy=False))
+        self.meta['sidecars'][name] = info
+        return stale
+
+    def _upgrade(self):
+        """Convert a version 1 store's .npy sidecars to raw files, in place."""
+        rows = len(self)
+        sidecars = {}
+        for name in SIDECARS:
+            values = self._load_sidecar(name)
+            if values is None:
+                continue
+            sidecars[name] = {'file': f'{name}.bin', 'dtype': values.dtype.str, 'shape': list(values.shape[1:])}
+            with open(os.path.join(self.directory, sidecars[name]['file']), 'wb') as f:
+                f.write(np.ascontiguousarray(values).tobytes())
+        self.meta.update(version=STORE_FORMAT_VERSION, sidecars=sidecars, rows=rows)
+        _write_json_atomic(os.path.join(self.directory, META_NAME), self.meta)
+        for name in LEGACY_SIDECAR_FILES.values():
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+        self._ids = self._y = None
+
+def load_dataset(path, schema=None):
+    """`(X, y)` from a feature store directory (X memory-mapped) or an `.npz` file.
+
+    `X` comes back in the feature dtype; a store written with another dtype
+    (or any `.npz`) is converted on load. With `schema`, the dataset must have
+    been written with that FeatureSchema, or ValueError is raised.
+    """
+    if os.path.isdir(path):
+        store = FeatureStore(path)
+        key = store.schema_key
+        X, y = store.X, store.y
+    else:
+        data = np.load(path)
+        key = str(data['schema']) if 'schema' in data.files else None
+        X, y = data['X'], data['y']
+    if schema is not None:
+        schema.check_key(key, f"Dataset {path}")
+    return X.astype(get_feature_dtype(), copy=False), y
+
+def open_feature_store(path, schema=None):
+    """The FeatureStore at `path`, for readers that stream it rather than load it.
+
+    Raises ValueError if `path` is not a store directory (an `.npz` file has
+    to be read whole) or, with `schema`, was written with another FeatureSchema.
+    """
+    if not is_feature_store(path):
+        raise ValueError(f"{path} is not a feature store directory; prepare the dataset with an output path "
+                         "that does not end in .npz")
+    store = FeatureStore(path)
+    if schema is not None:
+        schema.check_key(store.schema_key, f"Dataset {path}")
+    return store
+
+__all__ = ['FeatureStore', 'is_feature_store', 'load_dataset', 'open_feature_store']
@@ -3,64 +3,89 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 import joblib
-import os
-from src.feature_config import get_genre_feature_config
+import logging
+from src.feature_config import GENRE_SCHEMA
+from src.model_registry import get_genre_predictor
+from src.feature_store import load_dataset
+from src.training import fit_forest
 
-FEATURE_CONFIG = get_genre_feature_config()
+logger = logging.getLogger(__name__)
 
-def train_genre_classifier(data_file, model_output, scaler_output):
-    if not os.path.exists(data_file):
-        print(f"Data file {data_file} not found. Please run the data preparation script first.")
-        return
+def train_genre_classifier(data_file, model_output, scaler_output, progress_callback=None, n_jobs=-1,
+                           time_budget=None):
+    """Train the genre forest on `data_file`, building each batch of trees on `n_jobs` cores (-1: all).
 
-    data = np.load(data_file)
-    X, y = data['X'], data['y']
+    Progress advances with every batch of trees; with `time_budget` seconds
+    the forest stops growing once the budget is spent.
+    """
+    if progress_callback:
+        progress_callback(0)
 
-    if len(X) == 0 or len(y) == 0:
-        print("The dataset is empty. Please run the data preparation script to generate a non-empty dataset.")
-        return
+    # Load the data (a feature store stays memory-mapped; only the split rows are read)
+    X, y = load_dataset(data_file, schema=GENRE_SCHEMA)
+
+    if progress_callback:
+        progress_callback(10)
 
     # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    train_rows, test_rows = train_test_split(np.arange(len(X)), test_size=0.2, random_state=42)
+    X_train, y_train = X[train_rows], y[train_rows]
+    X_test, y_test = X[test_rows], y[test_rows]
     
+    if progress_callback:
+        progress_callback(20)
+
     # Scale the features
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
     
+    if progress_callback:
+        progress_callback(30)
+
     # Train the classifier
-    clf = RandomForestClassifier(n_estimators=100, random_state=42)
-    clf.fit(X_train_scaled, y_train)
+    clf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    batch_progress = (lambda fraction: progress_callback(30 + int(40 * fraction))) if progress_callback else None
+    fit_forest(clf, X_train_scaled, y_train, progress_callback=batch_progress, time_budget=time_budget)
     
+    if progress_callback:
+        progress_callback(70)
+
     # Evaluate the classifier
     train_score = clf.score(X_train_scaled, y_train)
     test_score = clf.score(X_test_scaled, y_test)
-    print(f"Train accuracy: {train_score:.2f}")
-    print(f"Test accuracy: {test_score:.2f}")
+    logger.info("Train accuracy: %.2f, test accuracy: %.2f", train_score, test_score,
+                extra={'train_accuracy': train_score, 'test_accuracy': test_score})
     
-    # Save the model and scaler
+    if progress_callback:
+        progress_callback(80)
+
+    # Save the model and scaler, recording the feature layout they expect. Inference
+    # mostly scores one track at a time, where a thread pool per call only adds overhead.
+    clf.set_params(n_jobs=None)
+    GENRE_SCHEMA.stamp(clf, scaler)
     joblib.dump(clf, model_output)
     joblib.dump(scaler, scaler_output)
-    print("Model and scaler saved successfully.")
+    
+    if progress_callback:
+        progress_callback(100)
+
+    logger.info("Model and scaler saved to %s and %s", model_output, scaler_output)
 
 def predict_genre(audio_features, model_file, scaler_file):
     try:
-        clf = joblib.load(model_file)
-        scaler = joblib.load(scaler_file)
+        predictor = get_genre_predictor(model_file, scaler_file)
     except FileNotFoundError:
-        print("Classifier or scaler not found. Unable to predict genre.")
+        logger.warning("Classifier or scaler not found. Unable to predict genre.")
         return None
 
-    # Use features up to MFCCs for genre classification
-    genre_features = audio_features[:FEATURE_CONFIG['TOTAL_FEATURES']]
-
-     # Ensure genre_features is a 2D array
-    if len(genre_features.shape) == 1:
-        genre_features = genre_features.reshape(1, -1)
+    return predictor.predict(audio_features)
 
-    features_scaled = scaler.transform(genre_features)
-    genre_prediction = clf.predict(features_scaled)[0]
-    genre_probabilities = clf.predict_proba(features_scaled)[0]
-    top_genres = sorted(zip(clf.classes_, genre_probabilities), key=lambda x: x[1], reverse=True)[:3]
+def predict_genre_batch(features, model_file, scaler_file, top_k=3):
+    try:
+        predictor = get_genre_predictor(model_file, scaler_file)
+    except FileNotFoundError:
+        logger.warning("Classifier or scaler not found. Unable to predict genre.")
+        return None
 
-    return genre_prediction, top_genres
\ No newline at end of file
+    return predictor.predict_batch(features, top_k=top_k)
\ No newline at end of file
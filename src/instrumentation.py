@@ -0,0 +1,208 @@
+"""Named stage spans from the analysis pipeline, for progress, profiling and metrics.
+
+The pipeline wraps its stages in `stage(name)`: decode, stft, tempo,
+spectral, mfcc, chroma, rms and predict. Each finished stage becomes a Span
+with its duration and attributes such as `audio_seconds` and `bytes`
+(decoded sample bytes), and is passed to every callback registered with
+`observe` in the current thread or task. With no observer a stage costs one
+context-variable lookup.
+
+    stats = StageStats()
+    with observe(stats):
+        analyze_audio(path)
+    print(stats.prometheus_text())
+
+Work done in a process pool is observed there with `record_spans`, and the
+spans are sent back with the result to the parent's observer.
+"""
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+STAGES = ('decode', 'stft', 'tempo', 'spectral', 'mfcc', 'chroma', 'rms', 'predict')
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Span:
+    """One finished stage: its name, wall time and attributes."""
+
+    __slots__ = ('name', 'seconds', 'attrs')
+
+    def __init__(self, name, seconds, attrs=None):
+        self.name = name
+        self.seconds = seconds
+        self.attrs = attrs or {}
+
+    def __repr__(self):
+        return f"Span({self.name!r}, {self.seconds:.6f}, {self.attrs!r})"
+
+    @property
+    def audio_seconds(self):
+        return self.attrs.get('audio_seconds')
+
+    @property
+    def bytes(self):
+        return self.attrs.get('bytes')
+
+    def as_dict(self):
+        return {'name': self.name, 'seconds': self.seconds, **self.attrs}
+
+_observers = contextvars.ContextVar('synthet_span_observers', default=())
+
+@contextlib.contextmanager
+def observe(callback):
+    """Send every span finished in this thread or task to `callback` while the block runs."""
+    token = _observers.set(_observers.get() + (callback,))
+    try:
+        yield callback
+    finally:
+        _observers.reset(token)
+
+def emit(span):
+    for callback in _observers.get():
+        callback(span)
+
+@contextlib.contextmanager
+def stage(name, **attrs):
+    """Time the block as a span called `name`.
+
+    Yields the attribute dict, so values only known inside the block (bytes
+    decoded, rows predicted) can be added to it. A block that raises emits
+    nothing.
+    """
+    if not _observers.get():
+        yield attrs
+        return
+    start = time.perf_counter()
+    yield attrs
+    emit(Span(name, time.perf_counter() - start, attrs))
+
+class SpanRecorder:
+    """Observer that keeps the spans it receives, e.g. to return them from a pool worker."""
+
+    def __init__(self):
+        self.spans = []
+
+    def __call__(self, span):
+        self.spans.append(span)
+
+    def replay(self):
+        """Emit the recorded spans to the current thread's observers."""
+        for span in self.spans:
+            emit(span)
+
+def record_spans(func, *args, **kwargs):
+    """Call `func` and return `(result, spans)`, the spans it produced in this thread.
+
+    Made for pool workers: wrap the job with `partial(record_spans, func)`
+    and hand the spans to the parent's observer along with the result.
+    """
+    recorder = SpanRecorder()
+    with observe(recorder):
+        result = func(*args, **kwargs)
+    return result, recorder.spans
+
+class StageStats:
+    """Observer aggregating spans per stage: counts, latency histograms, audio seconds and bytes.
+
+    Safe to share between threads. The real-time factor is processing time
+    over audio duration, so values below 1 are faster than real time.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, span):
+        with self._lock:
+            entry = self._stages.get(span.name)
+            if entry is None:
+                entry = self._stages[span.name] = {'count': 0, 'seconds': 0.0, 'audio_seconds': 0.0, 'bytes': 0,
+                                                   'histogram': [0] * (len(self.buckets) + 1)}
+            entry['count'] += 1
+            entry['seconds'] += span.seconds
+            entry['audio_seconds'] += span.audio_seconds or 0.0
+            entry['bytes'] += span.bytes or 0
+            entry['histogram'][bisect.bisect_left(self.buckets, span.seconds)] += 1
+
+    def add(self, spans):
+        for span in spans:
+            self(span)
+
+    def __len__(self):
+        return len(self._stages)
+
+    def quantile(self, name, q):
+        """Upper bound of the histogram bucket holding quantile `q` of stage `name` (inf past the last)."""
+        with self._lock:
+            entry = self._stages[name]
+            rank = q * entry['count']
+            seen = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry['histogram']):
+                seen += count
+                if seen >= rank:
+                    return bound
+        return float('inf')
+
+    def real_time_factor(self):
+        """Time spent in all stages over the audio duration decoded, or None before any decode."""
+        with self._lock:
+            decoded = self._stages.get('decode', {}).get('audio_seconds', 0.0)
+            total = sum(entry['seconds'] for entry in self._stages.values())
+        return total / decoded if decoded else None
+
+    def as_dict(self):
+        """JSON-ready summary: per-stage totals and histogram, and the overall real-time factor."""
+        stages = {}
+        with self._lock:
+            for name, entry in self._stages.items():
+                stages[name] = {
+                    'count': entry['count'],
+                    'total_seconds': entry['seconds'],
+                    'mean_seconds': entry['seconds'] / entry['count'],
+                    'audio_seconds': entry['audio_seconds'],
+                    'bytes': entry['bytes'],
+                    'real_time_factor': entry['seconds'] / entry['audio_seconds'] if entry['audio_seconds'] else None,
+                    'histogram': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], entry['histogram'])),
+                }
+        return {'stages': stages, 'real_time_factor': self.real_time_factor()}
+
+    def prometheus_text(self, prefix='synthet'):
+        """The statistics in the Prometheus text exposition format."""
+        lines = [f'# TYPE {prefix}_stage_seconds histogram']
+        with self._lock:
+            stages = {name: dict(entry, histogram=list(entry['histogram'])) for name, entry in self._stages.items()}
+        for name, entry in sorted(stages.items()):
+            cumulative = 0
+            for bound, count in zip([repr(bound) for bound in self.buckets] + ['+Inf'], entry['histogram']):
+                cumulative += count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {entry["seconds"]!r}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {entry["count"]}')
+        lines.append(f'# TYPE {prefix}_stage_audio_seconds_total counter')
+        lines += [f'{prefix}_stage_audio_seconds_total{{stage="{name}"}} {entry["audio_seconds"]!r}'
+                  for name, entry in sorted(stages.items())]
+        lines.append(f'# TYPE {prefix}_decoded_bytes_total counter')
+        lines.append(f'{prefix}_decoded_bytes_total {stages.get("decode", {}).get("bytes", 0)}')
+        rtf = self.real_time_factor()
+        if rtf is not None:
+            lines.append(f'# TYPE {prefix}_real_time_factor gauge')
+            lines.append(f'{prefix}_real_time_factor {rtf!r}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """One line per stage: count, mean and total time; then the real-time factor."""
+        lines = []
+        for name, entry in self.as_dict()['stages'].items():
+            lines.append(f"{name:<10}{entry['count']:>7} x {1000 * entry['mean_seconds']:>9.1f} ms"
+                         f"  = {entry['total_seconds']:>8.2f} s")
+        rtf = self.real_time_factor()
+        if rtf is not None:
+            lines.append(f"real-time factor {rtf:.3f}")
+        return '\n'.join(lines)
+
+__all__ = ['STAGES', 'Span', 'SpanRecorder', 'StageStats', 'emit', 'observe', 'record_spans', 'stage']
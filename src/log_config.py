@@ -0,0 +1,132 @@
+"""Logging setup shared by the GUI, the command-line tools and the preparation scripts.
+
+Library modules only create `logging.getLogger(__name__)` loggers; entry
+points call `configure_logging` once. Records go to stderr as text or, with
+`fmt='json'`, one JSON object per line including any `extra=` fields, and a
+RateLimitFilter keeps a burst of repeated messages (a warning per failed
+file, say) from flooding the output.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+
+LOG_FORMATS = ('text', 'json')
+TEXT_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most `burst` records per message template and logger every `period` seconds.
+
+    Dropped records are counted, and the first record let through after a
+    drop reports how many were suppressed.
+    """
+
+    def __init__(self, burst=10, period=60.0):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - start >= self.period:
+                start, count = now, 0
+            if count >= self.burst:
+                self._windows[key] = (start, count, suppressed + 1)
+                return False
+            self._windows[key] = (start, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and any `extra=` fields."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class RunSummary:
+    """Tallies a batch run so it ends with one summary record rather than a line per item.
+
+    Successes are logged at DEBUG and failures at WARNING (which the rate
+    limit thins out on long runs); `finish` logs the totals, throughput and
+    failures grouped by error type.
+    """
+
+    def __init__(self, logger, noun='item'):
+        self.logger = logger
+        self.noun = noun
+        self.succeeded = 0
+        self.errors = Counter()
+        self.start = time.perf_counter()
+
+    def success(self, item_id):
+        self.succeeded += 1
+        self.logger.debug("Processed %s %s", self.noun, item_id)
+
+    def failure(self, item_id, error):
+        # Pool errors arrive as "ExceptionType: message"
+        self.errors[str(error).split(':', 1)[0] or 'Error'] += 1
+        self.logger.warning("Failed %s %s: %s", self.noun, item_id, error)
+
+    def finish(self, **extra):
+        seconds = time.perf_counter() - self.start
+        failed = sum(self.errors.values())
+        rate = self.succeeded / seconds if seconds > 0 else 0.0
+        self.logger.info("Processed %d %ss, %d failed, in %.1f s (%.2f/s)", self.succeeded, self.noun, failed, seconds,
+                         rate, extra={'succeeded': self.succeeded, 'failed': failed, 'seconds': seconds,
+                                      'per_second': rate, **extra})
+        if failed:
+            self.logger.warning("Failures by type: %s",
+                                ', '.join(f"{name} x{count}" for name, count in self.errors.most_common()),
+                                extra={'errors': dict(self.errors)})
+
+def configure_logging(level=logging.INFO, fmt='text', stream=None, burst=10, period=60.0):
+    """Send the application's log records to `stream` (stderr) at `level`, replacing earlier setup.
+
+    `level` may be a name such as 'DEBUG'. `burst`/`period` configure the
+    rate limit; `burst=None` disables it.
+    """
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format {fmt!r}; expected one of {LOG_FORMATS}")
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    if burst is not None:
+        handler.addFilter(RateLimitFilter(burst, period))
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    # numba and matplotlib log compilation and font details at DEBUG
+    for noisy in ('numba', 'matplotlib', 'PIL'):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+    return handler
+
+def add_logging_arguments(parser):
+    """--log-level and --log-format options for an argparse parser."""
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="Log level (default: INFO)")
+    parser.add_argument('--log-format', default='text', choices=LOG_FORMATS, help="Log record format")
+
+__all__ = ['JsonFormatter', 'LOG_FORMATS', 'RateLimitFilter', 'RunSummary', 'add_logging_arguments', 'configure_logging']
@@ -0,0 +1,115 @@
+import os
+import threading
+import numpy as np
+from src.feature_config import GENRE_SCHEMA
+from src.feature_schema import load_estimator
+from src.instrumentation import stage
+from src.mood_detector import MoodDetector
+
+class GenrePredictor:
+    """A fitted genre classifier and its scaler, ready to score GENRE_SCHEMA feature vectors.
+
+    Raises ValueError if either was fitted on another feature layout, or
+    records none and `allow_unstamped` is not set.
+    """
+
+    def __init__(self, model, scaler, schema=GENRE_SCHEMA, allow_unstamped=False):
+        schema.check_estimator(scaler, "Genre scaler", allow_unstamped)
+        schema.check_estimator(model, "Genre classifier", allow_unstamped)
+        self.model = model
+        self.scaler = scaler
+        self.schema = schema
+
+    @property
+    def classes(self):
+        return self.model.classes_
+
+    def predict(self, audio_features):
+        genre_features = np.asarray(audio_features, dtype=self.schema.dtype)
+        self.schema.check_width(genre_features.shape[-1])
+
+        # Ensure genre_features is a 2D array
+        if len(genre_features.shape) == 1:
+            genre_features = genre_features.reshape(1, -1)
+
+        with stage('predict', model='genre', rows=1):
+            features_scaled = self.scaler.transform(genre_features)
+            genre_prediction = self.model.predict(features_scaled)[0]
+            genre_probabilities = self.model.predict_proba(features_scaled)[0]
+        top_genres = sorted(zip(self.model.classes_, genre_probabilities), key=lambda x: x[1], reverse=True)[:3]
+
+        return genre_prediction, top_genres
+
+    def predict_batch(self, features, top_k=3):
+        """Score an `(n, d)` feature matrix with one scaler and one model call.
+
+        Returns `(labels, top_genres, top_probabilities)`: the predicted label per
+        row, and `(n, top_k)` arrays of the most likely genres and their
+        probabilities in descending order.
+        """
+        genre_features = np.atleast_2d(np.asarray(features, dtype=self.schema.dtype))
+        self.schema.check_width(genre_features.shape[1])
+        with stage('predict', model='genre', rows=len(genre_features)):
+            probabilities = self.model.predict_proba(self.scaler.transform(genre_features))
+        classes = self.model.classes_
+
+        top_k = min(top_k, len(classes))
+        rows = np.arange(len(probabilities))[:, None]
+        if top_k < len(classes):
+            top_indices = np.argpartition(probabilities, -top_k, axis=1)[:, -top_k:]
+        else:
+            top_indices = np.tile(np.arange(len(classes)), (len(probabilities), 1))
+        order = np.argsort(-probabilities[rows, top_indices], axis=1)
+        top_indices = top_indices[rows, order]
+
+        labels = classes[np.argmax(probabilities, axis=1)]
+        return labels, classes[top_indices], probabilities[rows, top_indices]
+
+def _file_stamp(path):
+    stat = os.stat(path)  # Raises FileNotFoundError for missing models
+    return stat.st_mtime_ns, stat.st_size
+
+class ModelRegistry:
+    """Process-wide cache of deserialized models.
+
+    Each predictor is loaded once per set of files and reused until one of
+    those files changes on disk (mtime or size), at which point the next lookup
+    reloads it. Safe to share between threads.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, paths, build):
+        key = (kind,) + tuple(os.path.abspath(path) for path in paths)
+        stamps = tuple(_file_stamp(path) for path in paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamps:
+                entry = (stamps, build())
+                self._entries[key] = entry
+            return entry[1]
+
+    def genre_predictor(self, model_file, scaler_file, allow_unstamped=False):
+        return self._get(('genre', allow_unstamped), (model_file, scaler_file),
+                         lambda: GenrePredictor(load_estimator(model_file), load_estimator(scaler_file),
+                                                allow_unstamped=allow_unstamped))
+
+    def mood_detector(self, scaler_path, model_path, allow_unstamped=False):
+        return self._get(('mood', allow_unstamped), (scaler_path, model_path),
+                         lambda: MoodDetector.load(scaler_path, model_path, allow_unstamped=allow_unstamped))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+default_registry = ModelRegistry()
+
+def get_genre_predictor(model_file, scaler_file, allow_unstamped=False):
+    return default_registry.genre_predictor(model_file, scaler_file, allow_unstamped)
+
+def get_mood_detector(scaler_path, model_path, allow_unstamped=False):
+    return default_registry.mood_detector(scaler_path, model_path, allow_unstamped)
+
+__all__ = ['GenrePredictor', 'ModelRegistry', 'default_registry', 'get_genre_predictor', 'get_mood_detector']
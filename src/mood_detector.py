@@ -2,37 +2,68 @@ import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.neural_network import MLPRegressor
 import joblib
-from src.feature_config import get_feature_config, print_config
-
-FEATURE_CONFIG = get_feature_config()
+from src.feature_config import MOOD_SCHEMA
+from src.feature_schema import load_estimator
+from src.instrumentation import stage
+from src.training import fit_mlp
 
 class MoodDetector:
-    def __init__(self):
+    """Valence/arousal regressor over MOOD_SCHEMA feature vectors."""
+
+    def __init__(self, schema=MOOD_SCHEMA):
+        self.schema = schema
         self.scaler = StandardScaler()
         self.model = MLPRegressor(hidden_layer_sizes=(100, 50), max_iter=1000)
 
-    def train(self, X, y):
+    def train(self, X, y, progress_callback=None, time_budget=None):
+        """Fit the scaler and the MLP, with early stopping on a held-out slice (see training.fit_mlp).
+
+        `progress_callback` gets the fraction done after every epoch;
+        `time_budget` caps the training time in seconds.
+        """
+        X = np.asarray(X, dtype=self.schema.dtype)
+        self.schema.check_width(X.shape[1], "training data")
         X_scaled = self.scaler.fit_transform(X)
-        self.model.fit(X_scaled, y)
+        fit_mlp(self.model, X_scaled, y, max_epochs=self.model.max_iter, progress_callback=progress_callback,
+                time_budget=time_budget)
+        self.schema.stamp(self.scaler, self.model)
 
     def predict(self, features):
-        # Debugging step
-        print_config("Loaded Feature Config", FEATURE_CONFIG)
-        assert len(features) == FEATURE_CONFIG['TOTAL_FEATURES'], f"Expected {FEATURE_CONFIG['TOTAL_FEATURES']} features, but got {len(features)}"
-        X_scaled = self.scaler.transform(features.reshape(1, -1))
-        return self.model.predict(X_scaled)[0]
+        features = np.asarray(features, dtype=self.schema.dtype)
+        self.schema.check_width(len(features))
+        with stage('predict', model='mood', rows=1):
+            X_scaled = self.scaler.transform(features.reshape(1, -1))
+            return self.model.predict(X_scaled)[0]
+
+    def predict_batch(self, features):
+        """Predict `(valence, arousal)` for every row of an `(n, d)` matrix; returns an `(n, 2)` array."""
+        features = np.atleast_2d(np.asarray(features, dtype=self.schema.dtype))
+        self.schema.check_width(features.shape[1])
+        with stage('predict', model='mood', rows=len(features)):
+            return self.model.predict(self.scaler.transform(features))
 
     def save(self, scaler_path, model_path):
         joblib.dump(self.scaler, scaler_path)
         joblib.dump(self.model, model_path)
 
     @classmethod
-    def load(cls, scaler_path, model_path):
+    def load(cls, scaler_path, model_path, allow_unstamped=False):
+        """Load a saved detector; see FeatureSchema.check_estimator for `allow_unstamped`."""
         detector = cls()
-        detector.scaler = joblib.load(scaler_path)
-        detector.model = joblib.load(model_path)
+        detector.scaler = load_estimator(scaler_path)
+        detector.model = load_estimator(model_path)
+        detector.schema.check_estimator(detector.scaler, f"Mood scaler {scaler_path}", allow_unstamped)
+        detector.schema.check_estimator(detector.model, f"Mood model {model_path}", allow_unstamped)
+        cast_weights(detector.model, detector.schema.dtype)
         return detector
 
+def cast_weights(model, dtype):
+    """Convert a fitted MLP's weights to `dtype` in place so inference runs in that precision."""
+    if hasattr(model, 'coefs_'):
+        model.coefs_ = [coef.astype(dtype) for coef in model.coefs_]
+        model.intercepts_ = [intercept.astype(dtype) for intercept in model.intercepts_]
+    return model
+
 def mood_to_label(valence, arousal):
     if valence > 0.5 and arousal > 0.5:
         return "Happy/Excited"
@@ -41,4 +72,15 @@ def mood_to_label(valence, arousal):
     elif valence <= 0.5 and arousal > 0.5:
         return "Angry/Tense"
     else:
-        return "Sad/Depressed"
\ No newline at end of file
+        return "Sad/Depressed"
+
+def mood_to_labels(valence, arousal):
+    """Vectorized mood_to_label over arrays of valence and arousal."""
+    valence = np.asarray(valence)
+    arousal = np.asarray(arousal)
+    conditions = [
+        (valence > 0.5) & (arousal > 0.5),
+        (valence > 0.5) & (arousal <= 0.5),
+        (valence <= 0.5) & (arousal > 0.5),
+    ]
+    return np.select(conditions, ["Happy/Excited", "Calm/Relaxed", "Angry/Tense"], default="Sad/Depressed")
\ No newline at end of file
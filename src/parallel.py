@@ -0,0 +1,154 @@
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+def default_workers():
+    return os.cpu_count() or 1
+
+def _error_message(e):
+    return f"{type(e).__name__}: {e}"
+
+def _run_chunk(func, chunk):
+    # Exceptions are reported as strings so results always pickle back to the parent
+    results = []
+    for item in chunk:
+        try:
+            results.append((True, func(item)))
+        except Exception as e:
+            results.append((False, _error_message(e)))
+    return results
+
+class _ChunkPool:
+    """Process pool for `_run_chunk` that is rebuilt when a worker dies.
+
+    A worker killed by the OOM killer or a crash in native decoder code breaks
+    the executor and fails every chunk in flight, not just its own. Those
+    chunks are rerun one at a time in a fresh single-worker pool, so only the
+    chunk that kills its worker again is reported as failed.
+    """
+
+    def __init__(self, func, max_workers, initializer=None, initargs=()):
+        self.func = func
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self.executor = self._new_executor(max_workers)
+        self._executors = {}
+
+    def _new_executor(self, max_workers):
+        return ProcessPoolExecutor(max_workers=max_workers, initializer=self.initializer, initargs=self.initargs)
+
+    def _restart(self):
+        self.executor.shutdown(wait=False)
+        self.executor = self._new_executor(self.max_workers)
+
+    def submit(self, chunk):
+        try:
+            future = self.executor.submit(_run_chunk, self.func, chunk)
+        except BrokenProcessPool:
+            self._restart()
+            future = self.executor.submit(_run_chunk, self.func, chunk)
+        self._executors[future] = self.executor
+        return future
+
+    def results(self, chunk, future):
+        """`(ok, value)` for each item of `chunk`, whatever happened to its worker."""
+        executor = self._executors.pop(future)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            if executor is self.executor:
+                self._restart()
+            return self._run_isolated(chunk)
+        except Exception as e:
+            return [(False, _error_message(e))] * len(chunk)
+
+    def _run_isolated(self, chunk):
+        with self._new_executor(1) as executor:
+            try:
+                return executor.submit(_run_chunk, self.func, chunk).result()
+            except Exception as e:
+                return [(False, _error_message(e))] * len(chunk)
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+def _chunks(items, chunksize):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def bounded_map(func, items, max_workers=None, max_in_flight=None, chunksize=1, ordered=True, initializer=None,
+                initargs=()):
+    """Apply `func` to `items` in a process pool, yielding `(item, ok, value)` in input order.
+
+    `value` is the function result when `ok` is True, otherwise an error message.
+    At most `max_in_flight` chunks are submitted but not yet consumed, so memory
+    stays bounded however long `items` is. `func` must be a module-level function.
+    With `max_workers=1` everything runs in the calling process. With
+    `ordered=False` chunks are yielded as soon as they finish, so one slow item
+    does not hold back the results behind it. `initializer(*initargs)` runs
+    once in each worker process, never in the caller.
+
+    A worker process that dies (killed, or crashed in native code) fails only
+    the items of its own chunk, with the BrokenProcessPool message; the pool
+    is rebuilt and the remaining items still run.
+    """
+    max_workers = max_workers or default_workers()
+    max_in_flight = max_in_flight or 2 * max_workers
+    chunksize = max(1, chunksize)
+
+    if max_workers == 1:
+        for chunk in _chunks(items, chunksize):
+            for item, (ok, value) in zip(chunk, _run_chunk(func, chunk)):
+                yield item, ok, value
+        return
+
+    if not ordered:
+        yield from _unordered_map(func, items, max_workers, max_in_flight, chunksize, initializer, initargs)
+        return
+
+    pool = _ChunkPool(func, max_workers, initializer, initargs)
+    try:
+        pending = deque()
+        for chunk in _chunks(items, chunksize):
+            pending.append((chunk, pool.submit(chunk)))
+            if len(pending) >= max_in_flight:
+                done_chunk, future = pending.popleft()
+                for item, (ok, value) in zip(done_chunk, pool.results(done_chunk, future)):
+                    yield item, ok, value
+        while pending:
+            done_chunk, future = pending.popleft()
+            for item, (ok, value) in zip(done_chunk, pool.results(done_chunk, future)):
+                yield item, ok, value
+    finally:
+        pool.shutdown()
+
+def _unordered_map(func, items, max_workers, max_in_flight, chunksize, initializer, initargs):
+    pool = _ChunkPool(func, max_workers, initializer, initargs)
+    try:
+        pending = {}
+        for chunk in _chunks(items, chunksize):
+            pending[pool.submit(chunk)] = chunk
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_done = pending.pop(future)
+                    for item, (ok, value) in zip(chunk_done, pool.results(chunk_done, future)):
+                        yield item, ok, value
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_done = pending.pop(future)
+                for item, (ok, value) in zip(chunk_done, pool.results(chunk_done, future)):
+                    yield item, ok, value
+    finally:
+        pool.shutdown()
+
+__all__ = ['bounded_map', 'default_workers']
@@ -1,15 +1,43 @@
 import sys
 from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QFileDialog, QTextEdit, QProgressBar, QLabel, QTabWidget, QLineEdit
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal
 import os
-from model_training.prepare_fma import prepare_fma_dataset
-from model_training.train_genre_model import train_genre_classifier
-from model_training.prepare_deam import prepare_deam_dataset
-from model_training.train_mood_model import train_mood_model
+from src.parallel import default_workers
+
+# The model_training modules pull in pandas, sklearn and librosa, so each
+# action imports its own on the job thread rather than when the window opens.
+
+class _JobWorker(QObject):
+    """Runs one preparation or training job off the GUI thread.
+
+    `job` is called with a progress callback and returns the message to show
+    when it succeeds. Exactly one of `result` or `error` is emitted, followed
+    by `done`.
+    """
+
+    progress = pyqtSignal(int)
+    result = pyqtSignal(str)
+    error = pyqtSignal(str)
+    done = pyqtSignal()
+
+    def __init__(self, job, error_prefix):
+        super().__init__()
+        self.job = job
+        self.error_prefix = error_prefix
+
+    def run(self):
+        try:
+            self.result.emit(self.job(self.progress.emit))
+        except Exception as e:
+            self.error.emit(f"{self.error_prefix}: {e}")
+        finally:
+            self.done.emit()
 
 class PreparationApp(QWidget):
     def __init__(self):
         super().__init__()
+        self.job_thread = None
+        self.job_worker = None
         self.initUI()
 
     def initUI(self):
@@ -52,6 +80,14 @@ class PreparationApp(QWidget):
         num_files_layout.addWidget(num_files_label)
         num_files_layout.addWidget(self.num_files_input)
         layout.addLayout(num_files_layout)
+
+        # Add input for number of worker processes
+        fma_workers_layout = QHBoxLayout()
+        fma_workers_label = QLabel("Worker processes:")
+        self.fma_workers_input = QLineEdit(str(default_workers()))
+        fma_workers_layout.addWidget(fma_workers_label)
+        fma_workers_layout.addWidget(self.fma_workers_input)
+        layout.addLayout(fma_workers_layout)
         
         btn_audio = QPushButton("Select Audio Directory")
         btn_audio.clicked.connect(lambda: self.selectDirectory(self.fma_audio_dir, "Audio Directory"))
@@ -140,6 +176,14 @@ class PreparationApp(QWidget):
         file_count_layout.addWidget(self.deam_file_count_input)
         layout.addLayout(file_count_layout)
 
+        # Add worker process control
+        deam_workers_layout = QHBoxLayout()
+        deam_workers_label = QLabel("Worker processes:")
+        self.deam_workers_input = QLineEdit(str(default_workers()))
+        deam_workers_layout.addWidget(deam_workers_label)
+        deam_workers_layout.addWidget(self.deam_workers_input)
+        layout.addLayout(deam_workers_layout)
+
         btn_audio = QPushButton("Select Audio Directory")
         btn_audio.clicked.connect(lambda: self.selectDirectory(self.deam_audio_dir, "Audio Directory"))
         
@@ -217,6 +261,32 @@ class PreparationApp(QWidget):
         if file:
             label.setText(f"{title}: {file}")
 
+    def runJob(self, job, error_prefix):
+        """Run `job` on a worker thread, with the controls disabled until it finishes."""
+        if self.job_thread is not None:
+            return
+        thread = QThread(self)
+        worker = _JobWorker(job, error_prefix)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.updateProgress)
+        worker.result.connect(self.showMessage)
+        worker.error.connect(self.showMessage)
+        worker.done.connect(thread.quit)
+        thread.finished.connect(self.jobFinished)
+        self.job_thread, self.job_worker = thread, worker
+        self.setControlsEnabled(False)
+        thread.start()
+
+    def jobFinished(self):
+        self.job_thread.deleteLater()
+        self.job_thread = self.job_worker = None
+        self.setControlsEnabled(True)
+
+    def setControlsEnabled(self, enabled):
+        for control in self.findChildren(QPushButton) + self.findChildren(QLineEdit):
+            control.setEnabled(enabled)
+
     def prepareFMA(self):
         audio_dir = self.fma_audio_dir.text().split(": ")[1]
         metadata_path = self.fma_metadata.text().split(": ")[1]
@@ -225,23 +295,26 @@ class PreparationApp(QWidget):
         # Get the number of files to process
         num_files_text = self.num_files_input.text().strip()
         num_files = int(num_files_text) if num_files_text else None
-        
-        try:
-            prepare_fma_dataset(audio_dir, metadata_path, output_path, num_files=num_files, progress_callback=self.updateProgress)
-            self.showMessage("FMA dataset preparation completed successfully!")
-        except Exception as e:
-            self.showMessage(f"Error preparing FMA dataset: {str(e)}")
+        workers_text = self.fma_workers_input.text().strip()
+        workers = int(workers_text) if workers_text else 1
+
+        def job(progress_callback):
+            from model_training.prepare_fma import prepare_fma_dataset
+            failures = prepare_fma_dataset(audio_dir, metadata_path, output_path, num_files=num_files,
+                                           progress_callback=progress_callback, workers=workers)
+            return f"FMA dataset preparation completed successfully! ({len(failures)} tracks failed)"
+        self.runJob(job, "Error preparing FMA dataset")
 
     def trainGenreModel(self):
         data_file = self.genre_data_file.text().split(": ")[1]
         model_output = self.genre_model_output.text().split(": ")[1]
         scaler_output = self.genre_scaler_output.text().split(": ")[1]
-        
-        try:
-            train_genre_classifier(data_file, model_output, scaler_output, progress_callback=self.updateProgress)
-            self.showMessage("Genre model training completed successfully!")
-        except Exception as e:
-            self.showMessage(f"Error training genre model: {str(e)}")
+
+        def job(progress_callback):
+            from model_training.train_genre_model import train_genre_classifier
+            train_genre_classifier(data_file, model_output, scaler_output, progress_callback=progress_callback)
+            return "Genre model training completed successfully!"
+        self.runJob(job, "Error training genre model")
 
     def prepareDEAM(self):
         audio_dir = self.deam_audio_dir.text().split(": ")[1]
@@ -251,23 +324,26 @@ class PreparationApp(QWidget):
         # Get the number of files to process
         file_count_text = self.deam_file_count_input.text().strip()
         num_files = int(file_count_text) if file_count_text else None
+        workers_text = self.deam_workers_input.text().strip()
+        workers = int(workers_text) if workers_text else 1
 
-        try:
-            prepare_deam_dataset(audio_dir, annotations_file, output_file, num_files=num_files, progress_callback=self.updateProgress)
-            self.showMessage("DEAM dataset preparation completed successfully!")
-        except Exception as e:
-            self.showMessage(f"Error preparing DEAM dataset: {str(e)}")
+        def job(progress_callback):
+            from model_training.prepare_deam import prepare_deam_dataset
+            failures = prepare_deam_dataset(audio_dir, annotations_file, output_file, num_files=num_files,
+                                            progress_callback=progress_callback, workers=workers)
+            return f"DEAM dataset preparation completed successfully! ({len(failures)} songs failed)"
+        self.runJob(job, "Error preparing DEAM dataset")
 
     def trainMoodModel(self):
         data_file = self.mood_data_file.text().split(": ")[1]
         model_output = self.mood_model_output.text().split(": ")[1]
         scaler_output = self.mood_scaler_output.text().split(": ")[1]
-        
-        try:
-            train_mood_model(data_file, model_output, scaler_output, progress_callback=self.updateProgress)
-            self.showMessage("Mood model training completed successfully!")
-        except Exception as e:
-            self.showMessage(f"Error training mood model: {str(e)}")
+
+        def job(progress_callback):
+            from model_training.train_mood_model import train_mood_model
+            train_mood_model(data_file, model_output, scaler_output, progress_callback=progress_callback)
+            return "Mood model training completed successfully!"
+        self.runJob(job, "Error training mood model")
 
     def updateProgress(self, value):
         self.fma_progress.setValue(value)
@@ -275,6 +351,14 @@ class PreparationApp(QWidget):
         self.deam_progress.setValue(value)
         self.mood_progress.setValue(value)
 
+    def closeEvent(self, event):
+        # A fit cannot be interrupted, so the window stays open until the job ends
+        if self.job_thread is not None:
+            self.showMessage("Wait for the running job to finish before closing this window.")
+            event.ignore()
+        else:
+            event.accept()
+
     def showMessage(self, message):
         from PyQt5.QtWidgets import QMessageBox
-        QMessageBox.information(self, "Information", message)
\ No newline at end of file
+        QMessageBox.information(self, "Information", message)
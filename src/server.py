@@ -0,0 +1,411 @@
+"""Local HTTP inference service with warm models and request batching.
+
+    python -m src.server [--port 8765] [--workers N] [--max-batch 32] [--max-wait-ms 5]
+
+Listens on 127.0.0.1 only. The genre classifier, both scalers and the mood
+model stay loaded (through the model registry, so retrained files are picked
+up on the next batch). Feature extraction runs in a process pool; the
+extracted vectors of concurrent requests are coalesced by a micro-batcher
+into one genre and one mood prediction call.
+
+    GET  /health                 models loaded and batcher settings
+    GET  /metrics                per-stage latency histograms and real-time factor (Prometheus text)
+    POST /analyze                JSON body {"path": "/abs/file.wav", "top_k": 3}
+    POST /analyze?name=x.mp3     raw audio bytes as the body (name sets the extension)
+
+The response has `genre` (label and top-k, or null when no genre classifier
+is trained), `valence`, `arousal`, `mood_label` and `timings`.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from src.batch import extract_for_prediction
+from src.decoded_audio import DECODE_MODES, configure_decode_cache
+from src.feature_cache import DEFAULT_CACHE_DIR, FeatureCache
+from src.instrumentation import StageStats, observe, record_spans
+from src.log_config import add_logging_arguments, configure_logging
+from src.model_registry import get_genre_predictor, get_mood_detector
+from src.mood_detector import mood_to_labels
+from src.parallel import default_workers
+from src.tempo import DEFAULT_TEMPO_METHOD, TEMPO_METHODS
+
+HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_TOP_K = 3
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT = 0.005
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+MAX_JSON_BYTES = 1024 * 1024
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """Coalesces concurrent prediction requests into one batched call.
+
+    `submit` queues an item and returns a Future. A single thread takes the
+    first waiting item, then keeps collecting until `max_batch` items are
+    queued or `max_wait` seconds have passed, and hands the list to
+    `predict_batch`, which must return one result per item.
+    """
+
+    def __init__(self, predict_batch, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT):
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                self._queue.put(None)  # Finish this batch, then stop
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            items, futures = zip(*batch)
+            try:
+                results = self.predict_batch(list(items))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+def _extract_in_worker(file_path, **kwargs):
+    result, spans = record_spans(extract_for_prediction, file_path, **kwargs)
+    genre_features, mood_features, (decode_seconds, extract_seconds) = result
+    return genre_features, mood_features, {'decode_seconds': decode_seconds, 'extract_seconds': extract_seconds}, spans
+
+class InferenceService:
+    """Feature extraction pool, resident models and the micro-batcher behind the HTTP handler."""
+
+    def __init__(self, models_dir='./models', workers=None, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT,
+                 cache=None, decode=None, tempo_method=DEFAULT_TEMPO_METHOD, allow_unstamped=False):
+        self.models_dir = os.path.abspath(models_dir)
+        self.allow_unstamped = allow_unstamped
+        self.extract_options = {'cache': cache, 'decode': decode, 'tempo_method': tempo_method}
+        self.workers = workers or default_workers()
+        self.requests = 0
+        self.batches = 0
+        self.stats = StageStats()
+        self._stats_lock = threading.Lock()
+
+        # Load (and validate) the models before accepting requests
+        self.genre_predictor()
+        self.mood_detector()
+        self._pool_lock = threading.Lock()
+        self.pool = self._new_pool()
+        self.batcher = MicroBatcher(self._predict_batch, max_batch, max_wait)
+
+    def _new_pool(self):
+        # Spawned workers do not inherit the server's threads and locks. Requests rarely repeat a file, so
+        # holding recent decodes in the workers would only cost memory
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=configure_decode_cache, initargs=(0,))
+
+    def _replace_pool(self, broken):
+        with self._pool_lock:
+            if self.pool is broken:
+                logger.warning("A feature extraction worker died; starting a new pool")
+                broken.shutdown(wait=False)
+                self.pool = self._new_pool()
+            return self.pool
+
+    def _extract(self, file_path):
+        """Extract in the pool. A worker that dies fails the requests it had in flight, and the pool is rebuilt."""
+        pool = self.pool
+        try:
+            future = pool.submit(_extract_in_worker, file_path, **self.extract_options)
+        except BrokenProcessPool:
+            # Broken by an earlier request; this one never reached it
+            pool = self._replace_pool(pool)
+            future = pool.submit(_extract_in_worker, file_path, **self.extract_options)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            raise
+
+    def genre_predictor(self):
+        try:
+            return get_genre_predictor(os.path.join(self.models_dir, 'genre_classifier.joblib'),
+                                       os.path.join(self.models_dir, 'genre_scaler.joblib'), self.allow_unstamped)
+        except FileNotFoundError:
+            return None
+
+    def mood_detector(self):
+        return get_mood_detector(os.path.join(self.models_dir, 'mood_scaler.joblib'),
+                                 os.path.join(self.models_dir, 'mood_model.joblib'), self.allow_unstamped)
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'genre_model': self.genre_predictor() is not None,
+            'mood_model': self._mood_model_loaded(),
+            'workers': self.workers,
+            'max_batch': self.batcher.max_batch,
+            'max_wait_ms': 1000 * self.batcher.max_wait,
+            'requests': self.requests,
+            'batches': self.batches,
+        }
+
+    def _mood_model_loaded(self):
+        try:
+            return self.mood_detector() is not None
+        except Exception as e:
+            logger.warning("Mood model is not available: %s", e)
+            return False
+
+    def analyze(self, file_path, top_k=DEFAULT_TOP_K):
+        """Extract the features of `file_path` in the pool and predict them in the next batch."""
+        start = time.perf_counter()
+        genre_features, mood_features, timings, spans = self._extract(file_path)
+        self.stats.add(spans)
+        extracted = time.perf_counter()
+        result = self.batcher.submit((genre_features, mood_features, top_k)).result()
+        finished = time.perf_counter()
+        timings.update(extract_wall_seconds=extracted - start, predict_wait_seconds=finished - extracted,
+                       total_seconds=finished - start)
+        result['timings'] = timings
+        return result
+
+    def _predict_batch(self, items):
+        with observe(self.stats):
+            return self._predict(items)
+
+    def _predict(self, items):
+        genre_features, mood_features, top_ks = zip(*items)
+        mood = self.mood_detector().predict_batch(np.stack(mood_features))
+        labels = mood_to_labels(mood[:, 0], mood[:, 1])
+        results = [{'genre': None, 'valence': float(valence), 'arousal': float(arousal), 'mood_label': str(label),
+                    'batch_size': len(items)} for (valence, arousal), label in zip(mood, labels)]
+
+        genre_predictor = self.genre_predictor()
+        if genre_predictor is not None:
+            predicted, top_genres, top_probabilities = genre_predictor.predict_batch(np.stack(genre_features),
+                                                                                     top_k=max(top_ks))
+            for result, top_k, label, genres, probabilities in zip(results, top_ks, predicted, top_genres,
+                                                                    top_probabilities):
+                result['genre'] = {
+                    'label': str(label),
+                    'top': [{'genre': str(genre), 'probability': float(probability)}
+                            for genre, probability in zip(genres[:top_k], probabilities[:top_k])],
+                }
+        with self._stats_lock:
+            self.requests += len(items)
+            self.batches += 1
+        return results
+
+    def close(self):
+        self.batcher.close()
+        self.pool.shutdown()
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    server_version = 'SynthetInference/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            logger.info("%s %s", self.address_string(), format % args)
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self._send_json(200, self.service.health())
+        elif path == '/metrics':
+            payload = self.service.stats.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        else:
+            self._send_json(404, {'error': f"Unknown endpoint {self.path}"})
+
+    def _copy_body(self, f, length):
+        # Copied in chunks so a large upload is never held in memory
+        copied = 0
+        while copied < length:
+            chunk = self.rfile.read(min(UPLOAD_CHUNK_BYTES, length - copied))
+            if not chunk:
+                break
+            f.write(chunk)
+            copied += len(chunk)
+        return copied
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/analyze':
+            self._send_json(404, {'error': f"Unknown endpoint {url.path}"})
+            return
+        query = parse_qs(url.query)
+        is_json = self.headers.get('Content-Type', '').startswith('application/json')
+        content_length = self.headers.get('Content-Length') or '0'
+        try:
+            length = int(content_length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self._send_json(400, {'error': f"Invalid Content-Length {content_length!r}"})
+            return
+        max_bytes = MAX_JSON_BYTES if is_json else MAX_UPLOAD_BYTES
+        if length > max_bytes:
+            self.close_connection = True
+            self._send_json(413, {'error': f"Request body is larger than {max_bytes} bytes"})
+            return
+
+        upload_path = None
+        try:
+            try:
+                if is_json:
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                    if not isinstance(request, dict):
+                        raise ValueError("JSON requests must be an object")
+                    file_path = request.get('path')
+                    if not file_path or not isinstance(file_path, str):
+                        raise ValueError("JSON requests need a 'path'")
+                    top_k = int(request.get('top_k', DEFAULT_TOP_K))
+                else:
+                    if not length:
+                        raise ValueError("Send a JSON body with a 'path' or the audio file as the body")
+                    top_k = int(query.get('top_k', [DEFAULT_TOP_K])[0])
+                if top_k < 1:
+                    raise ValueError("top_k must be at least 1")
+            except (TypeError, ValueError) as e:
+                if not is_json:
+                    # The upload was never read, so the connection cannot carry another request
+                    self.close_connection = True
+                self._send_json(400, {'error': str(e)})
+                return
+
+            if is_json:
+                if not os.path.isfile(file_path):
+                    self._send_json(404, {'error': f"No such file: {file_path}"})
+                    return
+            else:
+                suffix = os.path.splitext(query.get('name', ['upload.wav'])[0])[1] or '.wav'
+                with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+                    upload_path = f.name
+                    copied = self._copy_body(f, length)
+                if copied < length:
+                    self.close_connection = True
+                    self._send_json(400, {'error': f"Request body ended after {copied} of {length} bytes"})
+                    return
+                file_path = upload_path
+
+            try:
+                result = self.service.analyze(file_path, top_k)
+            except Exception as e:
+                self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+                return
+        finally:
+            if upload_path:
+                os.remove(upload_path)
+        result['path'] = None if upload_path else file_path
+        self._send_json(200, result)
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, service, port=DEFAULT_PORT, verbose=False):
+        super().__init__((HOST, port), InferenceHandler)
+        self.service = service
+        self.verbose = verbose
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src.server', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port on 127.0.0.1 (0 picks a free one)")
+    parser.add_argument('-j', '--workers', type=int, default=default_workers(),
+                        help="Feature extraction processes (default: all CPUs)")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help="Largest prediction batch")
+    parser.add_argument('--max-wait-ms', type=float, default=1000 * DEFAULT_MAX_WAIT,
+                        help="How long a batch waits for more requests once the first arrives")
+    parser.add_argument('--models-dir', default='./models', help="Directory holding the trained models")
+    parser.add_argument('--allow-unstamped-models', action='store_true',
+                        help="Load models that record no feature schema (checked by width only)")
+    parser.add_argument('--cache', action='store_true', help=f"Use the feature cache in {DEFAULT_CACHE_DIR}")
+    parser.add_argument('--cache-dir', help="Use a feature cache in this directory")
+    parser.add_argument('--decode', choices=sorted(DECODE_MODES), default='hq', help="Decode mode")
+    parser.add_argument('--tempo-method', choices=TEMPO_METHODS, default=DEFAULT_TEMPO_METHOD, help="Tempo estimator")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log every request")
+    add_logging_arguments(parser)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args.log_level, args.log_format)
+    cache = None
+    if args.cache or args.cache_dir:
+        cache = FeatureCache(args.cache_dir or DEFAULT_CACHE_DIR)
+    service = InferenceService(args.models_dir, workers=args.workers, max_batch=args.max_batch,
+                               max_wait=args.max_wait_ms / 1000, cache=cache, decode=DECODE_MODES[args.decode],
+                               tempo_method=args.tempo_method, allow_unstamped=args.allow_unstamped_models)
+    server = InferenceServer(service, args.port, verbose=args.verbose)
+    logger.info("Serving on http://%s:%d (%d workers, batches of up to %d)", HOST, server.server_port,
+                service.workers, args.max_batch)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import numpy as np
+import librosa
+import soundfile as sf
+import soxr
+from src.feature_engine import SAMPLE_RATE, N_FFT, HOP_LENGTH, N_MFCC, assemble_features, frame_params
+from src.instrumentation import stage
+from src.tempo import TempoAccumulator
+
+DEFAULT_BLOCK_SECONDS = 30.0
+# The online tempogram approximates the onset autocorrelation; beat tracking needs the whole envelope
+STREAMING_TEMPO_METHODS = ('autocorr',)
+TOP_DB = 80.0  # librosa.power_to_db default
+AMIN = 1e-10
+
+def _soxr_quality(res_type):
+    if not res_type.startswith('soxr_'):
+        raise ValueError(f"Streaming extraction only supports soxr resamplers, not {res_type!r}")
+    return res_type[len('soxr_'):].upper()
+
+def iter_blocks(file_path, block_seconds=DEFAULT_BLOCK_SECONDS, sr=SAMPLE_RATE, progress_bar=None, res_type='soxr_hq'):
+    """Yield mono float32 blocks of `file_path` resampled to `sr`, reading `block_seconds` at a time."""
+    if sr is None:
+        raise ValueError("Streaming extraction needs a fixed decode rate")
+    with sf.SoundFile(file_path) as f:
+        native_sr = f.samplerate
+        total_frames = f.frames
+        resampler = None
+        if native_sr != sr:
+            # Same soxr engine librosa.load uses, in streaming form
+            resampler = soxr.ResampleStream(native_sr, sr, 1, dtype='float32', quality=_soxr_quality(res_type))
+
+        read = 0
+        blocksize = max(1, int(block_seconds * native_sr))
+        while True:
+            with stage('decode') as span:
+                data = f.read(blocksize, dtype='float32', always_2d=True)
+                y = data.mean(axis=1)
+                if resampler is not None:
+                    # An empty read flushes what the resampler still holds
+                    y = resampler.resample_chunk(y, last=not len(data))
+                span.update(audio_seconds=len(data) / native_sr, bytes=y.nbytes)
+            if not len(data):
+                if len(y):
+                    yield y
+                return
+            read += len(data)
+            yield y
+            if progress_bar and total_frames > 0:
+                progress_bar.setValue(int(80 * read / total_frames))
+
+class StreamingFeatureExtractor:
+    """Incremental version of feature_engine.extract_features.
+
+    Samples are framed exactly like a centered librosa STFT, and every feature
+    is accumulated as a per-frame running sum, with tempo from an online
+    tempogram. Memory is bounded by the block size, not the track length.
+
+    Two quantities are global in the in-memory path and can only be
+    approximated here: the 80 dB floor of the log-mel spectrogram (MFCC and
+    onset envelope) is taken relative to the loudest frame seen so far, and
+    chroma tuning is estimated from the first block.
+
+    Audio at another rate than SAMPLE_RATE is framed and mapped onto the
+    SAMPLE_RATE grid the way feature_engine.Spectrogram does it, so native
+    decodes give the same features as the in-memory path. `frame_length` and
+    `frame_hop` are the sizes used on the samples.
+    """
+
+    def __init__(self, sr=SAMPLE_RATE, n_fft=N_FFT, hop_length=HOP_LENGTH):
+        self.sample_rate = sr
+        self.frame_length, self.frame_hop = n_fft, hop_length
+        self._rescale = None
+        if sr != SAMPLE_RATE and (n_fft, hop_length) == (N_FFT, HOP_LENGTH):
+            self.frame_length, self.frame_hop = frame_params(sr)
+            self._rescale = N_FFT / self.frame_length
+            sr = sr * self._rescale
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mfcc = N_MFCC
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft)
+        self.tempo = TempoAccumulator(sr, hop_length)
+
+        self._buffer = np.zeros(self.frame_length // 2, dtype=np.float32)  # Leading pad of a centered STFT
+        self._n_frames = 0
+        self._sums = {}
+        self._tuning = None
+        self._max_db = -np.inf
+        self._prev_mel_db = None
+        # onset_strength shifts the envelope by 1 + n_fft // (2 * hop) frames and trims the tail
+        self._onset_shift = 1 + n_fft // (2 * hop_length)
+        self._pending_onsets = np.zeros(0)
+
+    def _accumulate(self, name, values):
+        total = values.sum(axis=-1)
+        self._sums[name] = self._sums[name] + total if name in self._sums else total
+
+    def add(self, y):
+        self._buffer = np.concatenate([self._buffer, y])
+        if len(self._buffer) < self.frame_length:
+            return
+        n_frames = 1 + (len(self._buffer) - self.frame_length) // self.frame_hop
+        chunk = self._buffer[:(n_frames - 1) * self.frame_hop + self.frame_length]
+        self._process(chunk)
+        self._buffer = self._buffer[n_frames * self.frame_hop:]
+
+    def _process(self, chunk):
+        sr, n_fft, hop_length = self.sr, self.n_fft, self.hop_length
+        frame_length, frame_hop = self.frame_length, self.frame_hop
+        audio_seconds = (1 + (len(chunk) - frame_length) // frame_hop) * frame_hop / self.sample_rate
+        with stage('stft', audio_seconds=audio_seconds):
+            magnitude = np.abs(librosa.stft(chunk, n_fft=frame_length, hop_length=frame_hop, center=False))
+            if self._rescale is not None:
+                n_bins = N_FFT // 2 + 1
+                magnitude = magnitude[:n_bins] * self._rescale
+                if len(magnitude) < n_bins:
+                    magnitude = np.pad(magnitude, ((0, n_bins - len(magnitude)), (0, 0)))
+            power = magnitude ** 2
+
+        with stage('rms', audio_seconds=audio_seconds):
+            frames = librosa.util.frame(chunk, frame_length=frame_length, hop_length=frame_hop)
+            self._accumulate('rms', np.sqrt(np.mean(frames ** 2, axis=0)))
+        with stage('spectral', audio_seconds=audio_seconds):
+            self._accumulate('centroid', librosa.feature.spectral_centroid(S=magnitude, sr=sr, n_fft=n_fft)[0])
+            self._accumulate('bandwidth', librosa.feature.spectral_bandwidth(S=magnitude, sr=sr, n_fft=n_fft)[0])
+            self._accumulate('contrast', librosa.feature.spectral_contrast(S=magnitude, sr=sr, n_fft=n_fft))
+            self._accumulate('rolloff', librosa.feature.spectral_rolloff(S=magnitude, sr=sr, n_fft=n_fft)[0])
+
+        with stage('chroma', audio_seconds=audio_seconds):
+            if self._tuning is None:
+                self._tuning = librosa.estimate_tuning(S=power, sr=sr, n_fft=n_fft)
+            self._accumulate('chroma', librosa.feature.chroma_stft(S=power, sr=sr, n_fft=n_fft, tuning=self._tuning))
+
+        with stage('mfcc', audio_seconds=audio_seconds):
+            mel_db = 10.0 * np.log10(np.maximum(AMIN, self.mel_basis @ power))
+            self._max_db = max(self._max_db, mel_db.max())
+            mel_db = np.maximum(mel_db, self._max_db - TOP_DB)
+            self._accumulate('mfcc', librosa.feature.mfcc(S=mel_db, sr=sr, n_mfcc=self.n_mfcc))
+
+        # Onset envelope: median positive log-mel difference to the previous frame
+        with stage('tempo', audio_seconds=audio_seconds):
+            if self._prev_mel_db is None:
+                onsets = np.zeros(self._onset_shift)
+                diffs = np.diff(mel_db, axis=1)
+            else:
+                onsets = np.zeros(0)
+                diffs = np.diff(np.concatenate([self._prev_mel_db, mel_db], axis=1), axis=1)
+            onsets = np.concatenate([self._pending_onsets, onsets, np.median(np.maximum(0.0, diffs), axis=0)])
+            keep = self._onset_shift - 1
+            self.tempo.add(onsets[:-keep] if keep else onsets)
+            self._pending_onsets = onsets[-keep:] if keep else np.zeros(0)
+            self._prev_mel_db = mel_db[:, -1:]
+
+        self._n_frames += magnitude.shape[1]
+
+    def finish(self):
+        """Flush the trailing pad and return the genre feature vector."""
+        self.add(np.zeros(self.frame_length // 2, dtype=np.float32))
+        if self._n_frames == 0:
+            raise ValueError("No audio frames to analyze")
+
+        means = {name: total / self._n_frames for name, total in self._sums.items()}
+        return assemble_features(self.tempo.estimate(), means['centroid'], means['bandwidth'], means['contrast'],
+                                 means['rolloff'], means['chroma'], means['mfcc'], means['rms'])
+
+def check_streaming_tempo_method(tempo_method):
+    if tempo_method not in STREAMING_TEMPO_METHODS:
+        raise ValueError(f"Streaming extraction supports the tempo methods {STREAMING_TEMPO_METHODS}, "
+                         f"not {tempo_method!r}")
+
+def extract_features_streaming(file_path, block_seconds=DEFAULT_BLOCK_SECONDS, progress_bar=None, res_type='soxr_hq',
+                               sr=SAMPLE_RATE, tempo_method='autocorr'):
+    """Genre feature vector for `file_path` in constant memory, reading it block by block.
+
+    `sr` is the analysis rate, or None for the file's native rate. Raises
+    ValueError for a `tempo_method` that cannot be computed block by block.
+    """
+    check_streaming_tempo_method(tempo_method)
+    if sr is None:
+        sr = sf.info(file_path).samplerate
+    extractor = StreamingFeatureExtractor(sr)
+    for y in iter_blocks(file_path, block_seconds, sr=sr, progress_bar=progress_bar, res_type=res_type):
+        extractor.add(y)
+    return extractor.finish()
+
+__all__ = ['STREAMING_TEMPO_METHODS', 'StreamingFeatureExtractor', 'check_streaming_tempo_method',
+           'extract_features_streaming', 'iter_blocks']
@@ -0,0 +1,111 @@
+import numpy as np
+import scipy.signal
+import librosa
+
+# librosa.feature.tempo defaults, which beat_track uses for its tempo estimate
+START_BPM = 120.0
+STD_BPM = 1.0
+MAX_TEMPO = 320.0
+AC_SIZE = 8.0
+
+# 'autocorr' reads the BPM straight off the onset-envelope autocorrelation
+# (tempogram); 'beat_track' also runs librosa's dynamic-programming beat tracker
+# and discards the beats. beat_track derives its BPM the same way, so the two
+# agree except for numerical noise; see benchmarks/tempo_agreement.py.
+TEMPO_METHODS = ('autocorr', 'beat_track')
+DEFAULT_TEMPO_METHOD = 'autocorr'
+
+def tempo_cache_params(method):
+    # Empty for the default so existing cache entries stay valid
+    return {} if method == DEFAULT_TEMPO_METHOD else {'tempo_method': method}
+
+def tempogram_window(sr, hop_length):
+    return int(librosa.time_to_frames(AC_SIZE, sr=sr, hop_length=hop_length))
+
+def tempo_from_tempogram(mean_tempogram, sr, hop_length):
+    """Pick the BPM of a time-averaged tempogram the way librosa.feature.tempo does."""
+    win_length = len(mean_tempogram)
+    bpms = librosa.tempo_frequencies(win_length, hop_length=hop_length, sr=sr)
+    with np.errstate(divide='ignore'):
+        logprior = -0.5 * ((np.log2(bpms) - np.log2(START_BPM)) / STD_BPM) ** 2
+    max_idx = int(np.argmax(bpms < MAX_TEMPO))
+    logprior[:max_idx] = -np.inf
+    best_period = np.argmax(np.log1p(1e6 * mean_tempogram) + logprior)
+    return float(bpms[best_period])
+
+def tempo_from_onsets(onset_envelope, sr, hop_length):
+    """Tempo in BPM from a complete onset envelope, without beat tracking."""
+    if not np.any(onset_envelope):
+        return 0.0  # beat_track's answer for silence
+    tempogram = librosa.feature.tempogram(onset_envelope=onset_envelope, sr=sr, hop_length=hop_length,
+                                          win_length=tempogram_window(sr, hop_length))
+    return tempo_from_tempogram(tempogram.mean(axis=1), sr, hop_length)
+
+def beat_track_tempo(onset_envelope, sr, hop_length):
+    tempo, _ = librosa.beat.beat_track(onset_envelope=onset_envelope, sr=sr, hop_length=hop_length)
+    return tempo.item() if isinstance(tempo, np.ndarray) else float(tempo)  # Convert to scalar if it's an array
+
+def estimate_tempo_from_onsets(onset_envelope, sr, hop_length, method=DEFAULT_TEMPO_METHOD):
+    if method == 'autocorr':
+        return tempo_from_onsets(onset_envelope, sr, hop_length)
+    if method == 'beat_track':
+        return beat_track_tempo(onset_envelope, sr, hop_length)
+    raise ValueError(f"Unknown tempo method {method!r}; expected one of {TEMPO_METHODS}")
+
+class TempoAccumulator:
+    """Online tempo estimate from an onset envelope delivered in pieces.
+
+    Keeps only the last tempogram window of envelope values plus a running sum
+    of tempogram columns, so memory does not grow with duration. The result
+    matches librosa.feature.tempo (and so beat_track's tempo) on the whole
+    envelope, including its centered, ramp-padded framing.
+    """
+
+    def __init__(self, sr, hop_length):
+        self.sr = sr
+        self.hop_length = hop_length
+        self.win_length = tempogram_window(sr, hop_length)
+        self.window = scipy.signal.get_window('hann', self.win_length, fftbins=True)[:, None]
+        # Centered framing pads the front with a ramp up to the first value, which is always 0
+        self._buffer = np.zeros(self.win_length // 2)
+        self._last_value = 0.0
+        self._n_onsets = 0
+        self._n_columns = 0
+        self._sum = np.zeros(self.win_length)
+        self._any_onset = False
+
+    def _consume(self, limit=None):
+        n_frames = len(self._buffer) - self.win_length + 1
+        if limit is not None:
+            n_frames = min(n_frames, limit - self._n_columns)
+        if n_frames <= 0:
+            return
+        frames = librosa.util.frame(self._buffer, frame_length=self.win_length, hop_length=1)[:, :n_frames]
+        tempogram = librosa.util.normalize(librosa.autocorrelate(frames * self.window, axis=0), norm=np.inf, axis=0)
+        self._sum += tempogram.sum(axis=1)
+        self._n_columns += n_frames
+        self._buffer = self._buffer[n_frames:]
+
+    def add(self, onset_envelope):
+        if len(onset_envelope) == 0:
+            return
+        self._buffer = np.concatenate([self._buffer, onset_envelope])
+        self._last_value = float(onset_envelope[-1])
+        self._any_onset = self._any_onset or bool(np.any(onset_envelope))
+        self._n_onsets += len(onset_envelope)
+        self._consume()
+
+    def mean_tempogram(self):
+        """Average tempogram over everything added; call once the envelope is complete."""
+        tail = np.pad([self._last_value], (0, self.win_length // 2), mode='linear_ramp', end_values=0)[1:]
+        self._buffer = np.concatenate([self._buffer, tail])
+        self._consume(limit=self._n_onsets)
+        return self._sum / max(1, self._n_columns)
+
+    def estimate(self):
+        if not self._any_onset:
+            return 0.0  # beat_track's answer for silence
+        return tempo_from_tempogram(self.mean_tempogram(), self.sr, self.hop_length)
+
+__all__ = ['TempoAccumulator', 'TEMPO_METHODS', 'DEFAULT_TEMPO_METHOD', 'estimate_tempo_from_onsets', 'tempo_cache_params',
+           'tempo_from_onsets', 'beat_track_tempo', 'tempo_from_tempogram', 'tempogram_window']
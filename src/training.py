@@ -0,0 +1,243 @@
+"""Model fitting loops that report progress as they go and can stop on a time budget.
+
+`fit_forest` grows a random forest in warm-start batches of trees, each batch
+built on all cores; the finished forest is the same one a single `fit` with
+the same `random_state` would give. `fit_mlp` trains an MLP epoch by epoch
+with `partial_fit`, keeping the weights with the best loss on a held-out
+slice and stopping once that stops improving.
+
+The streaming helpers train out of core from a FeatureStore: they read it
+`batch_size` rows at a time, fit the scaler with `partial_fit`, train an
+estimator that supports `partial_fit` over several epochs, and score the
+held-out rows block by block, so peak memory depends on the batch size and
+not on the number of rows. The held-out rows are drawn per block from
+`random_state`, so every pass sees the same split without keeping an index.
+
+All of them call `progress_callback(fraction)` with the fraction of work done (0-1).
+"""
+import copy
+import logging
+import time
+import numpy as np
+from joblib import effective_n_jobs
+from sklearn.base import is_classifier
+
+DEFAULT_TREE_BATCH = 10
+DEFAULT_STREAM_BATCH = 4096
+
+logger = logging.getLogger(__name__)
+
+def fit_forest(forest, X, y, batch_size=DEFAULT_TREE_BATCH, progress_callback=None, time_budget=None):
+    """Fit `forest` (a RandomForest/ExtraTrees estimator) `batch_size` trees at a time.
+
+    Each batch holds at least as many trees as the forest's `n_jobs` uses
+    cores, so every core gets a tree. The target size is the forest's
+    `n_estimators`. With `time_budget`
+    seconds, no new batch starts once the budget is spent, so the forest may
+    end up smaller. Returns the forest.
+    """
+    target = forest.n_estimators
+    batch_size = max(batch_size, effective_n_jobs(forest.n_jobs))
+    start = time.perf_counter()
+    forest.set_params(warm_start=True)
+    grown = 0
+    while grown < target:
+        grown = min(target, grown + batch_size)
+        forest.set_params(n_estimators=grown)
+        forest.fit(X, y)
+        if progress_callback:
+            progress_callback(grown / target)
+        if time_budget is not None and grown < target and time.perf_counter() - start >= time_budget:
+            logger.warning("Time budget of %g s reached after %d of %d trees", time_budget, grown, target)
+            break
+    forest.set_params(warm_start=False)
+    return forest
+
+def _snapshot(model):
+    return [coef.copy() for coef in model.coefs_], [intercept.copy() for intercept in model.intercepts_]
+
+def fit_mlp(model, X, y, max_epochs=1000, validation_fraction=0.1, patience=10, tol=1e-4, progress_callback=None,
+            time_budget=None, random_state=0):
+    """Train `model` (an MLPRegressor) one `partial_fit` epoch at a time.
+
+    A `validation_fraction` of the rows is held out; training stops when the
+    held-out loss has not improved by `tol` for `patience` epochs, after
+    `max_epochs`, or once `time_budget` seconds have passed, and the weights
+    from the best epoch are restored. With fewer than 20 rows everything is
+    used for training and the training loss decides instead. Returns the
+    number of epochs run.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    rows = np.random.RandomState(random_state).permutation(len(X))
+    n_val = int(len(X) * validation_fraction) if len(X) >= 20 else 0
+    val_rows, train_rows = rows[:n_val], rows[n_val:]
+    X_train, y_train = X[train_rows], y[train_rows]
+    X_val, y_val = (X[val_rows], y[val_rows]) if n_val else (X_train, y_train)
+
+    start = time.perf_counter()
+    best_loss, best_weights, stale = np.inf, None, 0
+    for epoch in range(1, max_epochs + 1):
+        model.partial_fit(X_train, y_train)
+        loss = np.mean((model.predict(X_val) - y_val) ** 2)
+        if loss < best_loss - tol:
+            best_loss, best_weights, stale = loss, _snapshot(model), 0
+        else:
+            stale += 1
+
+        elapsed = time.perf_counter() - start
+        out_of_time = time_budget is not None and elapsed >= time_budget
+        done = stale >= patience or out_of_time or epoch == max_epochs
+        if progress_callback:
+            progress_callback(1.0 if done else max(epoch / max_epochs, elapsed / time_budget if time_budget else 0.0))
+        if done:
+            if out_of_time and stale < patience and epoch < max_epochs:
+                logger.warning("Time budget of %g s reached after %d epochs", time_budget, epoch)
+            break
+
+    if best_weights is not None:
+        model.coefs_, model.intercepts_ = best_weights
+    logger.info("Trained for %d epochs, best held-out MSE %.4f", epoch, best_loss,
+                extra={'epochs': epoch, 'validation_mse': float(best_loss)})
+    return epoch
+
+def _test_mask(block, rows, test_size, random_state):
+    return np.random.RandomState([random_state, block]).rand(rows) < test_size
+
+def iter_split(store, part='train', batch_size=DEFAULT_STREAM_BATCH, test_size=0.2, random_state=42, shuffle=None):
+    """Yield `(X, y)` blocks of the `part` ('train' or 'test') rows of `store`.
+
+    Each block is at most `batch_size` consecutive rows with the held-out
+    ones removed (or kept, for 'test'). With `shuffle` set to a seed, the
+    blocks and the rows inside each block come in a random order.
+    """
+    starts = np.arange(0, len(store), batch_size)
+    rng = np.random.RandomState(shuffle) if shuffle is not None else None
+    if rng is not None:
+        starts = rng.permutation(starts)
+    for start in starts:
+        X = np.asarray(store.X[start:start + batch_size])
+        y = np.asarray(store.y[start:start + batch_size])
+        held_out = _test_mask(start // batch_size, len(X), test_size, random_state)
+        keep = held_out if part == 'test' else ~held_out
+        X, y = X[keep], y[keep]
+        if rng is not None:
+            order = rng.permutation(len(X))
+            X, y = X[order], y[order]
+        if len(X):
+            yield X, y
+
+def store_classes(store, batch_size=DEFAULT_STREAM_BATCH):
+    """Sorted distinct labels of `store`, collected a block at a time."""
+    classes = np.array([], dtype=store.y.dtype)
+    for start in range(0, len(store), batch_size):
+        classes = np.union1d(classes, np.asarray(store.y[start:start + batch_size]))
+    return classes
+
+def fit_scaler_streaming(scaler, store, dtype=None, **split):
+    """Fit `scaler` (a StandardScaler) on the training rows of `store` with `partial_fit`."""
+    for X, _ in iter_split(store, 'train', **split):
+        scaler.partial_fit(X.astype(dtype or X.dtype, copy=False))
+    return scaler
+
+def _held_out_loss(model, store, scaler, dtype, **split):
+    # Mean squared error of a regressor, error rate of a classifier
+    score = score_streaming(model, store, scaler, dtype=dtype, parts=('test',), **split)['test']
+    if score['rows'] == 0:
+        return None
+    return score['mse'] if 'mse' in score else 1 - score['accuracy']
+
+def fit_streaming(model, store, scaler, epochs=5, classes=None, dtype=None, patience=None, tol=1e-4,
+                  progress_callback=None, time_budget=None, **split):
+    """Train `model` with `partial_fit` on scaled training blocks of `store`, up to `epochs` times over.
+
+    Every epoch visits the blocks in a new random order. `classes` is passed
+    to the first `partial_fit` of a classifier. With `patience`, the held-out
+    rows are scored a block at a time after every epoch; training stops once
+    that loss has not improved by `tol` for `patience` epochs, and the model
+    from the best epoch is restored. Reaching `epochs` first logs a warning
+    that training did not converge. With `time_budget` seconds, no new block
+    starts once the budget is spent. Returns `(epochs run, converged)`.
+    """
+    n_blocks = -(-len(store) // split.get('batch_size', DEFAULT_STREAM_BATCH))
+    start = time.perf_counter()
+    best_loss, best_state, stale = np.inf, None, 0
+    done = 0
+    for epoch in range(1, epochs + 1):
+        out_of_time = False
+        for X, y in iter_split(store, 'train', shuffle=split.get('random_state', 42) + epoch, **split):
+            X = scaler.transform(X.astype(dtype or X.dtype, copy=False))
+            if classes is not None and not hasattr(model, 'classes_'):
+                model.partial_fit(X, y, classes=classes)
+            else:
+                model.partial_fit(X, y)
+            done += 1
+            if progress_callback:
+                progress_callback(min(1.0, done / (epochs * n_blocks)))
+            out_of_time = time_budget is not None and time.perf_counter() - start >= time_budget
+            if out_of_time:
+                break
+        if out_of_time:
+            logger.warning("Time budget of %g s reached in epoch %d of %d", time_budget, epoch, epochs)
+            break
+        if patience is None:
+            continue
+
+        loss = _held_out_loss(model, store, scaler, dtype, **split)
+        if loss is None:
+            logger.warning("No held-out rows; training for all %d epochs without early stopping", epochs)
+            patience = None
+            continue
+        if loss < best_loss - tol:
+            best_loss, best_state, stale = loss, copy.deepcopy(vars(model)), 0
+        else:
+            stale += 1
+        if stale >= patience:
+            if progress_callback:
+                progress_callback(1.0)
+            break
+
+    converged = patience is not None and stale >= patience
+    if best_state is not None:
+        vars(model).update(best_state)
+    if patience is not None and not converged:
+        logger.warning("Training stopped after %d epochs before the held-out loss converged (best %.4f)",
+                       epoch, best_loss, extra={'epochs': epoch, 'held_out_loss': float(best_loss)})
+    elif converged:
+        logger.info("Converged after %d epochs, best held-out loss %.4f", epoch, best_loss,
+                    extra={'epochs': epoch, 'held_out_loss': float(best_loss)})
+    return epoch, converged
+
+def score_streaming(model, store, scaler, dtype=None, parts=('train', 'test'), **split):
+    """Score `model` on the training and held-out rows of `store`, a block at a time.
+
+    Returns `{'train': {...}, 'test': {...}}` (for the requested `parts`), each
+    with the row count and the accuracy of a classifier, or the mean squared
+    error and R² (averaged over outputs) of a regressor.
+    """
+    scores = {}
+    classifier = is_classifier(model)
+    for part in parts:
+        rows, correct, sse, sum_y, sum_y2 = 0, 0, 0.0, 0.0, 0.0
+        for X, y in iter_split(store, part, **split):
+            predicted = model.predict(scaler.transform(X.astype(dtype or X.dtype, copy=False)))
+            rows += len(X)
+            if classifier:
+                correct += int(np.sum(predicted == y))
+            else:
+                y = y.astype(np.float64).reshape(len(y), -1)
+                sse = sse + np.sum((predicted.reshape(y.shape) - y) ** 2, axis=0)
+                sum_y = sum_y + y.sum(axis=0)
+                sum_y2 = sum_y2 + np.sum(y ** 2, axis=0)
+        if classifier:
+            scores[part] = {'rows': rows, 'accuracy': correct / rows if rows else None}
+        elif rows:
+            total = sum_y2 - sum_y ** 2 / rows
+            scores[part] = {'rows': rows, 'mse': float(np.mean(sse) / rows),
+                            'r2': float(np.mean(1 - sse / np.where(total > 0, total, np.nan)))}
+        else:
+            scores[part] = {'rows': 0, 'mse': None, 'r2': None}
+    return scores
+
+__all__ = ['DEFAULT_STREAM_BATCH', 'DEFAULT_TREE_BATCH', 'fit_forest', 'fit_mlp', 'fit_scaler_streaming',
+           'fit_streaming', 'iter_split', 'score_streaming', 'store_classes']
@@ -2,15 +2,15 @@ import sys
 from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QGridLayout, QFileDialog, QTextEdit, QProgressBar, QLabel, QSplitter, QDesktopWidget
 import os
 import pickle
-from src.mood_detector import MoodDetector, mood_to_label
+from src.model_registry import get_mood_detector
 import matplotlib.colors as mcolors
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import librosa
 import numpy as np
-from PyQt5.QtCore import Qt
-from src.audio_processing import analyze_audio
-from src.genre_classifier import predict_genre
+from PyQt5.QtCore import Qt, QThread
+from src.analysis_worker import AnalysisWorker, MOOD_MODEL_FILE, MOOD_SCALER_FILE
+from src.feature_cache import FeatureCache
+from src.log_config import configure_logging
 
 class WaveformWidget(QWidget):
     def __init__(self, parent=None):
@@ -22,6 +22,15 @@ class WaveformWidget(QWidget):
         self.setLayout(layout)
         # self.setMinimumSize(500, 300)  # Width, Height
 
+        self.envelope = None
+        self.envelope_artist = None
+        self.view = (0.0, 0.0)
+        self.drag_origin = None
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+        self.canvas.mpl_connect('button_press_event', self.on_press)
+        self.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        self.canvas.mpl_connect('button_release_event', self.on_release)
+
         self.setup_plot()
 
     def setup_plot(self):
@@ -41,17 +50,15 @@ class WaveformWidget(QWidget):
         self.ax.set_aspect('auto')
         self.canvas.draw()
 
-    def plot_waveform(self, audio_path):
-        y, sr = librosa.load(audio_path)
-        time = np.linspace(0, len(y) / sr, num=len(y))
+    def plot_waveform(self, audio):
+        # Accepts a path or a DecodedAudio; paths go through the shared decode cache
+        from src.decoded_audio import load_audio  # librosa; usually already loaded by the analysis
+
+        audio = load_audio(audio)
+        self.envelope = audio.envelope()
+        self.envelope_artist = None
 
-        # Downsample for visualization
-        downsample_factor = max(1, len(y) // 1000)
-        y_downsampled = y[::downsample_factor]
-        time_downsampled = time[::downsample_factor]
-        
         self.ax.clear()
-        self.ax.plot(time_downsampled, y_downsampled, color='#4CAF50')
         self.ax.set_facecolor('#2D2D2D')
         self.ax.tick_params(axis='x', color='white')
         self.ax.tick_params(axis='y', color='white')
@@ -64,8 +71,54 @@ class WaveformWidget(QWidget):
         for spine in self.ax.spines.values():
             spine.set_edgecolor('white')
 
+        peak = max(abs(self.envelope.levels[-1][0][0]), abs(self.envelope.levels[-1][1][0]), 1e-3)
+        self.ax.set_ylim(-peak * 1.05, peak * 1.05)
         self.figure.tight_layout()
-        self.canvas.draw()
+        self.set_view(0, self.envelope.duration)
+
+    def set_view(self, start, end):
+        """Show `[start, end]` seconds, drawing one min/max bucket per horizontal pixel."""
+        if self.envelope is None:
+            return
+        duration = self.envelope.duration
+        span = min(max(end - start, 1e-3), duration)
+        start = min(max(0.0, start), duration - span)
+        self.view = (start, start + span)
+
+        times, mins, maxs = self.envelope.query(start, start + span, max(1, self.canvas.width()))
+        if self.envelope_artist is not None:
+            self.envelope_artist.remove()
+        self.envelope_artist = self.ax.fill_between(times, mins, maxs, color='#4CAF50', linewidth=0.5, edgecolor='#4CAF50')
+        self.ax.set_xlim(start, start + span)
+        self.canvas.draw_idle()
+
+    def on_scroll(self, event):
+        # Zoom around the cursor
+        if self.envelope is None or event.xdata is None:
+            return
+        start, end = self.view
+        factor = 0.8 if event.button == 'up' else 1.25
+        self.set_view(event.xdata - (event.xdata - start) * factor, event.xdata + (end - event.xdata) * factor)
+
+    def on_press(self, event):
+        if self.envelope is None or event.xdata is None:
+            return
+        if event.dblclick:
+            self.set_view(0, self.envelope.duration)
+        else:
+            self.drag_origin = (event.x, self.view)
+
+    def on_motion(self, event):
+        # Pan by dragging; pixel deltas avoid feedback from the moving x axis
+        if self.drag_origin is None:
+            return
+        origin_x, (start, end) = self.drag_origin
+        seconds_per_pixel = (end - start) / max(1, self.ax.bbox.width)
+        shift = (origin_x - event.x) * seconds_per_pixel
+        self.set_view(start + shift, end + shift)
+
+    def on_release(self, event):
+        self.drag_origin = None
 
 class MoodPlotWidget(QWidget):
     def __init__(self, parent=None):
@@ -169,7 +222,10 @@ class AudioAnalyzerApp(QWidget):
     def __init__(self):
         super().__init__()
         self.last_directory = self.load_last_directory()
-        self.mood_detector = MoodDetector.load('./models/mood_scaler.joblib', './models/mood_model.joblib')
+        self.mood_detector = get_mood_detector(MOOD_SCALER_FILE, MOOD_MODEL_FILE)  # Warm the model registry
+        self.feature_cache = FeatureCache()
+        self.current_worker = None
+        self.analysis_threads = []
         self.initUI()
         self.apply_dark_mode_style()
         
@@ -351,35 +407,78 @@ class AudioAnalyzerApp(QWidget):
         self.position_window()
 
     def analyzeAudio(self, file_path):
+        # A new file supersedes whatever is still running
+        self.cancelAnalysis()
+        self.analysis_threads = [(t, w) for t, w in self.analysis_threads if not t.isFinished()]
         self.progress_bar.setValue(0)
-        features, basic_stats = analyze_audio(file_path, self.progress_bar)
-        
-        genre_prediction, top_genres = predict_genre(features, './models/genre_classifier.joblib', './models/genre_scaler.joblib')
 
-        # Mood detection
-        mood_detector = MoodDetector.load('./models/mood_scaler.joblib', './models/mood_model.joblib')
-        valence, arousal = mood_detector.predict(features)
-        mood_label = mood_to_label(valence, arousal)
-
-        results = f"File: {file_path}\n\n"
+        thread = QThread(self)
+        worker = AnalysisWorker(file_path, cache=self.feature_cache)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.progress_bar.setValue)
+        worker.stage.connect(self.showStage)
+        worker.result.connect(self.showResults)
+        worker.error.connect(self.showError)
+        worker.done.connect(thread.quit)
+
+        self.current_worker = worker
+        self.analysis_threads.append((thread, worker))
+        thread.start()
+
+    def cancelAnalysis(self):
+        worker = self.current_worker
+        if worker is None:
+            return
+        worker.cancel()
+        # Drop anything the cancelled worker emits from now on
+        worker.progress.disconnect(self.progress_bar.setValue)
+        worker.stage.disconnect(self.showStage)
+        worker.result.disconnect(self.showResults)
+        worker.error.disconnect(self.showError)
+        self.current_worker = None
+
+    def showStage(self, name, seconds):
+        self.progress_bar.setFormat(f"%p%  {name} {1000 * seconds:.0f} ms")
+
+    def showResults(self, result):
+        self.current_worker = None
+        self.progress_bar.resetFormat()
+        valence, arousal = result['valence'], result['arousal']
+
+        results = f"File: {result['file_path']}\n\n"
         results += "Basic Audio Statistics:\n"
-        for key, value in basic_stats.items():
+        for key, value in result['basic_stats'].items():
             results += f"{key}: {value}\n"
 
-        results += f"\nPredicted Genre: {genre_prediction}\n"
+        results += f"\nPredicted Genre: {result['genre_prediction']}\n"
         results += "Top 3 Genre Probabilities:\n"
-        for genre, prob in top_genres:
+        for genre, prob in result['top_genres']:
             results += f"{genre}: {prob:.2f}\n"
 
-        results += f"\nMood: {mood_label}\n"
+        results += f"\nMood: {result['mood_label']}\n"
         results += f"Valence: {valence:.2f}, Arousal: {arousal:.2f}\n"
 
-        self.waveform_widget.plot_waveform(file_path)
+        self.waveform_widget.plot_waveform(result['audio'])
         self.mood_plot_widget.plot_mood(valence, arousal)
         self.text_results.setText(results)
         self.progress_bar.setValue(100)
 
+    def showError(self, message):
+        self.current_worker = None
+        self.progress_bar.resetFormat()
+        self.progress_bar.setValue(0)
+        self.text_results.setText(message)
+
+    def closeEvent(self, event):
+        self.cancelAnalysis()
+        for thread, _ in self.analysis_threads:
+            thread.quit()
+            thread.wait()
+        super().closeEvent(event)
+
 def run_app():
+    configure_logging()
     app = QApplication(sys.argv)
     ex = AudioAnalyzerApp()
     ex.show()
@@ -0,0 +1,68 @@
+import numpy as np
+
+DEFAULT_BASE_BLOCK = 16
+
+def _reduce_pairs(mins, maxs):
+    # Halve a level; an odd trailing bucket is carried over on its own
+    if len(mins) % 2:
+        mins = np.append(mins, mins[-1])
+        maxs = np.append(maxs, maxs[-1])
+    return np.minimum(mins[0::2], mins[1::2]), np.maximum(maxs[0::2], maxs[1::2])
+
+class EnvelopePyramid:
+    """Min/max envelope of a signal at every power-of-two resolution (a mipmap).
+
+    Level 0 buckets hold `base_block` samples and each level above halves the
+    bucket count. Built once per decode; queries only touch the pyramid, never
+    the raw samples, so a whole hour of audio and a 50 ms window cost the same
+    to draw.
+    """
+
+    def __init__(self, y, sr, base_block=DEFAULT_BASE_BLOCK):
+        self.sr = sr
+        self.n_samples = len(y)
+        self.base_block = base_block
+
+        n_full = len(y) // base_block
+        blocks = y[:n_full * base_block].reshape(n_full, base_block)
+        mins, maxs = blocks.min(axis=1), blocks.max(axis=1)
+        tail = y[n_full * base_block:]
+        if len(tail):
+            mins = np.append(mins, tail.min())
+            maxs = np.append(maxs, tail.max())
+        if len(mins) == 0:
+            mins = maxs = np.zeros(1, dtype=y.dtype)
+
+        self.levels = [(mins, maxs)]
+        while len(mins) > 1:
+            mins, maxs = _reduce_pairs(mins, maxs)
+            self.levels.append((mins, maxs))
+
+    @property
+    def duration(self):
+        return self.n_samples / self.sr
+
+    def block_size(self, level):
+        return self.base_block * 2 ** level
+
+    def choose_level(self, start, end, n_buckets):
+        """Coarsest level that still gives at least `n_buckets` buckets between `start` and `end` seconds."""
+        samples_per_bucket = max(1.0, (end - start) * self.sr / max(1, n_buckets))
+        level = int(np.floor(np.log2(max(1.0, samples_per_bucket / self.base_block))))
+        return min(max(level, 0), len(self.levels) - 1)
+
+    def query(self, start, end, n_buckets):
+        """Return `(times, mins, maxs)` covering `[start, end]` seconds in about `n_buckets` buckets."""
+        start = max(0.0, start)
+        end = min(self.duration, end)
+        level = self.choose_level(start, end, n_buckets)
+        mins, maxs = self.levels[level]
+        block = self.block_size(level)
+
+        first = int(start * self.sr // block)
+        last = min(len(mins), int(np.ceil(end * self.sr / block)) + 1)
+        first = min(first, max(0, last - 1))
+        times = (np.arange(first, last) + 0.5) * block / self.sr
+        return times, mins[first:last], maxs[first:last]
+
+__all__ = ['EnvelopePyramid']